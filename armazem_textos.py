@@ -0,0 +1,323 @@
+import argparse
+import hashlib
+import os
+import sys
+import tempfile
+import time
+
+import psycopg2
+import zstandard
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# 🗜️ Armazém dos textos completos, endereçado pelo conteúdo: cada corpo é
+# gravado uma única vez, comprimido com zstd, em <pasta>/ab/cd/<sha256>.zst.
+# A tabela documentos guarda só o ponteiro (texto_hash), o tamanho em bytes
+# UTF-8 (texto_tamanho) e o vetor de busca; o conteudo_texto passa pelo banco
+# na gravação (o gatilho calcula o vetor) e é descartado em seguida.
+# Documentos idênticos enviados duas vezes apontam para o mesmo arquivo.
+#
+#   python armazem_textos.py --migrar     # move os textos ainda gravados no banco
+#   python armazem_textos.py --coletar    # apaga arquivos que nenhum documento usa
+#   python armazem_textos.py              # tamanho do acervo e taxa de compressão
+
+PASTA_ARMAZEM = os.getenv(
+    "ARMAZEM_TEXTOS_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "armazem_textos"),
+)
+NIVEL_ZSTD = int(os.getenv("ARMAZEM_ZSTD_NIVEL", "10"))
+BLOCO_LEITURA = 64 * 1024
+EXTENSAO = ".zst"
+
+# Arquivos mais novos que isso não são coletados: podem ser de uma gravação
+# cuja transação ainda não fez COMMIT
+CARENCIA_COLETA = float(os.getenv("ARMAZEM_CARENCIA_COLETA", str(24 * 3600)))
+
+
+class TextoAusenteError(Exception):
+    """O documento aponta para um hash que não está no armazém."""
+
+
+def caminho_texto(texto_hash, pasta=PASTA_ARMAZEM):
+    return os.path.join(pasta, texto_hash[:2], texto_hash[2:4], texto_hash + EXTENSAO)
+
+
+def _renovar(destino):
+    # Um arquivo reaproveitado ganha mtime novo: a coleta não apaga o texto de
+    # uma gravação cuja transação ainda não fez COMMIT
+    try:
+        os.utime(destino)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def _publicar(temporario, destino):
+    # Outro processo pode ter gravado o mesmo conteúdo no meio tempo: o
+    # os.replace é atômico e os dois arquivos são idênticos
+    if _renovar(destino):
+        os.unlink(temporario)
+        return
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    os.replace(temporario, destino)
+
+
+def _abrir_temporario(pasta):
+    os.makedirs(pasta, exist_ok=True)
+    descritor, temporario = tempfile.mkstemp(dir=pasta, prefix=".", suffix=".tmp")
+    return os.fdopen(descritor, "wb"), temporario
+
+
+def gravar_texto(texto, pasta=PASTA_ARMAZEM):
+    """Grava `texto` (se ainda não existir) e retorna (texto_hash, texto_tamanho)."""
+    if texto is None:
+        return None, None
+    dados = texto.encode("utf-8")
+    texto_hash = hashlib.sha256(dados).hexdigest()
+    destino = caminho_texto(texto_hash, pasta)
+    if not _renovar(destino):
+        arquivo, temporario = _abrir_temporario(pasta)
+        try:
+            with arquivo:
+                arquivo.write(zstandard.ZstdCompressor(level=NIVEL_ZSTD).compress(dados))
+                arquivo.flush()
+                os.fsync(arquivo.fileno())
+            _publicar(temporario, destino)
+        except BaseException:
+            if os.path.exists(temporario):
+                os.unlink(temporario)
+            raise
+    return texto_hash, len(dados)
+
+
+class EscritorTexto:
+    """Grava um texto recebido aos pedaços (páginas), sem montá-lo na memória.
+
+    O hash só é conhecido no fim: os pedaços vão comprimidos para um arquivo
+    temporário, que `concluir()` move para o endereço definitivo (ou descarta,
+    se o conteúdo já estava no armazém).
+    """
+
+    def __init__(self, pasta=PASTA_ARMAZEM):
+        self.pasta = pasta
+        self._hash = hashlib.sha256()
+        self._tamanho = 0
+        self._arquivo, self._temporario = _abrir_temporario(pasta)
+        self._compressor = zstandard.ZstdCompressor(level=NIVEL_ZSTD).stream_writer(self._arquivo, closefd=False)
+
+    def escrever(self, texto):
+        dados = texto.encode("utf-8")
+        self._hash.update(dados)
+        self._tamanho += len(dados)
+        self._compressor.write(dados)
+
+    def concluir(self):
+        """Fecha o arquivo e retorna (texto_hash, texto_tamanho)."""
+        try:
+            self._compressor.close()
+            self._arquivo.flush()
+            os.fsync(self._arquivo.fileno())
+            self._arquivo.close()
+            texto_hash = self._hash.hexdigest()
+            _publicar(self._temporario, caminho_texto(texto_hash, self.pasta))
+        except BaseException:
+            self.descartar()
+            raise
+        return texto_hash, self._tamanho
+
+    def descartar(self):
+        self._arquivo.close()
+        if os.path.exists(self._temporario):
+            os.unlink(self._temporario)
+
+
+def abrir_texto(texto_hash, pasta=PASTA_ARMAZEM):
+    """Leitor binário do texto descomprimido (bytes UTF-8)."""
+    try:
+        arquivo = open(caminho_texto(texto_hash, pasta), "rb")
+    except FileNotFoundError:
+        raise TextoAusenteError(f"Texto {texto_hash} não encontrado em {pasta}.")
+    return zstandard.ZstdDecompressor().stream_reader(arquivo, closefd=True)
+
+
+def ler_texto(texto_hash, pasta=PASTA_ARMAZEM):
+    with abrir_texto(texto_hash, pasta) as leitor:
+        return leitor.read().decode("utf-8")
+
+
+def transmitir_texto(texto_hash, inicio=0, fim=None, pasta=PASTA_ARMAZEM):
+    """Gerador dos bytes [inicio, fim) do texto, em blocos de BLOCO_LEITURA.
+
+    O arquivo é aberto já na chamada: um texto ausente falha aqui, antes de
+    uma resposta HTTP começar a ser enviada.
+    """
+    return _blocos(abrir_texto(texto_hash, pasta), inicio, fim)
+
+
+def _blocos(leitor, inicio, fim):
+    # O zstd não tem acesso aleatório: o trecho anterior a `inicio` é
+    # descomprimido e descartado, sem sair do leitor
+    with leitor:
+        if inicio:
+            leitor.seek(inicio)
+        restante = None if fim is None else fim - inicio
+        while restante is None or restante > 0:
+            bloco = leitor.read(BLOCO_LEITURA if restante is None else min(BLOCO_LEITURA, restante))
+            if not bloco:
+                break
+            if restante is not None:
+                restante -= len(bloco)
+            yield bloco
+
+
+def texto_do_documento(conteudo_texto, texto_hash, pasta=PASTA_ARMAZEM):
+    """Texto completo de uma linha de documentos, esteja no banco ou no armazém."""
+    if conteudo_texto is not None or texto_hash is None:
+        return conteudo_texto
+    return ler_texto(texto_hash, pasta)
+
+
+# 🚚 Migração dos textos gravados antes do armazém: em blocos, cada um na sua
+# transação. O gatilho de busca mantém o vetor já calculado (migracoes/008).
+def migrar(conn, pasta=PASTA_ARMAZEM, tamanho_bloco=200):
+    cur = conn.cursor()
+    migrados, bytes_texto = 0, 0
+    while True:
+        cur.execute("""
+            SELECT id, conteudo_texto FROM documentos
+            WHERE conteudo_texto IS NOT NULL AND texto_hash IS NULL
+            ORDER BY id LIMIT %s FOR UPDATE SKIP LOCKED;
+        """, (tamanho_bloco,))
+        linhas = cur.fetchall()
+        if not linhas:
+            conn.commit()
+            break
+        for documento_id, conteudo in linhas:
+            texto_hash, tamanho = gravar_texto(conteudo, pasta)
+            cur.execute(
+                "UPDATE documentos SET texto_hash = %s, texto_tamanho = %s, conteudo_texto = NULL WHERE id = %s;",
+                (texto_hash, tamanho, documento_id),
+            )
+            bytes_texto += tamanho
+        conn.commit()
+        migrados += len(linhas)
+        print(f"🚚 {migrados} documento(s) migrado(s)...", file=sys.stderr)
+    cur.close()
+    return {"migrados": migrados, "bytes_texto": bytes_texto}
+
+
+def _arquivos_armazem(pasta):
+    for raiz, _, nomes in os.walk(pasta):
+        for nome in nomes:
+            yield os.path.join(raiz, nome), nome
+
+
+def _apagar_se_antigo(caminho, limite):
+    # Um texto reaproveitado por uma gravação durante a consulta ganhou mtime
+    # novo (_renovar) e fica
+    try:
+        if os.path.getmtime(caminho) > limite:
+            return False
+        os.unlink(caminho)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+# 🧹 Coleta: arquivos sem nenhum documento apontando (documentos apagados,
+# transações desfeitas depois de o texto ser gravado) e temporários abandonados
+def coletar(conn, pasta=PASTA_ARMAZEM, carencia=CARENCIA_COLETA, simular=False):
+    limite = time.time() - carencia
+    candidatos, temporarios = {}, []
+    for caminho, nome in _arquivos_armazem(pasta):
+        if os.path.getmtime(caminho) > limite:
+            continue
+        if nome.endswith(".tmp"):
+            temporarios.append(caminho)
+        elif nome.endswith(EXTENSAO):
+            candidatos[nome[:-len(EXTENSAO)]] = caminho
+
+    cur = conn.cursor()
+    orfaos = []
+    hashes = list(candidatos)
+    for i in range(0, len(hashes), 1000):
+        cur.execute("""
+            SELECT h FROM unnest(%s::text[]) AS h
+            WHERE NOT EXISTS (SELECT 1 FROM documentos d WHERE d.texto_hash = h);
+        """, (hashes[i:i + 1000],))
+        orfaos += [candidatos[h] for h, in cur.fetchall()]
+    conn.rollback()
+    cur.close()
+
+    tamanhos = {}
+    for caminho in orfaos + temporarios:
+        try:
+            tamanhos[caminho] = os.path.getsize(caminho)
+        except FileNotFoundError:
+            pass
+    if not simular:
+        orfaos = [c for c in orfaos if _apagar_se_antigo(c, limite)]
+        temporarios = [c for c in temporarios if _apagar_se_antigo(c, limite)]
+    bytes_liberados = sum(tamanhos.get(c, 0) for c in orfaos + temporarios)
+    return {"orfaos": len(orfaos), "temporarios": len(temporarios), "bytes_liberados": bytes_liberados}
+
+
+def resumo(conn, pasta=PASTA_ARMAZEM):
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT count(*) FILTER (WHERE texto_hash IS NOT NULL),
+               count(*) FILTER (WHERE conteudo_texto IS NOT NULL),
+               count(DISTINCT texto_hash),
+               coalesce(sum(texto_tamanho), 0)
+        FROM documentos;
+    """)
+    no_armazem, no_banco, distintos, bytes_documentos = cur.fetchone()
+    cur.execute("""
+        SELECT coalesce(sum(tamanho), 0) FROM (
+            SELECT DISTINCT texto_hash, texto_tamanho AS tamanho FROM documentos WHERE texto_hash IS NOT NULL
+        ) t;
+    """)
+    bytes_distintos = cur.fetchone()[0]
+    conn.rollback()
+    cur.close()
+    bytes_disco = sum(os.path.getsize(c) for c, nome in _arquivos_armazem(pasta) if nome.endswith(EXTENSAO))
+    return {
+        "documentos_no_armazem": no_armazem,
+        "documentos_com_texto_no_banco": no_banco,
+        "textos_distintos": distintos,
+        "bytes_documentos": int(bytes_documentos),
+        "bytes_textos_distintos": int(bytes_distintos),
+        "bytes_em_disco": bytes_disco,
+        "compressao": round(int(bytes_distintos) / bytes_disco, 2) if bytes_disco else None,
+    }
+
+
+def conectar():
+    return psycopg2.connect(
+        dbname=os.getenv("DB_NAME"),
+        user=os.getenv("DB_USER"),
+        password=os.getenv("DB_PASSWORD"),
+        host=os.getenv("DB_HOST"),
+        port=os.getenv("DB_PORT"),
+        client_encoding='UTF8'
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Armazém zstd dos textos completos dos documentos.")
+    acao = parser.add_mutually_exclusive_group()
+    acao.add_argument("--migrar", action="store_true", help="Move para o armazém os textos gravados no banco")
+    acao.add_argument("--coletar", action="store_true", help="Apaga arquivos que nenhum documento usa")
+    parser.add_argument("--simular", action="store_true", help="Com --coletar, só informa o que seria apagado")
+    parser.add_argument("--pasta", default=PASTA_ARMAZEM)
+    args = parser.parse_args()
+
+    conn = conectar()
+    if args.migrar:
+        print(migrar(conn, args.pasta))
+    elif args.coletar:
+        print(coletar(conn, args.pasta, simular=args.simular))
+    else:
+        print(resumo(conn, args.pasta))
+    conn.close()
@@ -0,0 +1,236 @@
+import os
+import select
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import extensions
+
+
+class PoolEsgotadoError(Exception):
+    """Nenhuma conexão ficou livre dentro do tempo de espera do pool."""
+
+
+# 🔌 Pool de conexões PostgreSQL compartilhado pela API (main.py) e pelo app Flask
+class PoolConexoes:
+    def __init__(self, minimo=1, maximo=10, timeout=5.0, verificar_apos=30.0,
+                 ociosidade_max=300.0, **parametros):
+        if minimo < 0 or maximo < 1 or minimo > maximo:
+            raise ValueError("Tamanho de pool inválido: exige 0 <= minimo <= maximo e maximo >= 1.")
+        self.minimo = minimo
+        self.maximo = maximo
+        self.timeout = timeout
+        self.verificar_apos = verificar_apos
+        self.ociosidade_max = ociosidade_max
+        self._parametros = parametros
+        self._cond = threading.Condition()
+        self._livres = []  # pilha de (conexão, instante em que ficou ociosa)
+        self._total = 0
+        self._em_uso = 0
+        self._aquecido = False
+        self._contadores = {
+            "checkouts": 0,
+            "esperas": 0,
+            "tempo_espera_ms": 0.0,
+            "esgotamentos": 0,
+            "descartadas": 0,
+            "aguardando": 0,
+            "pico_em_uso": 0,
+        }
+
+    def _abrir(self):
+        return psycopg2.connect(**self._parametros)
+
+    def _aquecer(self):
+        # Abre o mínimo configurado na primeira requisição, não no import
+        self._aquecido = True
+        while self._total < self.minimo:
+            self._livres.append((self._abrir(), time.monotonic()))
+            self._total += 1
+
+    def _saudavel(self, conn, ociosa_desde):
+        if conn.closed:
+            return False
+        if time.monotonic() - ociosa_desde < self.verificar_apos:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _fechar(self, conn):
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+    def obter(self):
+        """Retira uma conexão saudável do pool, aguardando até `timeout` segundos."""
+        inicio = time.monotonic()
+        prazo = inicio + self.timeout
+        with self._cond:
+            if not self._aquecido:
+                self._aquecer()
+            self._contadores["checkouts"] += 1
+            esperou = False
+            while True:
+                if self._livres:
+                    conn, desde = self._livres.pop()
+                    break
+                if self._total < self.maximo:
+                    conn, desde = None, None
+                    self._total += 1
+                    break
+                restante = prazo - time.monotonic()
+                if restante <= 0:
+                    self._contadores["esgotamentos"] += 1
+                    raise PoolEsgotadoError(
+                        f"Pool esgotado: {self.maximo} conexões em uso por mais de {self.timeout}s."
+                    )
+                esperou = True
+                self._contadores["aguardando"] += 1
+                self._cond.wait(restante)
+                self._contadores["aguardando"] -= 1
+            self._em_uso += 1
+            self._contadores["pico_em_uso"] = max(self._contadores["pico_em_uso"], self._em_uso)
+            if esperou:
+                self._contadores["esperas"] += 1
+                self._contadores["tempo_espera_ms"] += (time.monotonic() - inicio) * 1000
+
+        # Verificação de saúde e abertura ficam fora do lock para não serializar o pool
+        try:
+            if conn is not None and not self._saudavel(conn, desde):
+                self._fechar(conn)
+                with self._cond:
+                    self._contadores["descartadas"] += 1
+                conn = None
+            if conn is None:
+                conn = self._abrir()
+        except Exception:
+            with self._cond:
+                self._total -= 1
+                self._em_uso -= 1
+                self._cond.notify()
+            raise
+        return conn
+
+    def devolver(self, conn, descartar=False):
+        """Devolve a conexão ao pool, desfazendo qualquer transação deixada aberta."""
+        if not conn.closed and not descartar:
+            try:
+                if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except psycopg2.Error:
+                descartar = True
+        agora = time.monotonic()
+        with self._cond:
+            self._em_uso -= 1
+            if conn.closed or descartar:
+                self._total -= 1
+                self._contadores["descartadas"] += 1
+                fechar = [conn]
+            else:
+                self._livres.append((conn, agora))
+                fechar = self._podar_ociosas(agora)
+            self._cond.notify()
+        for c in fechar:
+            self._fechar(c)
+
+    def _podar_ociosas(self, agora):
+        # As mais antigas ficam no fundo da pilha; só fecha o que excede o mínimo
+        podadas = []
+        while (len(self._livres) > 1 and self._total > self.minimo
+               and agora - self._livres[0][1] > self.ociosidade_max):
+            conn, _ = self._livres.pop(0)
+            self._total -= 1
+            podadas.append(conn)
+        return podadas
+
+    @contextmanager
+    def conexao(self):
+        """Empresta uma conexão durante o bloco `with` e a devolve ao final."""
+        conn = self.obter()
+        try:
+            yield conn
+        except Exception:
+            if not conn.closed:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    pass
+            raise
+        finally:
+            self.devolver(conn)
+
+    def metricas(self):
+        """Retrato do uso do pool para monitoramento de saturação."""
+        with self._cond:
+            dados = dict(self._contadores)
+            dados.update({
+                "minimo": self.minimo,
+                "maximo": self.maximo,
+                "abertas": self._total,
+                "em_uso": self._em_uso,
+                "livres": len(self._livres),
+                "saturacao": round(self._em_uso / self.maximo, 3),
+            })
+        dados["tempo_espera_ms"] = round(dados["tempo_espera_ms"], 3)
+        return dados
+
+    def fechar_todas(self):
+        with self._cond:
+            livres, self._livres = self._livres, []
+            self._total -= len(livres)
+        for conn, _ in livres:
+            self._fechar(conn)
+
+
+def criar_pool(**parametros):
+    """Cria um pool dimensionado pelas variáveis DB_POOL_* do ambiente."""
+    return PoolConexoes(
+        minimo=int(os.getenv("DB_POOL_MIN", "1")),
+        maximo=int(os.getenv("DB_POOL_MAX", "10")),
+        timeout=float(os.getenv("DB_POOL_TIMEOUT", "5")),
+        verificar_apos=float(os.getenv("DB_POOL_VERIFICAR_APOS", "30")),
+        ociosidade_max=float(os.getenv("DB_POOL_OCIOSIDADE_MAX", "300")),
+        **parametros
+    )
+
+
+# 📣 Escuta um canal LISTEN/NOTIFY em thread própria, com conexão fora do pool.
+# Se a conexão cair, reconecta e chama ao_notificar mesmo assim: avisos podem
+# ter se perdido enquanto estava desconectado.
+def iniciar_ouvinte(canal, ao_notificar, intervalo_reconexao=5.0, **parametros):
+    def ouvir():
+        while True:
+            conn = None
+            try:
+                conn = psycopg2.connect(**parametros)
+                conn.set_isolation_level(extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                with conn.cursor() as cur:
+                    cur.execute(f"LISTEN {canal};")
+                ao_notificar()
+                while True:
+                    if select.select([conn], [], [], 60.0) == ([], [], []):
+                        continue
+                    conn.poll()
+                    if conn.notifies:
+                        conn.notifies.clear()
+                        ao_notificar()
+            except Exception as e:
+                print(f"⚠️ Ouvinte de '{canal}' desconectado: {e}")
+                time.sleep(intervalo_reconexao)
+            finally:
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except psycopg2.Error:
+                        pass
+
+    thread = threading.Thread(target=ouvir, name=f"ouvinte-{canal}", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,106 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from busca_bm25 import PASTA_INDICE, IndiceBM25, conectar
+from concorrencia_api import percentil
+
+# ⏱️ Latência e recall do backend BM25 comparado ao ts_rank do PostgreSQL
+# Construa o índice antes (python busca_bm25.py --construir). O recall@k é a
+# fração do top-k do PostgreSQL que o BM25 também devolve no seu top-k: sem
+# julgamentos de relevância, o FTS atual serve de referência.
+#
+#   python benchmarks/busca_bm25.py --repeticoes 50 --saida bm25.json
+
+CONSULTAS = [
+    "aprendiz", "cota", "aprendizagem", "contrato", "jornada", "salário",
+    "férias", "menor", "fiscalização", "estabelecimento", "portaria", "decreto",
+]
+
+SQL_TS_RANK = """
+    SELECT d.id
+    FROM documentos d, plainto_tsquery('portuguese', %s) AS q(consulta)
+    WHERE d.busca_vetor @@ q.consulta AND d.removido_em IS NULL
+    ORDER BY ts_rank(d.busca_vetor, q.consulta) DESC
+    LIMIT %s
+"""
+
+
+def medir(funcao, repeticoes):
+    latencias, resultado = [], None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        latencias.append(time.perf_counter() - inicio)
+    return latencias, resultado
+
+
+def resumir(latencias):
+    return {
+        "p50_ms": percentil(latencias, 50),
+        "p95_ms": percentil(latencias, 95),
+        "p99_ms": percentil(latencias, 99),
+    }
+
+
+def executar(consultas, pasta, k, repeticoes):
+    conn = conectar()
+    cur = conn.cursor()
+    inicio = time.perf_counter()
+    indice = IndiceBM25(pasta)
+    indice.buscar(consultas[0], limite=k)  # abre os segmentos (mmap)
+    abertura = time.perf_counter() - inicio
+
+    todas_pg, todas_bm25, por_consulta, recalls = [], [], [], []
+    for consulta in consultas:
+        def postgres():
+            cur.execute(SQL_TS_RANK, (consulta, k))
+            return [r[0] for r in cur.fetchall()]
+
+        lat_pg, ids_pg = medir(postgres, repeticoes)
+        lat_bm25, ranqueados = medir(lambda: indice.buscar(consulta, limite=k), repeticoes)
+        ids_bm25 = [id_ for id_, _ in ranqueados]
+        recall = len(set(ids_pg) & set(ids_bm25)) / len(ids_pg) if ids_pg else None
+        if recall is not None:
+            recalls.append(recall)
+        todas_pg += lat_pg
+        todas_bm25 += lat_bm25
+        por_consulta.append({
+            "consulta": consulta,
+            "resultados_ts_rank": len(ids_pg),
+            "resultados_bm25": len(ids_bm25),
+            f"recall@{k}": round(recall, 3) if recall is not None else None,
+            "ts_rank": resumir(lat_pg),
+            "bm25": resumir(lat_bm25),
+        })
+    conn.close()
+
+    return {
+        "k": k,
+        "repeticoes": repeticoes,
+        "abertura_indice_ms": round(abertura * 1000, 2),
+        "ts_rank": resumir(todas_pg),
+        "bm25": resumir(todas_bm25),
+        f"recall@{k}_medio": round(sum(recalls) / len(recalls), 3) if recalls else None,
+        "consultas": por_consulta,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara latência e recall do BM25 com o ts_rank.")
+    parser.add_argument("--pasta", default=PASTA_INDICE, help="Pasta do índice BM25")
+    parser.add_argument("--consulta", action="append", help="Consulta a medir (repetível)")
+    parser.add_argument("-k", type=int, default=10, help="Tamanho do top-k para o recall")
+    parser.add_argument("--repeticoes", type=int, default=20)
+    parser.add_argument("--saida", help="Arquivo JSON para gravar o resultado")
+    args = parser.parse_args()
+
+    resultado = executar(args.consulta or CONSULTAS, args.pasta, args.k, args.repeticoes)
+    texto = json.dumps(resultado, ensure_ascii=False, indent=2)
+    print(texto)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            f.write(texto + "\n")
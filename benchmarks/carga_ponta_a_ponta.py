@@ -0,0 +1,149 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from concorrencia_api import (
+    CREDENCIAIS, cenario_documentos, cenario_token, executar, obter_token
+)
+from corpus_sintetico import TERMOS_BUSCA
+
+# 🚦 Carga ponta a ponta: roda, em sequência, cenários da API FastAPI
+# (/token, /documentos, /upload) e do app Flask (/api/search, /api/filters)
+# e grava um único JSON com vazão e p50/p95/p99 de cada um. Com --comparar,
+# confronta o resultado com uma execução anterior e sai com código 1 se
+# algum cenário piorou além da tolerância — para rodar antes de um deploy.
+#
+# Suba as duas aplicações e carregue um corpus (benchmarks/carregar_corpus.py):
+#   python benchmarks/carga_ponta_a_ponta.py --email a@b.com --senha x --saida atual.json
+#   python benchmarks/carga_ponta_a_ponta.py --email a@b.com --senha x --comparar base.json
+#   python benchmarks/carregar_corpus.py --limpar   # inclusive os documentos do cenário upload
+
+
+# Consultas variadas: pares de termos do corpus, alguns com filtro de ano,
+# repetindo-se como numa carga real (o cache de busca também é medido).
+# /api/search usa to_tsquery: termos unidos por "&", expressões por "<->".
+def consulta_busca(i):
+    n = len(TERMOS_BUSCA)
+    termos = (TERMOS_BUSCA[i % n], TERMOS_BUSCA[(i // n) % n])
+    return " & ".join(" <-> ".join(termo.split()) for termo in termos)
+
+def cenario_busca(sessao, url, headers, i):
+    consulta = consulta_busca(i)
+    filtros = {"ano": str(1990 + i % 36)} if i % 3 == 0 else {}
+    return sessao.post(f"{url}/api/search", json={"query": consulta, "filters": filtros})
+
+def cenario_filtros(sessao, url, headers, i):
+    return sessao.get(f"{url}/api/filters")
+
+# Como o do concorrencia_api.py, mas com o título marcado: o /upload não
+# grava arquivo_origem e `carregar_corpus.py --limpar` remove pelo título
+def cenario_upload(sessao, url, headers, i):
+    dados = {"titulo": f"sintetico: upload de carga {i}", "tipo": "Portaria", "orgao": "MTE"}
+    arquivos = {"file": (f"carga_{i}.json", json.dumps(dados))}
+    return sessao.post(f"{url}/upload", headers=headers, files=arquivos)
+
+# nome → (função, aplicação, requisições relativas ao --requisicoes)
+CENARIOS = {
+    "token": (cenario_token, "api", 0.1),
+    "documentos": (cenario_documentos, "api", 1),
+    "upload": (cenario_upload, "api", 0.2),
+    "busca": (cenario_busca, "flask", 0.2),
+    "filtros": (cenario_filtros, "flask", 1),
+}
+
+# Métricas em que valor maior é pior
+METRICAS_LATENCIA = ("p50_ms", "p95_ms", "p99_ms")
+
+
+def versao_codigo():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def rodar(urls, token, nomes, concorrencia, requisicoes):
+    resultados = {}
+    for nome in nomes:
+        funcao, aplicacao, fator = CENARIOS[nome]
+        total = max(1, int(requisicoes * fator))
+        print(f"⏱️ {nome}: {total} requisições, concorrência {concorrencia}", file=sys.stderr)
+        resultado = executar(urls[aplicacao], funcao, token if aplicacao == "api" else None, concorrencia, total)
+        resultado.pop("cenario")
+        resultados[nome] = resultado
+    return resultados
+
+
+def comparar(atual, base, tolerancia):
+    """Cenários/métricas que pioraram mais que `tolerancia` (fração) em relação à base."""
+    regressoes = []
+    for nome, medido in atual["cenarios"].items():
+        anterior = base.get("cenarios", {}).get(nome)
+        if not anterior:
+            continue
+        for metrica in METRICAS_LATENCIA:
+            antes, depois = anterior.get(metrica), medido.get(metrica)
+            if antes and depois and depois > antes * (1 + tolerancia):
+                regressoes.append({"cenario": nome, "metrica": metrica, "base": antes, "atual": depois})
+        antes, depois = anterior.get("vazao_rps"), medido.get("vazao_rps")
+        if antes and depois and depois < antes * (1 - tolerancia):
+            regressoes.append({"cenario": nome, "metrica": "vazao_rps", "base": antes, "atual": depois})
+        if medido.get("falhas", 0) > anterior.get("falhas", 0):
+            regressoes.append({"cenario": nome, "metrica": "falhas",
+                               "base": anterior.get("falhas", 0), "atual": medido["falhas"]})
+    return regressoes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Carga ponta a ponta na API e no app Flask, com relatório JSON.")
+    parser.add_argument("--url-api", default="http://127.0.0.1:8888")
+    parser.add_argument("--url-flask", default="http://127.0.0.1:5000")
+    parser.add_argument("--email", default=os.getenv("BENCH_EMAIL"))
+    parser.add_argument("--senha", default=os.getenv("BENCH_SENHA"))
+    parser.add_argument("--cenario", action="append", choices=sorted(CENARIOS),
+                        help="Cenário a rodar (repetível; padrão: todos)")
+    parser.add_argument("--concorrencia", type=int, default=16)
+    parser.add_argument("--requisicoes", type=int, default=1000)
+    parser.add_argument("--comparar", help="JSON de uma execução anterior para detectar regressões")
+    parser.add_argument("--tolerancia", type=float, default=0.2, help="Piora aceita, em fração (0.2 = 20%%)")
+    parser.add_argument("--saida", help="Arquivo JSON para gravar o resultado")
+    args = parser.parse_args()
+
+    if not args.email or not args.senha:
+        sys.exit("Informe --email e --senha (ou BENCH_EMAIL/BENCH_SENHA) de um usuário da API.")
+    CREDENCIAIS.update(username=args.email, password=args.senha)
+
+    urls = {"api": args.url_api, "flask": args.url_flask}
+    resultado = {
+        "ambiente": {
+            "data": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": versao_codigo(),
+            "python": platform.python_version(),
+            "concorrencia": args.concorrencia,
+            "requisicoes": args.requisicoes,
+        },
+        "cenarios": rodar(urls, obter_token(args.url_api, args.email, args.senha),
+                          args.cenario or list(CENARIOS), args.concorrencia, args.requisicoes),
+    }
+
+    regressoes = None
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            regressoes = comparar(resultado, json.load(f), args.tolerancia)
+        resultado["regressoes"] = regressoes
+
+    texto = json.dumps(resultado, ensure_ascii=False, indent=2)
+    print(texto)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            f.write(texto + "\n")
+    if regressoes:
+        sys.exit(1)
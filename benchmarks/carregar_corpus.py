@@ -0,0 +1,131 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import psycopg2
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from gravador_documentos import GravadorLote
+from corpus_sintetico import gerar_documentos, ler_corpus
+
+load_dotenv()
+
+# 📥 Carga do corpus sintético no PostgreSQL local pelo mesmo caminho do
+# importador (GravadorLote: documentos + trechos, gatilhos de busca e de
+# estatísticas). Os documentos ficam marcados com arquivo_origem
+# "sintetico:..." e saem com --limpar, junto com os que o cenário de upload
+# de carga_ponta_a_ponta.py cria (o /upload não grava arquivo_origem: eles
+# vão marcados no título, que começa com "sintetico:").
+#
+#   python benchmarks/carregar_corpus.py --documentos 100000 --saida carga.json
+#   python benchmarks/carregar_corpus.py --arquivo corpus.ndjson.gz
+#   python benchmarks/carregar_corpus.py --limpar
+
+CAMPOS_REFERENCIA = {
+    "tipo": ("tipos_documento", "tipo_documento_id"),
+    "orgao": ("orgaos", "orgao_id"),
+    "status": ("status", "status_id"),
+    "prioridade": ("prioridade", "prioridade_id"),
+}
+
+
+def conectar():
+    return psycopg2.connect(
+        dbname=os.getenv("DB_NAME"),
+        user=os.getenv("DB_USER"),
+        password=os.getenv("DB_PASSWORD"),
+        host=os.getenv("DB_HOST"),
+        port=os.getenv("DB_PORT"),
+        client_encoding='UTF8'
+    )
+
+
+def resolver_referencias(conn, documentos):
+    """Troca os nomes de tipo/órgão/status/prioridade pelos ids, cadastrando os que faltarem."""
+    cur = conn.cursor()
+    ids = {}
+    for campo, (tabela, _) in CAMPOS_REFERENCIA.items():
+        cur.execute(f"SELECT nome, id FROM {tabela};")
+        ids[campo] = dict(cur.fetchall())
+    conn.commit()
+
+    for doc in documentos:
+        for campo, (tabela, coluna) in CAMPOS_REFERENCIA.items():
+            nome = doc.pop(campo, None)
+            if nome is None:
+                doc[coluna] = None
+                continue
+            if nome not in ids[campo]:
+                cur.execute(f"INSERT INTO {tabela} (nome) VALUES (%s) RETURNING id;", (nome,))
+                ids[campo][nome] = cur.fetchone()[0]
+                conn.commit()
+            doc[coluna] = ids[campo][nome]
+        yield doc
+    cur.close()
+
+
+def carregar(conn, documentos, tamanho_lote=500):
+    gravador = GravadorLote(conn, tamanho_lote=tamanho_lote, intervalo_flush=float("inf"))
+    inicio = time.perf_counter()
+    for doc in resolver_referencias(conn, documentos):
+        gravador.adicionar(doc)
+    gravador.descarregar()
+    duracao = time.perf_counter() - inicio
+
+    cur = conn.cursor()
+    cur.execute("ANALYZE documentos; ANALYZE documento_trechos;")
+    cur.execute("SELECT count(*) FROM documentos;")
+    total = cur.fetchone()[0]
+    conn.commit()
+    cur.close()
+    return {
+        "inseridos": gravador.inseridos,
+        "erros": len(gravador.erros),
+        "duracao_s": round(duracao, 3),
+        "documentos_por_s": round(gravador.inseridos / duracao, 2) if duracao else None,
+        "documentos_no_banco": total,
+    }
+
+
+def limpar(conn):
+    # Páginas e trechos saem junto, por ON DELETE CASCADE; os textos no
+    # armazém ficam órfãos e saem com: python armazem_textos.py --coletar
+    cur = conn.cursor()
+    cur.execute("""
+        DELETE FROM documentos
+        WHERE arquivo_origem LIKE 'sintetico:%%'
+           OR (arquivo_origem IS NULL AND titulo LIKE 'sintetico:%%');
+    """)
+    removidos = cur.rowcount
+    conn.commit()
+    cur.close()
+    return {"removidos": removidos}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Carrega o corpus sintético no PostgreSQL local.")
+    origem = parser.add_mutually_exclusive_group()
+    origem.add_argument("--arquivo", help="NDJSON gerado por corpus_sintetico.py (.gz aceito)")
+    origem.add_argument("--documentos", type=int, default=10000, help="Gera e carrega N documentos na hora")
+    origem.add_argument("--limpar", action="store_true", help="Remove os documentos sintéticos do banco")
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--lote", type=int, default=500)
+    parser.add_argument("--saida", help="Arquivo JSON para gravar o resultado")
+    args = parser.parse_args()
+
+    conn = conectar()
+    if args.limpar:
+        resultado = limpar(conn)
+    else:
+        documentos = ler_corpus(args.arquivo) if args.arquivo else gerar_documentos(args.documentos, args.semente)
+        resultado = carregar(conn, documentos, args.lote)
+    conn.close()
+
+    texto = json.dumps(resultado, ensure_ascii=False, indent=2)
+    print(texto)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            f.write(texto + "\n")
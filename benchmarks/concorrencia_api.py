@@ -0,0 +1,151 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+# ⏱️ Vazão da API sob requisições concorrentes
+# Com a API de pé (uvicorn main:app --port 8888), rode o mesmo cenário antes e
+# depois de uma mudança e compare os JSONs gerados. Enquanto a carga roda, uma
+# sonda consulta GET / sem parar: se o event loop travar em chamadas bloqueantes,
+# a latência da sonda dispara mesmo sendo uma rota trivial.
+#
+#   python benchmarks/concorrencia_api.py --email a@b.com --senha x --cenario upload --saida antes.json
+
+
+def percentil(valores, p):
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))
+    return round(ordenados[indice] * 1000, 2)
+
+def resumir(latencias, duracao):
+    return {
+        "requisicoes": len(latencias),
+        "vazao_rps": round(len(latencias) / duracao, 2) if duracao else None,
+        "p50_ms": percentil(latencias, 50),
+        "p95_ms": percentil(latencias, 95),
+        "p99_ms": percentil(latencias, 99),
+    }
+
+def obter_token(url, email, senha):
+    resposta = requests.post(f"{url}/token", data={"username": email, "password": senha})
+    resposta.raise_for_status()
+    return resposta.json()["access_token"]
+
+# Cada cenário recebe a sessão HTTP da thread e o índice da requisição
+def cenario_documentos(sessao, url, headers, i):
+    return sessao.get(f"{url}/documentos", headers=headers, params={"limite": 100})
+
+def cenario_upload(sessao, url, headers, i):
+    dados = {"titulo": f"Benchmark {i}", "tipo": "Portaria", "orgao": "MTE"}
+    arquivos = {"file": (f"bench_{i}.json", json.dumps(dados))}
+    return sessao.post(f"{url}/upload", headers=headers, files=arquivos)
+
+def cenario_usuarios(sessao, url, headers, i):
+    return sessao.get(f"{url}/usuarios", headers=headers)
+
+# Login concorrente: cada requisição paga uma verificação bcrypt
+CREDENCIAIS = {}
+
+def cenario_token(sessao, url, headers, i):
+    return sessao.post(f"{url}/token", data=CREDENCIAIS)
+
+CENARIOS = {
+    "documentos": cenario_documentos,
+    "token": cenario_token,
+    "upload": cenario_upload,
+    "usuarios": cenario_usuarios,
+}
+
+def executar(url, cenario, token, concorrencia, total):
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    local = threading.local()
+    latencias, falhas = [], []
+    recusadas = 0
+    lock = threading.Lock()
+
+    def tarefa(i):
+        nonlocal recusadas
+        if not hasattr(local, "sessao"):
+            local.sessao = requests.Session()
+        inicio = time.perf_counter()
+        status = None
+        try:
+            status = cenario(local.sessao, url, headers, i).status_code
+        except requests.RequestException:
+            pass
+        with lock:
+            if status is not None and status < 400:
+                latencias.append(time.perf_counter() - inicio)
+            else:
+                falhas.append(time.perf_counter() - inicio)
+                # 503 = backpressure da API (ex.: fila do pool de senhas cheia)
+                recusadas += status == 503
+
+    # Sonda do event loop: GET / em sequência enquanto a carga roda
+    parar = threading.Event()
+    latencias_sonda = []
+
+    def sonda():
+        sessao = requests.Session()
+        while not parar.is_set():
+            inicio = time.perf_counter()
+            try:
+                sessao.get(f"{url}/")
+                latencias_sonda.append(time.perf_counter() - inicio)
+            except requests.RequestException:
+                pass
+            time.sleep(0.01)
+
+    thread_sonda = threading.Thread(target=sonda, daemon=True)
+    thread_sonda.start()
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+        list(executor.map(tarefa, range(total)))
+    duracao = time.perf_counter() - inicio
+    parar.set()
+    thread_sonda.join()
+
+    return {
+        "cenario": cenario.__name__.replace("cenario_", ""),
+        "concorrencia": concorrencia,
+        "duracao_s": round(duracao, 3),
+        "falhas": len(falhas),
+        "recusadas_503": recusadas,
+        **resumir(latencias, duracao),
+        "sonda_raiz": resumir(latencias_sonda, duracao),
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mede a vazão da API sob carga concorrente.")
+    parser.add_argument("--url", default="http://127.0.0.1:8888")
+    parser.add_argument("--email", default=os.getenv("BENCH_EMAIL"))
+    parser.add_argument("--senha", default=os.getenv("BENCH_SENHA"))
+    parser.add_argument("--cenario", choices=sorted(CENARIOS), default="documentos")
+    parser.add_argument("--concorrencia", type=int, default=32)
+    parser.add_argument("--requisicoes", type=int, default=1000)
+    parser.add_argument("--saida", help="Arquivo JSON para gravar o resultado")
+    args = parser.parse_args()
+    CREDENCIAIS.update(username=args.email, password=args.senha)
+
+    if not args.email or not args.senha:
+        sys.exit("Informe --email e --senha (ou BENCH_EMAIL/BENCH_SENHA) de um usuário da API.")
+
+    resultado = executar(
+        args.url,
+        CENARIOS[args.cenario],
+        obter_token(args.url, args.email, args.senha),
+        args.concorrencia,
+        args.requisicoes,
+    )
+    texto = json.dumps(resultado, ensure_ascii=False, indent=2)
+    print(texto)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            f.write(texto + "\n")
@@ -0,0 +1,169 @@
+import argparse
+import gzip
+import hashlib
+import json
+import random
+import sys
+
+# 🧪 Gerador de atos normativos sintéticos em português, com a estrutura dos
+# reais (CAPÍTULO → Art. → § → inciso) para exercitar a divisão em trechos,
+# a busca e as listagens em escala (10 mil a 1 milhão de documentos).
+# Determinístico: o documento i depende só de (semente, i), então qualquer
+# fatia do corpus pode ser regerada ou gerada em paralelo.
+#
+#   python benchmarks/corpus_sintetico.py --documentos 100000 --saida corpus.ndjson.gz
+
+TIPOS = [("Portaria", 60), ("Instrução Normativa", 10), ("Resolução", 10), ("Decreto", 12), ("Lei", 8)]
+ORGAOS = [("MTE", 70), ("SIT/MTE", 15), ("Presidência", 10), ("CONANDA", 5)]
+STATUS = [("Vigente", 80), ("Revogado", 15), (None, 5)]
+PRIORIDADES = [("Alta", 20), ("Baixa", 50), (None, 30)]
+
+MESES = ["janeiro", "fevereiro", "março", "abril", "maio", "junho", "julho",
+         "agosto", "setembro", "outubro", "novembro", "dezembro"]
+ROMANOS = ["I", "II", "III", "IV", "V", "VI", "VII", "VIII", "IX", "X", "XI", "XII"]
+
+CAPITULOS = [
+    "DAS DISPOSIÇÕES GERAIS", "DO CONTRATO DE APRENDIZAGEM", "DA JORNADA DE TRABALHO",
+    "DA COTA DE APRENDIZES", "DAS ENTIDADES QUALIFICADAS", "DA FISCALIZAÇÃO",
+    "DOS PROGRAMAS DE APRENDIZAGEM", "DAS PENALIDADES", "DAS DISPOSIÇÕES FINAIS",
+]
+SUJEITOS = [
+    "o empregador", "o estabelecimento", "a entidade qualificada em formação técnico-profissional",
+    "o aprendiz", "a Auditoria-Fiscal do Trabalho", "o contratante", "a empresa de pequeno porte",
+    "o serviço nacional de aprendizagem", "o responsável legal do adolescente",
+]
+VERBOS = ["deverá", "poderá", "fica obrigado a", "não poderá", "é responsável por", "compete a"]
+OBJETOS = [
+    "contratar aprendizes em número equivalente a cinco por cento dos trabalhadores",
+    "anotar o contrato de aprendizagem na Carteira de Trabalho e Previdência Social",
+    "assegurar ao aprendiz formação técnico-profissional metódica",
+    "garantir o salário mínimo hora ao aprendiz",
+    "comunicar a rescisão antecipada do contrato",
+    "manter o aprendiz matriculado e frequentando a escola",
+    "observar a jornada máxima de seis horas diárias",
+    "conceder férias coincidentes com as férias escolares",
+    "registrar o programa de aprendizagem no cadastro nacional",
+    "recolher o FGTS à alíquota de dois por cento",
+    "lavrar o auto de infração em caso de descumprimento da cota",
+    "oferecer atividades práticas compatíveis com o desenvolvimento do adolescente",
+]
+COMPLEMENTOS = [
+    "nos termos do art. 429 da Consolidação das Leis do Trabalho",
+    "no prazo de trinta dias", "conforme regulamento do Ministério do Trabalho e Emprego",
+    "observado o disposto no Decreto nº 9.579, de 22 de novembro de 2018",
+    "sem prejuízo das demais sanções cabíveis", "em cada estabelecimento",
+    "vedada a prorrogação", "na forma do parágrafo único deste artigo",
+]
+
+# Termos presentes no corpus, usados pelas consultas dos benchmarks
+TERMOS_BUSCA = [
+    "aprendiz", "aprendizagem", "cota", "contrato", "jornada", "salário", "férias",
+    "fiscalização", "estabelecimento", "entidade qualificada", "rescisão", "FGTS",
+    "auto de infração", "formação técnico-profissional", "adolescente",
+]
+
+
+def _escolher(rng, opcoes):
+    valores, pesos = zip(*opcoes)
+    return rng.choices(valores, weights=pesos)[0]
+
+
+def _frase(rng):
+    frase = f"{rng.choice(SUJEITOS)} {rng.choice(VERBOS)} {rng.choice(OBJETOS)}"
+    if rng.random() < 0.6:
+        frase += f", {rng.choice(COMPLEMENTOS)}"
+    return frase[0].upper() + frase[1:] + "."
+
+
+def _artigo(rng, numero):
+    rotulo = f"Art. {numero}º" if numero < 10 else f"Art. {numero}."
+    linhas = [f"{rotulo} {_frase(rng)}"]
+    if rng.random() < 0.4:
+        for i in range(rng.randint(2, 6)):
+            frase = _frase(rng)[:-1]
+            linhas.append(f"{ROMANOS[i]} - {frase[0].lower()}{frase[1:]};")
+    paragrafos = rng.choice([0, 0, 1, 2, 3])
+    if paragrafos == 1:
+        linhas.append(f"Parágrafo único. {_frase(rng)}")
+    else:
+        for p in range(1, paragrafos + 1):
+            linhas.append(f"§ {p}º {_frase(rng)}")
+    return linhas
+
+
+def gerar_documento(i, semente=0, artigos_max=20):
+    """Documento sintético número `i`, com nomes de tipo/órgão/status/prioridade."""
+    rng = random.Random(f"{semente}:{i}")
+    tipo = _escolher(rng, TIPOS)
+    orgao = _escolher(rng, ORGAOS)
+    ano = rng.randint(1990, 2025)
+    dia, mes = rng.randint(1, 28), rng.randint(1, 12)
+    numero = str(rng.randint(1, 99999))
+    numero_fmt = f"{int(numero):,}".replace(",", ".")
+    titulo = f"{tipo} {orgao} nº {numero_fmt}, de {dia} de {MESES[mes - 1]} de {ano}"
+    ementa = f"Dispõe sobre {rng.choice(OBJETOS).split(' ', 1)[1]} e dá outras providências."
+
+    linhas = [titulo.upper(), "", ementa, ""]
+    artigo = 1
+    for c in range(rng.randint(1, min(len(CAPITULOS), max(1, artigos_max // 4)))):
+        linhas += [f"CAPÍTULO {ROMANOS[c]}", CAPITULOS[c]]
+        for _ in range(rng.randint(1, max(1, artigos_max // 4))):
+            linhas += _artigo(rng, artigo)
+            artigo += 1
+    linhas.append(f"Art. {artigo}. Esta {tipo.split()[0].lower()} entra em vigor na data de sua publicação.")
+    conteudo = "\n".join(linhas)
+
+    return {
+        "titulo": titulo,
+        "ementa": ementa,
+        "numero": numero,
+        "ano": ano,
+        "data_publicacao": f"{ano:04d}-{mes:02d}-{dia:02d}",
+        "tipo": tipo,
+        "orgao": orgao,
+        "status": _escolher(rng, STATUS),
+        "prioridade": _escolher(rng, PRIORIDADES),
+        "conteudo_texto": conteudo,
+        "arquivo_origem": f"sintetico:{semente}:{i}",
+        "hash_conteudo": hashlib.sha256(conteudo.encode("utf-8")).hexdigest(),
+    }
+
+
+def gerar_documentos(quantidade, semente=0, inicio=0, artigos_max=20):
+    for i in range(inicio, inicio + quantidade):
+        yield gerar_documento(i, semente, artigos_max)
+
+
+def abrir_saida(caminho):
+    if caminho in (None, "-"):
+        return sys.stdout
+    if caminho.endswith(".gz"):
+        return gzip.open(caminho, "wt", encoding="utf-8")
+    return open(caminho, "w", encoding="utf-8")
+
+
+def ler_corpus(caminho):
+    """Documentos de um NDJSON gerado por este script (.gz aceito)."""
+    abrir = gzip.open if caminho.endswith(".gz") else open
+    with abrir(caminho, "rt", encoding="utf-8") as f:
+        for linha in f:
+            if linha.strip():
+                yield json.loads(linha)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera um corpus sintético de atos normativos em NDJSON.")
+    parser.add_argument("--documentos", type=int, default=10000)
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--inicio", type=int, default=0, help="Índice do primeiro documento (gerar em fatias)")
+    parser.add_argument("--artigos-max", type=int, default=20, help="Artigos por documento, no máximo")
+    parser.add_argument("--saida", help="Arquivo .ndjson ou .ndjson.gz (padrão: saída padrão)")
+    args = parser.parse_args()
+
+    saida = abrir_saida(args.saida)
+    try:
+        for doc in gerar_documentos(args.documentos, args.semente, args.inicio, args.artigos_max):
+            saida.write(json.dumps(doc, ensure_ascii=False) + "\n")
+    finally:
+        if saida is not sys.stdout:
+            saida.close()
@@ -0,0 +1,92 @@
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+from PyPDF2 import PdfReader
+from docx import Document
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from metadados_legais import extrair_metadados
+from concorrencia_api import percentil
+
+# ⏱️ Micro-benchmark da extração de metadados com os arquivos de documentos/
+# Compara o extrator de passada única (metadados_legais.py) com as quatro
+# buscas sobre o texto inteiro que o importador usava, sobre o texto completo
+# de cada arquivo — o pior caso para buscas que não encontram nada.
+#
+#   python benchmarks/metadados.py --repeticoes 200 --saida metadados.json
+
+PASTA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "documentos")
+
+
+# Versão anterior, mantida aqui só como referência de comparação
+def extrair_metadados_anterior(texto):
+    titulo = re.search(r"(Portaria|Decreto|Lei|Instrução Normativa|Resolução|Manual)[^\n]{0,100}", texto)
+    numero = re.search(r"n[ºo]?\s*(\d{3,6})", texto)
+    ano = re.search(r"\b(20\d{2}|19\d{2})\b", texto)
+    data = re.search(r"\b(\d{2}/\d{2}/\d{4})\b", texto)
+    return {
+        "titulo": titulo.group(0) if titulo else "Documento sem título",
+        "numero": numero.group(1) if numero else "0000",
+        "ano": int(ano.group(1)) if ano else 2025,
+        "data_publicacao": data.group(1).replace("/", "-") if data else "2025-01-01",
+    }
+
+
+def ler_texto(caminho):
+    if caminho.lower().endswith(".pdf"):
+        return "\n".join(p.extract_text() or "" for p in PdfReader(caminho).pages)
+    if caminho.lower().endswith(".docx"):
+        return "\n".join(p.text for p in Document(caminho).paragraphs)
+    return None
+
+
+def medir(funcao, texto, repeticoes):
+    latencias = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao(texto)
+        latencias.append(time.perf_counter() - inicio)
+    return {
+        "p50_ms": percentil(latencias, 50),
+        "p95_ms": percentil(latencias, 95),
+        "p99_ms": percentil(latencias, 99),
+    }, resultado
+
+
+def executar(pasta, repeticoes):
+    arquivos = []
+    for arquivo in sorted(os.listdir(pasta)):
+        texto = ler_texto(os.path.join(pasta, arquivo))
+        if not texto:
+            continue
+        antes, campos_antes = medir(extrair_metadados_anterior, texto, repeticoes)
+        depois, doc = medir(lambda t: extrair_metadados(t, arquivo), texto, repeticoes)
+        arquivos.append({
+            "arquivo": arquivo,
+            "tamanho_texto": len(texto),
+            "anterior": antes,
+            "passada_unica": depois,
+            "campos_anterior": campos_antes,
+            "campos_passada_unica": {c: doc[c] for c in ("titulo", "numero", "ano", "data_publicacao")},
+            "confianca": doc["confianca"],
+        })
+    return {"repeticoes": repeticoes, "arquivos": arquivos}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mede a extração de metadados com os arquivos de documentos/.")
+    parser.add_argument("--pasta", default=PASTA)
+    parser.add_argument("--repeticoes", type=int, default=100)
+    parser.add_argument("--saida", help="Arquivo JSON para gravar o resultado")
+    args = parser.parse_args()
+
+    resultado = executar(args.pasta, args.repeticoes)
+    texto = json.dumps(resultado, ensure_ascii=False, indent=2)
+    print(texto)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            f.write(texto + "\n")
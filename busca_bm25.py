@@ -0,0 +1,418 @@
+import argparse
+import heapq
+import json
+import math
+import mmap
+import os
+import re
+import threading
+import time
+import uuid
+
+import numpy as np
+import psycopg2
+import snowballstemmer
+from dotenv import load_dotenv
+
+from armazem_textos import texto_do_documento
+
+load_dotenv()
+
+# 🔍 Backend de busca BM25 próprio, alternativo ao FTS do PostgreSQL.
+# O índice invertido (postings, posições e tamanhos) é gravado em segmentos
+# binários e mapeado em memória na consulta: abrir o índice é instantâneo e
+# as páginas ficam no cache do sistema, compartilhadas entre os workers.
+#
+#   python busca_bm25.py --construir            (gera/atualiza o índice)
+#   python busca_bm25.py --consulta "aprendiz"  (consulta de teste)
+
+PASTA_INDICE = os.getenv("BUSCA_BM25_PASTA", os.path.join(os.path.dirname(os.path.abspath(__file__)), "indice_bm25"))
+ARQUIVO_MANIFESTO = "indice.json"
+DOCUMENTOS_POR_SEGMENTO = 5000
+
+# Parâmetros clássicos do BM25
+K1 = 1.2
+B = 0.75
+
+MAGICO = b"BM25SEG1"
+ALINHAMENTO = 64
+
+STOPWORDS = frozenset("""
+a à ao aos aquela aquelas aquele aqueles aquilo as às até com como da das de dela delas dele
+deles depois do dos e é ela elas ele eles em entre era eram essa essas esse esses esta está
+estão estas este estes eu foi foram há isso isto já lhe lhes mais mas me mesmo meu meus minha
+minhas muito na não nas nem no nos nós nossa nossas nosso nossos num numa o os ou para pela
+pelas pelo pelos por qual quando que quem são se seja sem ser seu seus só sua suas também te
+tem têm teu teus tu tua tuas um uma umas uns você vocês vos
+""".split())
+
+_PALAVRA = re.compile(r"\w+")
+_FRASE = re.compile(r'"([^"]+)"')
+
+_stemmer = threading.local()
+_radicais = {}
+
+
+def _radical(palavra):
+    radical = _radicais.get(palavra)
+    if radical is None:
+        if not hasattr(_stemmer, "pt"):
+            _stemmer.pt = snowballstemmer.stemmer("portuguese")
+        radical = _stemmer.pt.stemWord(palavra)
+        if len(_radicais) < 200000:
+            _radicais[palavra] = radical
+    return radical
+
+
+def analisar(texto):
+    """Tokens do texto como pares (posição, radical), sem stopwords.
+
+    A posição conta também as stopwords, para frases como "contrato de
+    aprendizagem" casarem pela distância original entre as palavras.
+    """
+    return [
+        (posicao, _radical(palavra))
+        for posicao, palavra in enumerate(_PALAVRA.findall((texto or "").lower()))
+        if palavra not in STOPWORDS
+    ]
+
+
+def analisar_consulta(consulta):
+    """Termos da consulta e frases entre aspas (listas de (deslocamento, radical)).
+
+    Operadores do to_tsquery (&, |, !, :*) são ignorados: o BM25 pontua
+    qualquer termo presente e as frases funcionam como filtro.
+    """
+    frases = [analisar(f) for f in _FRASE.findall(consulta)]
+    frases = [[(p - f[0][0], r) for p, r in f] for f in frases if len(f) > 1]
+    termos = list(dict.fromkeys(r for _, r in analisar(consulta.replace('"', " "))))
+    return termos, frases
+
+
+# ---------------------------------------------------------------------------
+# Construção
+# ---------------------------------------------------------------------------
+
+def _gravar_segmento(caminho, docs, postings):
+    """Grava um segmento: cabeçalho JSON com o mapa dos arrays, depois os arrays alinhados."""
+    termos = sorted(postings, key=lambda t: t.encode("utf-8"))
+    blob = [t.encode("utf-8") for t in termos]
+    termo_inicio = np.zeros(len(termos) + 1, dtype=np.int64)
+    termo_inicio[1:] = np.cumsum([len(t) for t in blob])
+    post_inicio = np.zeros(len(termos) + 1, dtype=np.int64)
+    post_docs, post_freq, pos_inicio, posicoes = [], [], [0], []
+    for i, termo in enumerate(termos):
+        lista = postings[termo]
+        post_inicio[i + 1] = post_inicio[i] + len(lista)
+        for doc, pos in lista:
+            post_docs.append(doc)
+            post_freq.append(len(pos))
+            posicoes.extend(pos)
+            pos_inicio.append(len(posicoes))
+
+    arrays = {
+        "doc_ids": np.array([d[0] for d in docs], dtype=np.int64),
+        "doc_tam": np.array([d[1] for d in docs], dtype=np.int32),
+        "doc_tipo": np.array([d[2] for d in docs], dtype=np.int32),
+        "doc_orgao": np.array([d[3] for d in docs], dtype=np.int32),
+        "doc_ano": np.array([d[4] for d in docs], dtype=np.int32),
+        "termo_inicio": termo_inicio,
+        "termos": np.frombuffer(b"".join(blob), dtype=np.uint8),
+        "post_inicio": post_inicio,
+        "post_docs": np.array(post_docs, dtype=np.int32),
+        "post_freq": np.array(post_freq, dtype=np.int32),
+        "pos_inicio": np.array(pos_inicio, dtype=np.int64),
+        "posicoes": np.array(posicoes, dtype=np.int32),
+    }
+    mapa, deslocamento = {}, 0
+    for nome, arr in arrays.items():
+        mapa[nome] = [arr.dtype.str, deslocamento, int(arr.size)]
+        deslocamento += -(-arr.nbytes // ALINHAMENTO) * ALINHAMENTO
+    cabecalho = json.dumps({"documentos": len(docs), "termos": len(termos), "arrays": mapa}).encode("utf-8")
+    inicio_dados = -(-(len(MAGICO) + 8 + len(cabecalho)) // ALINHAMENTO) * ALINHAMENTO
+
+    temporario = caminho + ".tmp"
+    with open(temporario, "wb") as f:
+        f.write(MAGICO)
+        f.write(len(cabecalho).to_bytes(8, "little"))
+        f.write(cabecalho)
+        for nome, arr in arrays.items():
+            f.seek(inicio_dados + mapa[nome][1])
+            f.write(arr.tobytes())
+        f.truncate(inicio_dados + deslocamento)
+    os.replace(temporario, caminho)
+
+
+def construir_indice(conn, pasta=PASTA_INDICE, documentos_por_segmento=DOCUMENTOS_POR_SEGMENTO):
+    """Reconstrói o índice a partir de titulo + ementa + texto completo dos documentos ativos.
+
+    Os segmentos novos são gravados ao lado dos antigos e o manifesto é trocado
+    por último, de forma atômica: consultas em andamento não veem índice parcial.
+    """
+    os.makedirs(pasta, exist_ok=True)
+    # Nome único por construção: duas reconstruções no mesmo segundo, ou em
+    # processos diferentes, não gravam uma sobre os segmentos da outra
+    geracao = f"{time.strftime('%Y%m%d%H%M%S')}_{os.getpid()}_{uuid.uuid4().hex[:8]}"
+    inicio = time.time()
+    segmentos, total_docs, total_tokens = [], 0, 0
+
+    # Cursor nomeado: os textos chegam em blocos, não todos de uma vez
+    cur = conn.cursor(name="indice_bm25")
+    cur.itersize = 200
+    cur.execute("""
+        SELECT id, titulo, ementa, conteudo_texto, texto_hash, tipo_documento_id, orgao_id, ano
+        FROM documentos WHERE removido_em IS NULL ORDER BY id;
+    """)
+
+    docs, postings = [], {}
+
+    def fechar_segmento():
+        nome = f"seg_{geracao}_{len(segmentos):04d}.bm25"
+        _gravar_segmento(os.path.join(pasta, nome), docs, postings)
+        segmentos.append(nome)
+
+    for id_, titulo, ementa, conteudo, texto_hash, tipo, orgao, ano in cur:
+        conteudo = texto_do_documento(conteudo, texto_hash)
+        tokens = analisar(" ".join(t for t in (titulo, ementa, conteudo) if t))
+        local = len(docs)
+        docs.append((id_, len(tokens), tipo or -1, orgao or -1, ano or -1))
+        total_tokens += len(tokens)
+        por_termo = {}
+        for posicao, radical in tokens:
+            por_termo.setdefault(radical, []).append(posicao)
+        for radical, posicoes in por_termo.items():
+            postings.setdefault(radical, []).append((local, posicoes))
+        if len(docs) >= documentos_por_segmento:
+            fechar_segmento()
+            total_docs += len(docs)
+            docs, postings = [], {}
+    cur.close()
+    conn.rollback()
+    if docs:
+        fechar_segmento()
+        total_docs += len(docs)
+
+    caminho = os.path.join(pasta, ARQUIVO_MANIFESTO)
+    try:
+        with open(caminho, encoding="utf-8") as f:
+            anteriores = json.load(f)["segmentos"]
+    except (OSError, ValueError, KeyError):
+        anteriores = []
+
+    manifesto = {
+        "segmentos": segmentos,
+        "anteriores": anteriores,
+        "documentos": total_docs,
+        "tamanho_medio": total_tokens / total_docs if total_docs else 0.0,
+        "construido_em": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    temporario = f"{caminho}.{geracao}.tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(manifesto, f, ensure_ascii=False, indent=2)
+    os.replace(temporario, caminho)
+
+    # Segmentos de gerações antigas: quem já os tem mapeados continua lendo
+    # (o mmap sobrevive à remoção). Os da geração anterior ficam até a próxima
+    # construção, para quem leu o manifesto antigo e ainda vai abri-los; os
+    # gravados depois do início desta são de uma construção concorrente.
+    manter = set(segmentos) | set(anteriores)
+    for nome in os.listdir(pasta):
+        arquivo = os.path.join(pasta, nome)
+        if nome.endswith(".bm25") and nome not in manter and os.path.getmtime(arquivo) < inicio:
+            os.remove(arquivo)
+    return manifesto
+
+
+# ---------------------------------------------------------------------------
+# Consulta
+# ---------------------------------------------------------------------------
+
+class Segmento:
+    def __init__(self, caminho):
+        with open(caminho, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(MAGICO)] != MAGICO:
+            raise ValueError(f"Segmento inválido: {caminho}")
+        tamanho = int.from_bytes(self._mm[len(MAGICO):len(MAGICO) + 8], "little")
+        inicio = len(MAGICO) + 8
+        cabecalho = json.loads(self._mm[inicio:inicio + tamanho])
+        inicio_dados = -(-(inicio + tamanho) // ALINHAMENTO) * ALINHAMENTO
+        for nome, (dtype, deslocamento, quantidade) in cabecalho["arrays"].items():
+            setattr(self, nome, np.frombuffer(self._mm, dtype=np.dtype(dtype), count=quantidade,
+                                              offset=inicio_dados + deslocamento))
+        self.n_docs = cabecalho["documentos"]
+        self.n_termos = cabecalho["termos"]
+
+    def _termo(self, i):
+        return self.termos[self.termo_inicio[i]:self.termo_inicio[i + 1]].tobytes()
+
+    def localizar(self, termo):
+        """Índice do termo no dicionário ordenado (busca binária no mapa), ou -1."""
+        alvo = termo.encode("utf-8")
+        baixo, alto = 0, self.n_termos
+        while baixo < alto:
+            meio = (baixo + alto) // 2
+            if self._termo(meio) < alvo:
+                baixo = meio + 1
+            else:
+                alto = meio
+        if baixo < self.n_termos and self._termo(baixo) == alvo:
+            return baixo
+        return -1
+
+    def df(self, indice):
+        return int(self.post_inicio[indice + 1] - self.post_inicio[indice]) if indice >= 0 else 0
+
+    def pontuar(self, termos, idf, tamanho_medio):
+        """Escores BM25 de todos os documentos do segmento, de uma vez por termo."""
+        docs, pesos = [], []
+        for termo, indice in termos:
+            if indice < 0:
+                continue
+            a, z = self.post_inicio[indice], self.post_inicio[indice + 1]
+            d = self.post_docs[a:z]
+            f = self.post_freq[a:z].astype(np.float32)
+            norma = K1 * (1 - B + B * self.doc_tam[d] / tamanho_medio)
+            docs.append(d)
+            pesos.append(idf[termo] * f * (K1 + 1) / (f + norma))
+        if not docs:
+            return None
+        return np.bincount(np.concatenate(docs), weights=np.concatenate(pesos), minlength=self.n_docs)
+
+    def _posicoes(self, indice, doc):
+        a, z = self.post_inicio[indice], self.post_inicio[indice + 1]
+        p = a + np.searchsorted(self.post_docs[a:z], doc)
+        return self.posicoes[self.pos_inicio[p]:self.pos_inicio[p + 1]].tolist()
+
+    def contem_frase(self, frase, candidatos):
+        """Máscara dos candidatos que têm os radicais da frase nas distâncias originais."""
+        indices = [(deslocamento, self.localizar(r)) for deslocamento, r in frase]
+        mascara = np.ones(len(candidatos), dtype=bool)
+        for _, indice in indices:
+            if indice < 0:
+                return np.zeros(len(candidatos), dtype=bool)
+            mascara &= np.isin(candidatos, self.post_docs[self.post_inicio[indice]:self.post_inicio[indice + 1]])
+        # Só os documentos com todos os termos chegam à comparação de posições
+        for j in np.flatnonzero(mascara):
+            inicios = None
+            for deslocamento, indice in indices:
+                posicoes = {p - deslocamento for p in self._posicoes(indice, candidatos[j])}
+                inicios = posicoes if inicios is None else inicios & posicoes
+                if not inicios:
+                    break
+            mascara[j] = bool(inicios)
+        return mascara
+
+
+class IndiceAusenteError(Exception):
+    """Ainda não há índice construído na pasta."""
+
+
+class IndiceBM25:
+    def __init__(self, pasta=PASTA_INDICE):
+        self.pasta = pasta
+        self._lock = threading.Lock()
+        self._versao = None
+        self._estado = None
+
+    def _carregar(self):
+        # Reabre quando o manifesto muda (índice reconstruído); custo: um stat por consulta
+        caminho = os.path.join(self.pasta, ARQUIVO_MANIFESTO)
+        for tentativa in range(3):
+            try:
+                versao = os.stat(caminho).st_mtime_ns
+                if versao == self._versao:
+                    return self._estado
+                with self._lock:
+                    if versao != self._versao:
+                        with open(caminho, encoding="utf-8") as f:
+                            manifesto = json.load(f)
+                        segmentos = [Segmento(os.path.join(self.pasta, n)) for n in manifesto["segmentos"]]
+                        self._estado = (manifesto, segmentos)
+                        self._versao = versao
+                    return self._estado
+            except FileNotFoundError:
+                if not os.path.exists(caminho):
+                    raise IndiceAusenteError(
+                        f"Índice BM25 não encontrado em {self.pasta} (python busca_bm25.py --construir)."
+                    )
+                # Manifesto trocado entre a leitura e a abertura dos segmentos: relê
+                if tentativa == 2:
+                    raise
+
+    def buscar(self, consulta, limite=50, tipo=None, orgao=None, ano=None):
+        """Os `limite` documentos de maior escore, como pares (id, escore)."""
+        manifesto, segmentos = self._carregar()
+        termos, frases = analisar_consulta(consulta)
+        if not termos or not manifesto["documentos"]:
+            return []
+
+        localizados = [[(t, s.localizar(t)) for t in termos] for s in segmentos]
+        n = manifesto["documentos"]
+        idf = {}
+        for j, termo in enumerate(termos):
+            df = sum(s.df(loc[j][1]) for s, loc in zip(segmentos, localizados))
+            idf[termo] = math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+        melhores = []
+        for segmento, termos_seg in zip(segmentos, localizados):
+            escores = segmento.pontuar(termos_seg, idf, manifesto["tamanho_medio"])
+            if escores is None:
+                continue
+            mascara = escores > 0
+            for valor, coluna in ((tipo, segmento.doc_tipo), (orgao, segmento.doc_orgao), (ano, segmento.doc_ano)):
+                if valor:
+                    mascara &= coluna == int(valor)
+            candidatos = np.flatnonzero(mascara)
+            for frase in frases:
+                candidatos = candidatos[segmento.contem_frase(frase, candidatos)]
+            if candidatos.size > limite:
+                candidatos = candidatos[np.argpartition(-escores[candidatos], limite)[:limite]]
+            melhores.extend(zip(escores[candidatos].tolist(), segmento.doc_ids[candidatos].tolist()))
+        return [(id_, escore) for escore, id_ in heapq.nlargest(limite, melhores)]
+
+
+def destacar(texto, consulta, inicio="<mark>", fim="</mark>"):
+    """Marca no texto as palavras cujo radical está na consulta (o ts_headline do BM25)."""
+    if not texto:
+        return texto
+    termos = set(analisar_consulta(consulta)[0])
+    return _PALAVRA.sub(
+        lambda m: f"{inicio}{m.group(0)}{fim}" if m.group(0).lower() not in STOPWORDS
+        and _radical(m.group(0).lower()) in termos else m.group(0),
+        texto,
+    )
+
+
+def conectar():
+    return psycopg2.connect(
+        dbname=os.getenv("DB_NAME"),
+        user=os.getenv("DB_USER"),
+        password=os.getenv("DB_PASSWORD"),
+        host=os.getenv("DB_HOST"),
+        port=os.getenv("DB_PORT"),
+        client_encoding='UTF8'
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Índice BM25 dos documentos (backend alternativo de busca).")
+    parser.add_argument("--pasta", default=PASTA_INDICE, help="Pasta dos segmentos do índice")
+    parser.add_argument("--construir", action="store_true", help="Reconstrói o índice a partir do banco")
+    parser.add_argument("--segmento", type=int, default=DOCUMENTOS_POR_SEGMENTO,
+                        help="Documentos por segmento")
+    parser.add_argument("--consulta", help="Executa uma consulta e mostra os ids encontrados")
+    args = parser.parse_args()
+
+    if args.construir:
+        inicio = time.perf_counter()
+        conn = conectar()
+        try:
+            manifesto = construir_indice(conn, args.pasta, args.segmento)
+        finally:
+            conn.close()
+        print(f"📚 {manifesto['documentos']} documento(s) em {len(manifesto['segmentos'])} segmento(s), "
+              f"{time.perf_counter() - inicio:.1f}s.")
+    if args.consulta:
+        for id_, escore in IndiceBM25(args.pasta).buscar(args.consulta, limite=10):
+            print(f"{id_}\t{escore:.4f}")
@@ -0,0 +1,74 @@
+import threading
+import time
+from collections import OrderedDict
+
+_AUSENTE = object()
+
+
+# 🧠 Cache em memória com limite de tamanho (LRU) e tempo de vida por entrada
+class CacheTTL:
+    def __init__(self, maximo=1000, ttl=60.0):
+        self.maximo = maximo
+        self.ttl = ttl
+        self._dados = OrderedDict()  # chave → (valor, instante de expiração, tamanho)
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.acertos = 0
+        self.falhas = 0
+        self.expiradas = 0
+        self.despejadas = 0
+
+    def obter(self, chave, padrao=None):
+        agora = time.monotonic()
+        with self._lock:
+            item = self._dados.get(chave, _AUSENTE)
+            if item is not _AUSENTE:
+                valor, expira_em, tamanho = item
+                if expira_em > agora:
+                    self._dados.move_to_end(chave)
+                    self.acertos += 1
+                    return valor
+                del self._dados[chave]
+                self._bytes -= tamanho
+                self.expiradas += 1
+            self.falhas += 1
+            return padrao
+
+    def guardar(self, chave, valor, tamanho=0):
+        """Guarda o valor; `tamanho` (em bytes, se conhecido) entra na métrica de memória."""
+        with self._lock:
+            anterior = self._dados.pop(chave, None)
+            if anterior is not None:
+                self._bytes -= anterior[2]
+            self._dados[chave] = (valor, time.monotonic() + self.ttl, tamanho)
+            self._bytes += tamanho
+            while len(self._dados) > self.maximo:
+                _, (_, _, tamanho_despejado) = self._dados.popitem(last=False)
+                self._bytes -= tamanho_despejado
+                self.despejadas += 1
+
+    def invalidar(self, chave):
+        with self._lock:
+            item = self._dados.pop(chave, None)
+            if item is not None:
+                self._bytes -= item[2]
+
+    def limpar(self):
+        with self._lock:
+            self._dados.clear()
+            self._bytes = 0
+
+    def metricas(self):
+        with self._lock:
+            consultas = self.acertos + self.falhas
+            return {
+                "entradas": len(self._dados),
+                "maximo": self.maximo,
+                "bytes": self._bytes,
+                "ttl": self.ttl,
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+                "taxa_acerto": round(self.acertos / consultas, 3) if consultas else 0.0,
+                "expiradas": self.expiradas,
+                "despejadas": self.despejadas,
+            }
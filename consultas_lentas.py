@@ -0,0 +1,251 @@
+import argparse
+import glob
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+
+from psycopg2 import extensions
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# 🐢 Log de consultas lentas: todo comando que passa do limiar é gravado em
+# um log JSON Lines rotativo com o SQL parametrizado, os valores (redigidos)
+# e, para uma amostra, o plano de EXPLAIN (ANALYZE, BUFFERS). O SQL de
+# /api/search muda conforme os filtros, então cada "forma" (o texto do SQL,
+# sem valores) é resumida separadamente:
+#
+#   python consultas_lentas.py              # piores formas por tempo total
+#   python consultas_lentas.py --forma 3fa2c1d0e9b4   # SQL e último plano
+
+LIMIAR_MS = float(os.getenv("CONSULTA_LENTA_MS", "500"))  # 0 desliga
+# Fração das consultas lentas que ganham EXPLAIN ANALYZE (a consulta roda de
+# novo, na mesma conexão: a requisição sorteada paga esse tempo a mais)
+AMOSTRA_EXPLAIN = float(os.getenv("CONSULTA_LENTA_AMOSTRA", "0.1"))
+# No máximo um plano por forma a cada intervalo (segundos)
+INTERVALO_EXPLAIN = float(os.getenv("CONSULTA_LENTA_EXPLAIN_INTERVALO", "300"))
+# Redação: textos viram tamanho + hash, e literais somem do SQL e dos planos
+REDIGIR = os.getenv("CONSULTA_LENTA_REDIGIR", "1") != "0"
+ARQUIVO_LOG = os.getenv(
+    "CONSULTA_LENTA_LOG",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs", "consultas_lentas.jsonl"),
+)
+LOG_MAX_BYTES = int(os.getenv("CONSULTA_LENTA_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_ARQUIVOS = int(os.getenv("CONSULTA_LENTA_LOG_ARQUIVOS", "5"))
+
+LIMIAR_SEGUNDOS = LIMIAR_MS / 1000 if LIMIAR_MS > 0 else float("inf")
+
+_MODIFICA_DADOS = re.compile(r"\b(INSERT|UPDATE|DELETE|MERGE|TRUNCATE|CREATE|DROP|ALTER|COPY|LOCK)\b", re.IGNORECASE)
+_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMERO = re.compile(r"(?<![\w$.])\d+(?:\.\d+)?(?![\w.])")
+# execute_values embute as linhas no texto: "VALUES (...), (...), ..." vira
+# uma só tupla, para que lotes de tamanhos diferentes tenham a mesma forma
+# Linhas do plano que repetem os valores da consulta ("Filter: (ano = 2020)");
+# custos, tempos e contagens de linhas ficam como estão
+_CONDICAO_PLANO = re.compile(
+    r"^(\s*(?:Filter|Join Filter|One-Time Filter|Index Cond|Recheck Cond|Hash Cond|Merge Cond|TID Cond):)(.*)$",
+    re.MULTILINE,
+)
+_VALORES = re.compile(r"(\bVALUES\s*\([^()]*\))(?:\s*,\s*\([^()]*\))+", re.IGNORECASE)
+
+_logger = None
+_logger_lock = threading.Lock()
+_ultimo_explain = {}  # forma → instante (monotônico) do último plano capturado
+_explain_lock = threading.Lock()
+FORMAS_EXPLAIN_MAX = 1000
+
+
+def _obter_logger():
+    global _logger
+    if _logger is None:
+        with _logger_lock:
+            if _logger is None:
+                os.makedirs(os.path.dirname(ARQUIVO_LOG), exist_ok=True)
+                logger = logging.getLogger("consultas_lentas")
+                logger.setLevel(logging.INFO)
+                logger.propagate = False
+                handler = RotatingFileHandler(
+                    ARQUIVO_LOG, maxBytes=LOG_MAX_BYTES, backupCount=LOG_ARQUIVOS, encoding="utf-8"
+                )
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                logger.addHandler(handler)
+                _logger = logger
+    return _logger
+
+
+def forma_sql(sql):
+    """SQL sem espaços redundantes e o hash que identifica a forma."""
+    texto = " ".join(sql.split())
+    return texto, hashlib.sha1(texto.encode("utf-8")).hexdigest()[:12]
+
+
+def redigir_sql(sql):
+    """SQL sem os valores embutidos no texto: strings e números viram "?"."""
+    sql = _NUMERO.sub("?", _LITERAL.sub("'?'", sql))
+    return _VALORES.sub(r"\1, ...", sql)
+
+
+def _pode_explicar(forma, agora):
+    # Chamada pelas threads das requisições ao mesmo tempo
+    with _explain_lock:
+        if agora - _ultimo_explain.get(forma, float("-inf")) < INTERVALO_EXPLAIN:
+            return False
+        if len(_ultimo_explain) >= FORMAS_EXPLAIN_MAX:
+            # Formas cujo intervalo já passou não bloqueiam nada: podem sair
+            for antiga, instante in list(_ultimo_explain.items()):
+                if agora - instante >= INTERVALO_EXPLAIN:
+                    del _ultimo_explain[antiga]
+            if len(_ultimo_explain) >= FORMAS_EXPLAIN_MAX:
+                return False
+        _ultimo_explain[forma] = agora
+        return True
+
+
+def redigir(valor):
+    if not REDIGIR:
+        return valor if isinstance(valor, (int, float, bool, type(None))) else str(valor)
+    if valor is None or isinstance(valor, (int, float, bool)):
+        return valor
+    if isinstance(valor, (list, tuple)):
+        return [redigir(v) for v in valor]
+    if isinstance(valor, dict):
+        return {chave: redigir(v) for chave, v in valor.items()}
+    texto = str(valor)
+    # O hash curto permite ver que duas ocorrências usaram o mesmo valor
+    return f"<texto {len(texto)} hash={hashlib.sha1(texto.encode('utf-8')).hexdigest()[:8]}>"
+
+
+def _capturar_plano(conn, sql, parametros):
+    # Só comandos de leitura são executados de novo (ANALYZE); os demais ganham
+    # o plano estimado. Tudo roda num savepoint desfeito em seguida, para não
+    # alterar a transação de quem fez a consulta nem deixá-la abortada.
+    analisar = not _MODIFICA_DADOS.search(sql)
+    opcoes = "ANALYZE, BUFFERS" if analisar else "COSTS"
+    status = conn.get_transaction_status()
+    if status not in (extensions.TRANSACTION_STATUS_IDLE, extensions.TRANSACTION_STATUS_INTRANS):
+        return None, analisar
+    em_transacao = status == extensions.TRANSACTION_STATUS_INTRANS
+    cur = conn.cursor(cursor_factory=extensions.cursor)
+    try:
+        cur.execute("SAVEPOINT consulta_lenta" if em_transacao else "BEGIN")
+        try:
+            cur.execute(f"EXPLAIN ({opcoes}) {sql}", parametros)
+            plano = "\n".join(linha for linha, in cur.fetchall())
+        finally:
+            if em_transacao:
+                cur.execute("ROLLBACK TO SAVEPOINT consulta_lenta")
+                cur.execute("RELEASE SAVEPOINT consulta_lenta")
+            else:
+                cur.execute("ROLLBACK")
+    except Exception as e:
+        plano = f"(plano indisponível: {e})"
+    finally:
+        cur.close()
+    if REDIGIR:
+        plano = _CONDICAO_PLANO.sub(lambda m: m.group(1) + _NUMERO.sub("?", m.group(2)), _LITERAL.sub("'?'", plano))
+    return plano, analisar
+
+
+def registrar_consulta_lenta(cursor, sql, parametros, duracao, rotulo=None, lote=False):
+    """Grava uma consulta que passou do limiar; chamada pelo CursorMedido.
+
+    Sem parâmetros, os valores (se houver) já vieram embutidos no SQL, como no
+    execute_values: o comando é tratado como lote, sem EXPLAIN.
+    """
+    lote = lote or parametros is None
+    try:
+        if isinstance(sql, bytes):
+            sql = sql.decode("utf-8", "replace")
+        elif not isinstance(sql, str):
+            sql = sql.as_string(cursor.connection)  # psycopg2.sql.Composed
+        texto, forma = forma_sql(redigir_sql(sql) if REDIGIR else sql)
+        registro = {
+            "data": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            "forma": forma,
+            "rotulo": rotulo,
+            "duracao_ms": round(duracao * 1000, 2),
+            "sql": texto,
+            "parametros": None if lote else redigir(parametros),
+            "plano": None,
+        }
+        if not lote and random.random() < AMOSTRA_EXPLAIN and _pode_explicar(forma, time.monotonic()):
+            registro["plano"], registro["plano_analisado"] = _capturar_plano(cursor.connection, sql, parametros)
+        _obter_logger().info(json.dumps(registro, ensure_ascii=False, default=str))
+    except Exception as e:
+        # O log nunca derruba a consulta que já foi atendida
+        logging.getLogger(__name__).warning("Falha ao registrar consulta lenta: %s", e)
+
+
+# 📋 Resumo: lê o log atual e os rotacionados
+def ler_registros(arquivo=ARQUIVO_LOG):
+    for caminho in sorted(glob.glob(arquivo + "*"), reverse=True):
+        with open(caminho, encoding="utf-8") as f:
+            for linha in f:
+                try:
+                    yield json.loads(linha)
+                except json.JSONDecodeError:
+                    continue
+
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+def resumir(registros):
+    formas = {}
+    for r in registros:
+        f = formas.setdefault(r["forma"], {"forma": r["forma"], "rotulo": r.get("rotulo"), "sql": r["sql"],
+                                           "duracoes": [], "ultimo": None, "plano": None})
+        f["duracoes"].append(r["duracao_ms"])
+        f["ultimo"] = r["data"]
+        if r.get("plano"):
+            f["plano"] = r["plano"]
+    resumo = []
+    for f in formas.values():
+        duracoes = f.pop("duracoes")
+        resumo.append({
+            **f,
+            "ocorrencias": len(duracoes),
+            "total_ms": round(sum(duracoes), 2),
+            "p50_ms": _percentil(duracoes, 50),
+            "p95_ms": _percentil(duracoes, 95),
+            "max_ms": max(duracoes),
+        })
+    resumo.sort(key=lambda f: f["total_ms"], reverse=True)
+    return resumo
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Resume o log de consultas lentas por forma de SQL.")
+    parser.add_argument("--arquivo", default=ARQUIVO_LOG)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--forma", help="Mostra o SQL completo e o último plano de uma forma")
+    parser.add_argument("--json", action="store_true", help="Saída em JSON")
+    args = parser.parse_args()
+
+    resumo = resumir(ler_registros(args.arquivo))
+    if args.forma:
+        resumo = [f for f in resumo if f["forma"].startswith(args.forma)]
+    else:
+        resumo = resumo[:args.top]
+
+    if args.json:
+        print(json.dumps(resumo, ensure_ascii=False, indent=2))
+    elif not resumo:
+        print("✅ Nenhuma consulta lenta registrada.")
+    else:
+        print(f"{'forma':<13} {'rótulo':<26} {'n':>6} {'total ms':>11} {'p50':>9} {'p95':>9} {'máx':>9}  plano")
+        for f in resumo:
+            print(f"{f['forma']:<13} {(f['rotulo'] or '')[:26]:<26} {f['ocorrencias']:>6} {f['total_ms']:>11.1f} "
+                  f"{f['p50_ms']:>9.1f} {f['p95_ms']:>9.1f} {f['max_ms']:>9.1f}  {'sim' if f['plano'] else '-'}")
+            if args.forma:
+                print(f"\n{f['sql']}\n")
+                print(f["plano"] or "(sem plano capturado)")
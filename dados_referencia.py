@@ -0,0 +1,144 @@
+import hashlib
+import json
+import threading
+import time
+
+# Campo do documento → tabela de referência com (id, nome)
+TABELAS = {
+    "tipo": "tipos_documento",
+    "orgao": "orgaos",
+    "status": "status",
+    "prioridade": "prioridade",
+}
+
+# Anos distintos por "skip scan" no índice documentos_ano_idx: um salto por ano,
+# em vez do SELECT DISTINCT que lê a tabela inteira
+SQL_ANOS = """
+    WITH RECURSIVE anos AS (
+        (SELECT max(ano) AS ano FROM documentos)
+        UNION ALL
+        SELECT (SELECT max(d.ano) FROM documentos d WHERE d.ano < anos.ano)
+        FROM anos WHERE anos.ano IS NOT NULL
+    )
+    SELECT ano FROM anos WHERE ano IS NOT NULL;
+"""
+
+# Intervalo mínimo entre recargas forçadas por nomes desconhecidos
+RECARGA_MINIMA = 5.0
+
+
+class ReferenciaDesconhecidaError(ValueError):
+    def __init__(self, campo, nome, validos):
+        self.campo = campo
+        self.nome = nome
+        super().__init__(f"Valor desconhecido para '{campo}': '{nome}'. Valores aceitos: {', '.join(sorted(validos))}.")
+
+
+# 📚 Tabelas de referência em memória, recarregadas por TTL ou ao ser invalidadas
+class CacheReferencia:
+    def __init__(self, pool, ttl=300.0):
+        self.pool = pool
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._dados = None
+        self._expira_em = 0.0
+        self._carregado_em = 0.0
+        self.recargas = 0
+
+    def _carregar(self, conn):
+        cur = conn.cursor()
+        ids, listas = {}, {}
+        for campo, tabela in TABELAS.items():
+            cur.execute(f"SELECT id, nome FROM {tabela} ORDER BY nome;")
+            linhas = cur.fetchall()
+            ids[campo] = {nome: id_ for id_, nome in linhas}
+            listas[campo] = [{"id": id_, "nome": nome} for id_, nome in linhas]
+        cur.execute(SQL_ANOS)
+        anos = [r[0] for r in cur.fetchall()]
+        cur.close()
+        return self._montar(ids, listas, anos)
+
+    def _montar(self, ids, listas, anos):
+        filtros = {"tipos": listas["tipo"], "orgaos": listas["orgao"], "anos": anos}
+        corpo = json.dumps(filtros, sort_keys=True, ensure_ascii=False).encode("utf-8")
+        return {
+            "ids": ids,
+            "listas": listas,
+            "anos": anos,
+            "filtros": filtros,
+            "etag": hashlib.sha1(corpo).hexdigest(),
+        }
+
+    def _obter(self, conn=None):
+        dados = self._dados
+        if dados is not None and time.monotonic() < self._expira_em:
+            return dados
+        with self._lock:
+            # Outra thread pode ter recarregado enquanto esperávamos o lock
+            if self._dados is not None and time.monotonic() < self._expira_em:
+                return self._dados
+            if conn is not None:
+                dados = self._carregar(conn)
+            else:
+                with self.pool.conexao() as nova:
+                    dados = self._carregar(nova)
+            self._dados = dados
+            self._carregado_em = time.monotonic()
+            self._expira_em = self._carregado_em + self.ttl
+            self.recargas += 1
+            return dados
+
+    def resolver(self, campo, nome, conn=None):
+        """Converte o nome de um tipo/órgão/status/prioridade no id correspondente.
+
+        Nome vazio devolve None; nome desconhecido força uma recarga, para o caso
+        de ter sido cadastrado há pouco, e só então falha. A recarga forçada
+        acontece no máximo uma vez a cada RECARGA_MINIMA segundos.
+        """
+        if not nome:
+            return None
+        id_ = self._obter(conn)["ids"][campo].get(nome)
+        if id_ is None:
+            if time.monotonic() - self._carregado_em >= RECARGA_MINIMA:
+                self.invalidar()
+            ids = self._obter(conn)["ids"][campo]
+            id_ = ids.get(nome)
+            if id_ is None:
+                raise ReferenciaDesconhecidaError(campo, nome, ids)
+        return id_
+
+    def filtros(self, conn=None):
+        """Valores dos filtros do painel e o ETag correspondente."""
+        dados = self._obter(conn)
+        return dados["filtros"], dados["etag"]
+
+    def opcoes(self, conn=None):
+        """Nomes de cada tabela de referência, para montar filtros por nome."""
+        listas = self._obter(conn)["listas"]
+        return {campo: [item["nome"] for item in listas[campo]] for campo in TABELAS}
+
+    def registrar_ano(self, ano):
+        # Um documento novo pode trazer um ano inédito: atualiza sem ir ao banco
+        dados = self._dados
+        if dados is None or ano is None:
+            return
+        ano = int(ano)
+        if ano in dados["anos"]:
+            return
+        with self._lock:
+            if self._dados is dados:
+                anos = sorted(set(dados["anos"]) | {ano}, reverse=True)
+                self._dados = self._montar(dados["ids"], dados["listas"], anos)
+
+    def invalidar(self):
+        with self._lock:
+            self._expira_em = 0.0
+
+    def metricas(self):
+        dados = self._dados
+        return {
+            "recargas": self.recargas,
+            "ttl": self.ttl,
+            "carregado": dados is not None,
+            "etag": dados["etag"] if dados else None,
+        }
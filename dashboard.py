@@ -1,8 +1,63 @@
 import streamlit as st
 import requests
+from requests.adapters import HTTPAdapter
 import pandas as pd
 import plotly.express as px
+import csv
+import io
 import json
+import os
+
+API_URL = os.getenv("API_URL", "http://127.0.0.1:8888")
+TIMEOUT_API = float(os.getenv("DASHBOARD_TIMEOUT", "30"))
+
+# 🔌 Cliente da API por sessão do navegador: o requests.Session mantém as
+# conexões TCP abertas (keep-alive) entre os reruns do Streamlit, e as
+# respostas com ETag ficam guardadas, já convertidas, para serem revalidadas
+# com If-None-Match — um 304 não traz corpo nem passa de novo pelo pandas
+class ClienteAPI:
+    VERSOES_MAX = 64
+
+    def __init__(self, url_base):
+        self.url_base = url_base
+        self.sessao = requests.Session()
+        adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=4)
+        self.sessao.mount("http://", adaptador)
+        self.sessao.mount("https://", adaptador)
+        self.versoes = {}
+
+    def autenticar(self, token):
+        self.sessao.headers["Authorization"] = f"Bearer {token}"
+
+    def get(self, caminho, **kwargs):
+        return self.sessao.get(self.url_base + caminho, timeout=TIMEOUT_API, **kwargs)
+
+    def post(self, caminho, **kwargs):
+        return self.sessao.post(self.url_base + caminho, timeout=TIMEOUT_API, **kwargs)
+
+    def obter(self, caminho, params=None, converter=None):
+        """(dados, cabeçalhos) de um GET JSON, reaproveitando a versão guardada se o servidor responder 304."""
+        chave = (caminho, tuple(sorted((params or {}).items())))
+        guardada = self.versoes.get(chave)
+        condicional = {"If-None-Match": guardada[0]} if guardada else {}
+        resposta = self.get(caminho, params=params, headers=condicional)
+        if resposta.status_code == 304 and guardada:
+            return guardada[1], guardada[2]
+        resposta.raise_for_status()
+        dados = resposta.json()
+        if converter:
+            dados = converter(dados)
+        etag = resposta.headers.get("ETag")
+        if etag:
+            self.versoes.pop(chave, None)
+            self.versoes[chave] = (etag, dados, resposta.headers)
+            if len(self.versoes) > self.VERSOES_MAX:
+                del self.versoes[next(iter(self.versoes))]
+        return dados, resposta.headers
+
+if "cliente" not in st.session_state:
+    st.session_state["cliente"] = ClienteAPI(API_URL)
+cliente = st.session_state["cliente"]
 
 # 🔐 Login com JWT
 def autenticar():
@@ -10,10 +65,11 @@ def autenticar():
     email = st.sidebar.text_input("Email")
     senha = st.sidebar.text_input("Senha", type="password")
     if st.sidebar.button("Entrar"):
-        resposta = requests.post("http://127.0.0.1:8888/token", data={"username": email, "password": senha})
+        resposta = cliente.post("/token", data={"username": email, "password": senha})
         if resposta.status_code == 200:
             token = resposta.json()["access_token"]
             st.session_state["token"] = token
+            st.session_state["usuario"] = email
             st.success("Login realizado com sucesso!")
         else:
             st.error("Credenciais inválidas")
@@ -22,96 +78,188 @@ if "token" not in st.session_state:
     autenticar()
     st.stop()
 
-headers = {"Authorization": f"Bearer {st.session_state['token']}"}
+cliente.autenticar(st.session_state["token"])
+usuario = st.session_state["usuario"]
 
 st.set_page_config(page_title="Painel de Documentos Legislativos", layout="wide")
 st.title("📘 Painel de Documentos Legislativos")
 
-# 🔄 Carregar dados da API
-@st.cache_data
-def carregar_dados():
+# 🔄 Dados da API: filtros, contagens e paginação rodam no servidor (SQL);
+# o painel só recebe os totais e a página exibida. O cache do Streamlit é
+# compartilhado entre sessões, então o usuário entra na chave; passado o TTL,
+# o cliente revalida com ETag em vez de baixar tudo de novo.
+TAMANHO_PAGINA = 100
+CACHE_TTL = int(os.getenv("DASHBOARD_CACHE_TTL", "60"))
+COLUNAS = ["id", "titulo", "tipo", "orgao", "status", "prioridade"]
+
+@st.cache_data(ttl=CACHE_TTL * 5)
+def carregar_opcoes(usuario, _cliente):
     try:
-        resposta = requests.get("http://127.0.0.1:8888/documentos", headers=headers)
-        resposta.raise_for_status()
-        return pd.DataFrame(resposta.json())
+        dados, _ = _cliente.obter("/documentos/filtros")
+        return dados
+    except Exception as e:
+        st.error(f"Erro ao carregar filtros: {e}")
+        return {"tipo": [], "orgao": [], "status": [], "prioridade": []}
+
+# `filtros` é uma tupla de (campo, valores) para servir de chave do cache
+@st.cache_data(ttl=CACHE_TTL)
+def carregar_resumo(usuario, _cliente, filtros):
+    try:
+        dados, _ = _cliente.obter("/documentos/resumo", params=dict(filtros))
+        return dados
+    except Exception as e:
+        st.error(f"Erro ao carregar resumo: {e}")
+        return {"total": 0, "por_tipo": [], "por_orgao": [], "por_status": [], "por_prioridade": []}
+
+@st.cache_data(ttl=CACHE_TTL)
+def carregar_pagina(usuario, _cliente, filtros, cursor):
+    params = {**dict(filtros), "limite": TAMANHO_PAGINA}
+    if cursor is not None:
+        params["cursor"] = cursor
+    try:
+        pagina, cabecalhos = _cliente.obter(
+            "/documentos", params=params, converter=lambda docs: pd.DataFrame(docs, columns=COLUNAS)
+        )
+        return pagina, cabecalhos.get("X-Proximo-Cursor")
     except Exception as e:
-        st.error(f"Erro ao carregar dados: {e}")
-        return pd.DataFrame()
+        st.error(f"Erro ao carregar documentos: {e}")
+        return pd.DataFrame(columns=COLUNAS), None
 
-df = carregar_dados()
+# Exportação sob demanda: transmite todos os filtrados em NDJSON e monta o CSV
+def exportar_csv(filtros):
+    resposta = cliente.get("/documentos", params={**dict(filtros), "formato": "ndjson"}, stream=True)
+    resposta.raise_for_status()
+    saida = io.StringIO()
+    escritor = csv.DictWriter(saida, fieldnames=COLUNAS)
+    escritor.writeheader()
+    for linha in resposta.iter_lines():
+        if linha:
+            escritor.writerow(json.loads(linha))
+    return saida.getvalue().encode("utf-8")
+
+opcoes = carregar_opcoes(usuario, cliente)
 
 # 🎛️ Filtros
 col1, col2 = st.columns(2)
-tipos = df["tipo"].dropna().unique()
-orgaos = df["orgao"].dropna().unique()
-status = df["status"].dropna().unique()
-prioridades = df["prioridade"].dropna().unique()
 
 with col1:
-    tipo_selecionado = st.multiselect("Filtrar por Tipo", tipos)
-    orgao_selecionado = st.multiselect("Filtrar por Órgão", orgaos)
+    tipo_selecionado = st.multiselect("Filtrar por Tipo", opcoes["tipo"])
+    orgao_selecionado = st.multiselect("Filtrar por Órgão", opcoes["orgao"])
 
 with col2:
-    status_selecionado = st.multiselect("Filtrar por Status", status)
-    prioridade_selecionada = st.multiselect("Filtrar por Prioridade", prioridades)
-
-# 🧮 Aplicar filtros
-filtro = df.copy()
-if tipo_selecionado:
-    filtro = filtro[filtro["tipo"].isin(tipo_selecionado)]
-if orgao_selecionado:
-    filtro = filtro[filtro["orgao"].isin(orgao_selecionado)]
-if status_selecionado:
-    filtro = filtro[filtro["status"].isin(status_selecionado)]
-if prioridade_selecionada:
-    filtro = filtro[filtro["prioridade"].isin(prioridade_selecionada)]
+    status_selecionado = st.multiselect("Filtrar por Status", opcoes["status"])
+    prioridade_selecionada = st.multiselect("Filtrar por Prioridade", opcoes["prioridade"])
+
+filtros = tuple(
+    (campo, tuple(valores))
+    for campo, valores in (("tipo", tipo_selecionado), ("orgao", orgao_selecionado),
+                           ("status", status_selecionado), ("prioridade", prioridade_selecionada))
+    if valores
+)
+resumo = carregar_resumo(usuario, cliente, filtros)
+
+# Paginação por cursor: guarda o cursor de início de cada página já visitada
+if st.session_state.get("filtros") != filtros:
+    st.session_state["filtros"] = filtros
+    st.session_state["cursores"] = [None]
+cursores = st.session_state["cursores"]
+pagina, proximo_cursor = carregar_pagina(usuario, cliente, filtros, cursores[-1])
 
 # 📋 Tabela
 st.subheader("📄 Documentos Filtrados")
-st.dataframe(filtro, use_container_width=True)
+st.caption(f"Página {len(cursores)} · {len(pagina)} de {resumo['total']} documento(s)")
+st.dataframe(pagina, use_container_width=True)
+
+anterior, proxima, _ = st.columns([1, 1, 6])
+if anterior.button("⬅️ Anterior", disabled=len(cursores) == 1):
+    cursores.pop()
+    st.rerun()
+if proxima.button("Próxima ➡️", disabled=proximo_cursor is None):
+    cursores.append(int(proximo_cursor))
+    st.rerun()
 
 # 📥 Exportar CSV
-st.download_button(
-    label="📥 Exportar dados filtrados para CSV",
-    data=filtro.to_csv(index=False).encode("utf-8"),
-    file_name="documentos_filtrados.csv",
-    mime="text/csv"
-)
+if st.button("📥 Gerar CSV dos dados filtrados"):
+    try:
+        st.download_button(
+            label="📥 Baixar CSV",
+            data=exportar_csv(filtros),
+            file_name="documentos_filtrados.csv",
+            mime="text/csv"
+        )
+    except Exception as e:
+        st.error(f"Erro ao exportar: {e}")
 
 # 📘 Gráfico por tipo
-if not filtro.empty and "tipo" in filtro.columns:
+if resumo["por_tipo"]:
     st.subheader("📘 Distribuição por Tipo de Documento")
-    grafico_tipo = px.histogram(filtro, x="tipo", title="Documentos por Tipo")
+    grafico_tipo = px.bar(pd.DataFrame(resumo["por_tipo"]), x="nome", y="total", title="Documentos por Tipo")
     st.plotly_chart(grafico_tipo, use_container_width=True)
 
 # 🏛️ Gráfico por órgão
-if not filtro.empty and "orgao" in filtro.columns:
+if resumo["por_orgao"]:
     st.subheader("🏛️ Distribuição por Órgão")
-    grafico_orgao = px.histogram(filtro, x="orgao", title="Documentos por Órgão")
+    grafico_orgao = px.bar(pd.DataFrame(resumo["por_orgao"]), x="nome", y="total", title="Documentos por Órgão")
     st.plotly_chart(grafico_orgao, use_container_width=True)
 
-# 📤 Upload de Documento JSON
-st.subheader("📤 Upload de Documento JSON para API")
-arquivo = st.file_uploader("Escolha um arquivo JSON", type=["json"])
+# 📤 Upload de Documentos JSON para API (em lote)
+# O envio só acontece no clique: qualquer rerun do Streamlit (um filtro, a
+# paginação) repetiria o POST e gravaria o lote de novo. Depois de um envio
+# aceito, o seletor volta vazio (nova chave) e o resultado sobrevive ao rerun.
+st.subheader("📤 Upload de Documentos JSON para API")
+st.session_state.setdefault("upload_versao", 0)
+arquivos = st.file_uploader(
+    "Escolha arquivos JSON (um documento ou uma lista) ou NDJSON",
+    type=["json", "ndjson"],
+    accept_multiple_files=True,
+    key=f"upload_{st.session_state['upload_versao']}"
+)
+
+resultado = st.session_state.pop("upload_resultado", None)
+if resultado:
+    st.success(f"{resultado['aceitos']} documento(s) salvo(s) no banco.")
+    rejeitados = [r for r in resultado["resultados"] if not r["aceito"]]
+    if rejeitados:
+        st.warning(f"{resultado['rejeitados']} documento(s) rejeitado(s):")
+        st.dataframe(pd.DataFrame(rejeitados)[["linha", "erro"]])
 
-if arquivo:
+if arquivos:
+    enviado = False
     try:
-        dados = json.load(arquivo)
-        st.json(dados)
-        files = {"file": (arquivo.name, json.dumps(dados))}
-        resposta = requests.post("http://127.0.0.1:8888/upload", headers=headers, files=files)
-        if resposta.status_code == 200:
-            st.success(resposta.json()["mensagem"])
-        else:
-            st.error("Erro ao enviar o arquivo para a API.")
+        documentos = []
+        for arquivo in arquivos:
+            arquivo.seek(0)
+            if arquivo.name.lower().endswith(".ndjson"):
+                documentos.extend(json.loads(linha) for linha in arquivo if linha.strip())
+            else:
+                dados = json.load(arquivo)
+                documentos.extend(dados if isinstance(dados, list) else [dados])
+        st.write(f"{len(documentos)} documento(s) em {len(arquivos)} arquivo(s).")
+
+        if st.button("📤 Enviar"):
+            # Um único POST em NDJSON, em vez de um request por documento
+            corpo = "\n".join(json.dumps(d, ensure_ascii=False) for d in documentos).encode("utf-8")
+            resposta = cliente.post(
+                "/upload/lote",
+                headers={"Content-Type": "application/x-ndjson"},
+                data=corpo
+            )
+            if resposta.status_code == 200:
+                st.session_state["upload_resultado"] = resposta.json()
+                st.session_state["upload_versao"] += 1
+                enviado = True
+            else:
+                st.error("Erro ao enviar os arquivos para a API.")
     except Exception as e:
-        st.error(f"Erro ao processar o arquivo: {e}")
+        st.error(f"Erro ao processar os arquivos: {e}")
+    if enviado:
+        st.rerun()
 
 # 👥 Administração de Usuários
 st.subheader("👥 Painel de Administração de Usuários")
 
 with st.expander("📋 Listar Usuários"):
-    resposta = requests.get("http://127.0.0.1:8888/usuarios", headers=headers)
+    resposta = cliente.get("/usuarios")
     if resposta.status_code == 200:
         usuarios = pd.DataFrame(resposta.json())
         st.dataframe(usuarios)
@@ -123,9 +271,8 @@ with st.expander("➕ Criar Novo Usuário"):
     email = st.text_input("Email")
     senha = st.text_input("Senha", type="password")
     if st.button("Criar Usuário"):
-        resposta = requests.post(
-            "http://127.0.0.1:8888/usuarios",
-            headers=headers,
+        resposta = cliente.post(
+            "/usuarios",
             data={"nome": nome, "email": email, "senha": senha}
         )
         if resposta.status_code == 200:
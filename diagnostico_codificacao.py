@@ -1,9 +1,8 @@
 import os
-import re
 import psycopg2
 from dotenv import load_dotenv
-from PyPDF2 import PdfReader
-from docx import Document
+from extracao import extrair_texto
+from metadados_legais import extrair_metadados
 
 load_dotenv()
 
@@ -17,29 +16,6 @@ def conectar():
         client_encoding='UTF8'
     )
 
-def extrair_texto_pdf(caminho):
-    reader = PdfReader(caminho)
-    return "\n".join(page.extract_text() or "" for page in reader.pages)
-
-def extrair_texto_docx(caminho):
-    doc = Document(caminho)
-    return "\n".join(p.text for p in doc.paragraphs)
-
-def extrair_metadados(texto):
-    titulo = re.search(r"(Portaria|Decreto|Lei)[^\n]{0,100}", texto)
-    numero = re.search(r"n[ºo]?\s*(\d{3,6})", texto)
-    ano = re.search(r"\b(20\d{2}|19\d{2})\b", texto)
-    data = re.search(r"\b(\d{2}/\d{2}/\d{4})\b", texto)
-
-    return {
-        "titulo": titulo.group(0) if titulo else "Documento sem título",
-        "numero": numero.group(1) if numero else "0000",
-        "ano": int(ano.group(1)) if ano else 2025,
-        "data_publicacao": data.group(1).replace("/", "-") if data else "2025-01-01",
-        "ementa": texto[:300].strip().replace("\n", " "),
-        "conteudo_texto": texto
-    }
-
 def testar_insercao(doc):
     try:
         conn = conectar()
@@ -62,12 +38,9 @@ PASTA = "documentos"
 
 for arquivo in os.listdir(PASTA):
     caminho = os.path.join(PASTA, arquivo)
-    if arquivo.lower().endswith(".pdf"):
-        texto = extrair_texto_pdf(caminho)
-    elif arquivo.lower().endswith(".docx"):
-        texto = extrair_texto_docx(caminho)
-    else:
+    if not arquivo.lower().endswith((".pdf", ".docx")):
         continue
+    texto = extrair_texto(caminho)
 
-    doc = extrair_metadados(texto)
+    doc = extrair_metadados(texto, arquivo)
     testar_insercao(doc)
\ No newline at end of file
@@ -0,0 +1,157 @@
+import argparse
+import json
+import os
+
+import psycopg2
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# 📊 Contagens do acervo lidas da tabela estatisticas_documentos mais as
+# variações que os gatilhos (migracoes/007 e 009) ainda não consolidaram: o
+# custo é o número de tipos/órgãos/anos distintos e de variações pendentes,
+# não o de documentos. Os próprios gatilhos incorporam as variações à tabela
+# base a cada 100 comandos (migracoes/010); `--consolidar` faz o mesmo na
+# hora e `--reconciliar` recalcula tudo a partir de documentos e corrige o
+# que tiver divergido.
+
+DIMENSOES = ("tipo", "orgao", "status", "prioridade", "ano")
+
+SQL_ESTATISTICAS = """
+    SELECT e.dimensao, e.chave,
+           CASE e.dimensao
+               WHEN 'tipo' THEN td.nome
+               WHEN 'orgao' THEN o.nome
+               WHEN 'status' THEN s.nome
+               WHEN 'prioridade' THEN p.nome
+           END AS nome,
+           e.total
+    FROM (
+        SELECT dimensao, chave, sum(total)::bigint AS total
+        FROM (
+            SELECT dimensao, chave, total FROM estatisticas_documentos
+            UNION ALL
+            SELECT dimensao, chave, delta FROM estatisticas_documentos_deltas
+        ) t
+        GROUP BY dimensao, chave
+    ) e
+    LEFT JOIN tipos_documento td ON e.dimensao = 'tipo' AND td.id = e.chave
+    LEFT JOIN orgaos o ON e.dimensao = 'orgao' AND o.id = e.chave
+    LEFT JOIN status s ON e.dimensao = 'status' AND s.id = e.chave
+    LEFT JOIN prioridade p ON e.dimensao = 'prioridade' AND p.id = e.chave
+    WHERE e.total <> 0
+"""
+
+# Contagem real, comparada com a mantida pelos gatilhos (já consolidada)
+SQL_DIVERGENCIAS = """
+    WITH real AS (
+        SELECT k.dimensao, k.chave, count(*) AS total
+        FROM documentos d, estatisticas_chaves(d) k
+        GROUP BY k.dimensao, k.chave
+    )
+    SELECT coalesce(r.dimensao, e.dimensao), coalesce(r.chave, e.chave),
+           coalesce(e.total, 0), coalesce(r.total, 0)
+    FROM real r
+    FULL JOIN estatisticas_documentos e ON e.dimensao = r.dimensao AND e.chave = r.chave
+    WHERE coalesce(e.total, 0) <> coalesce(r.total, 0)
+       OR (r.total IS NULL AND e.total IS NOT NULL)
+"""
+
+
+def conectar():
+    return psycopg2.connect(
+        dbname=os.getenv("DB_NAME"),
+        user=os.getenv("DB_USER"),
+        password=os.getenv("DB_PASSWORD"),
+        host=os.getenv("DB_HOST"),
+        port=os.getenv("DB_PORT"),
+        client_encoding='UTF8'
+    )
+
+
+def ler_estatisticas(conn):
+    """Total de documentos ativos e contagens por tipo, órgão, status, prioridade e ano.
+
+    Cada dimensão é uma lista de {"nome", "total"} em ordem decrescente de total;
+    documentos sem o campo aparecem com nome None. No ano, o nome é o próprio ano.
+    """
+    cur = conn.cursor()
+    cur.execute(SQL_ESTATISTICAS)
+    linhas = cur.fetchall()
+    cur.close()
+
+    estatisticas = {"total": 0, **{f"por_{d}": [] for d in DIMENSOES}}
+    for dimensao, chave, nome, total in linhas:
+        if dimensao == "total":
+            estatisticas["total"] = total
+        elif dimensao in DIMENSOES:
+            if dimensao == "ano":
+                nome = chave or None
+            estatisticas[f"por_{dimensao}"].append({"nome": nome, "total": total})
+    for dimensao in DIMENSOES:
+        estatisticas[f"por_{dimensao}"].sort(key=lambda item: (-item["total"], str(item["nome"] or "")))
+    return estatisticas
+
+
+def consolidar(conn):
+    """Incorpora as variações pendentes à tabela base. Devolve quantas chaves mudaram."""
+    cur = conn.cursor()
+    # Espera a consolidação que um gatilho estiver fazendo, em vez de disputar as linhas
+    cur.execute("SELECT pg_advisory_xact_lock(hashtext('estatisticas_consolidar'));")
+    cur.execute("SELECT estatisticas_consolidar();")
+    chaves = cur.fetchone()[0]
+    conn.commit()
+    cur.close()
+    return chaves
+
+
+def reconciliar(conn):
+    """Recalcula as contagens a partir de documentos e corrige as divergentes.
+
+    Enquanto recalcula, bloqueia os gatilhos de escrita (que precisam de
+    ROW EXCLUSIVE em estatisticas_documentos_deltas): quem grava documentos
+    espera, quem só lê não. As variações pendentes são consolidadas antes da
+    comparação. Devolve a lista de divergências encontradas.
+    """
+    cur = conn.cursor()
+    cur.execute("LOCK TABLE estatisticas_documentos_deltas IN SHARE ROW EXCLUSIVE MODE;")
+    cur.execute("LOCK TABLE estatisticas_documentos IN SHARE ROW EXCLUSIVE MODE;")
+    cur.execute("SELECT estatisticas_consolidar();")
+    cur.execute(SQL_DIVERGENCIAS)
+    divergencias = [
+        {"dimensao": dimensao, "chave": chave, "mantido": mantido, "real": real}
+        for dimensao, chave, mantido, real in cur.fetchall()
+    ]
+    for d in divergencias:
+        if d["real"]:
+            cur.execute("""
+                INSERT INTO estatisticas_documentos (dimensao, chave, total) VALUES (%s, %s, %s)
+                ON CONFLICT (dimensao, chave) DO UPDATE SET total = EXCLUDED.total;
+            """, (d["dimensao"], d["chave"], d["real"]))
+        else:
+            cur.execute("DELETE FROM estatisticas_documentos WHERE dimensao = %s AND chave = %s;",
+                        (d["dimensao"], d["chave"]))
+    conn.commit()
+    cur.close()
+    return divergencias
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Contagens do acervo mantidas por gatilhos.")
+    parser.add_argument("--reconciliar", action="store_true",
+                        help="Recalcula as contagens a partir de documentos e corrige divergências")
+    parser.add_argument("--consolidar", action="store_true",
+                        help="Incorpora à tabela base as variações gravadas pelos gatilhos")
+    args = parser.parse_args()
+
+    conn = conectar()
+    if args.consolidar:
+        print(f"✅ {consolidar(conn)} contagem(ns) atualizada(s).")
+    elif args.reconciliar:
+        divergencias = reconciliar(conn)
+        for d in divergencias:
+            print(f"🔧 {d['dimensao']}={d['chave']}: {d['mantido']} → {d['real']}")
+        print(f"✅ Estatísticas reconciliadas ({len(divergencias)} divergência(s) corrigida(s)).")
+    else:
+        print(json.dumps(ler_estatisticas(conn), ensure_ascii=False, indent=2))
+    conn.close()
@@ -0,0 +1,139 @@
+import gzip
+import hashlib
+import json
+import os
+
+import pandas as pd
+from PyPDF2 import PdfReader
+from docx import Document
+from dotenv import load_dotenv
+
+from manifesto_ingestao import hash_arquivo
+from ocr_paginas import OCR_DPI, OCR_IDIOMA, OCR_LIMIAR, extrair_paginas_com_ocr, ocr_imagem
+
+load_dotenv()
+
+# 📑 Extração de texto compartilhada pelo importador e pelos scripts de teste.
+# Cada formato registra um extrator; o texto extraído fica em cache no disco,
+# comprimido, pela chave (hash do conteúdo, extrator, versão): depois da
+# primeira leitura, nenhum script volta a abrir o PDF/DOCX.
+
+PASTA_CACHE_EXTRACAO = os.getenv(
+    "EXTRACAO_CACHE", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache_extracao")
+)
+
+# extensão → (nome, versão, função que gera pares (página, texto))
+EXTRATORES = {}
+
+
+def registrar_extrator(nome, versao, *extensoes):
+    """Registra a função decorada como extratora das extensões dadas.
+
+    A função recebe o caminho e gera pares (página, texto); se terminar com
+    `return False`, a extração saiu incompleta e não vai para o cache.
+    Mude a versão ao mudar o que o extrator produz: o cache antigo deixa de valer.
+    """
+    def decorador(funcao):
+        for extensao in extensoes:
+            EXTRATORES[extensao.lower()] = (nome, versao, funcao)
+        return funcao
+    return decorador
+
+
+def extrator_para(arquivo):
+    """Entrada do registro para o arquivo, ou None se o formato não é suportado."""
+    nome = arquivo.lower()
+    for extensao, extrator in EXTRATORES.items():
+        if nome.endswith(extensao):
+            return extrator
+    return None
+
+
+# Parâmetros do OCR fazem parte da versão: mudá-los refaz a extração
+_VERSAO_OCR = f"ocr-{OCR_IDIOMA}-{OCR_DPI}-{OCR_LIMIAR}"
+
+
+@registrar_extrator("pdf", f"1+{_VERSAO_OCR}", ".pdf")
+def extrair_pdf(caminho):
+    falhas = []
+    yield from extrair_paginas_com_ocr(PdfReader(caminho), falhas=falhas)
+    return not falhas  # páginas sem OCR: tenta de novo na próxima leitura
+
+
+@registrar_extrator("docx", "1", ".docx")
+def extrair_docx(caminho):
+    yield 1, "\n".join(p.text for p in Document(caminho).paragraphs)
+
+
+@registrar_extrator("imagem", f"1+{_VERSAO_OCR}", ".jpeg", ".jpg", ".png")
+def extrair_imagem(caminho):
+    with open(caminho, "rb") as f:
+        yield 1, ocr_imagem(f.read())
+
+
+@registrar_extrator("xlsx", "1", ".xlsx")
+def extrair_xlsx(caminho):
+    yield 1, pd.read_excel(caminho).to_string(index=False)
+
+
+def _caminho_cache(caminho, nome, versao):
+    chave = hashlib.sha256(f"{hash_arquivo(caminho)}|{nome}|{versao}".encode()).hexdigest()
+    return os.path.join(PASTA_CACHE_EXTRACAO, chave[:2], chave + ".jsonl.gz")
+
+
+def _ler_cache(arquivo_cache):
+    with gzip.open(arquivo_cache, "rt", encoding="utf-8") as f:
+        for linha in f:
+            numero, texto = json.loads(linha)
+            yield numero, texto
+
+
+def _extrair_gravando(funcao, caminho, arquivo_cache):
+    # Uma página por linha, comprimida à medida que sai do extrator: nem a
+    # extração nem o cache montam o texto inteiro. Só uma extração completa
+    # vira cache; se o consumidor parar no meio, o temporário é descartado.
+    os.makedirs(os.path.dirname(arquivo_cache), exist_ok=True)
+    temporario = f"{arquivo_cache}.{os.getpid()}.tmp"
+    completo = False
+    try:
+        with gzip.open(temporario, "wt", encoding="utf-8") as f:
+            completo = yield from _gravando(funcao(caminho), f)
+        if completo is not False:
+            os.replace(temporario, arquivo_cache)
+            completo = True
+    finally:
+        if not completo and os.path.exists(temporario):
+            os.remove(temporario)
+
+
+def _gravando(paginas, f):
+    # Repassa e grava cada página; devolve o retorno do extrator (False = incompleto)
+    while True:
+        try:
+            numero, texto = next(paginas)
+        except StopIteration as fim:
+            return fim.value
+        f.write(json.dumps([numero, texto], ensure_ascii=False) + "\n")
+        yield numero, texto
+
+
+def extrair_paginas(caminho, usar_cache=True):
+    """Pares (página, texto) do arquivo, lidos do cache quando já extraídos antes.
+
+    Levanta ValueError para formatos sem extrator registrado.
+    """
+    extrator = extrator_para(caminho)
+    if extrator is None:
+        raise ValueError(f"Formato não suportado: {os.path.basename(caminho)}")
+    nome, versao, funcao = extrator
+    if not usar_cache:
+        return funcao(caminho)
+    arquivo_cache = _caminho_cache(caminho, nome, versao)
+    if os.path.exists(arquivo_cache):
+        return _ler_cache(arquivo_cache)
+    return _extrair_gravando(funcao, caminho, arquivo_cache)
+
+
+def extrair_texto(caminho, usar_cache=True):
+    """Texto completo do arquivo, com as páginas separadas por quebra de linha."""
+    return "\n".join(texto for _, texto in extrair_paginas(caminho, usar_cache))
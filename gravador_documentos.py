@@ -0,0 +1,304 @@
+import time
+import psycopg2
+from psycopg2.extras import execute_values
+from armazem_textos import EscritorTexto, gravar_texto
+from trechos_legais import dividir_em_trechos
+
+COLUNAS = (
+    "titulo", "ementa", "numero", "ano", "data_publicacao",
+    "tipo_documento_id", "orgao_id", "status_id", "prioridade_id",
+    "conteudo_texto", "arquivo_origem", "hash_conteudo", "texto_hash", "texto_tamanho"
+)
+
+SQL_INSERIR_LOTE = f"INSERT INTO documentos ({', '.join(COLUNAS)}) VALUES %s RETURNING id"
+SQL_INSERIR_LINHA = (
+    f"INSERT INTO documentos ({', '.join(COLUNAS)}) "
+    f"VALUES ({', '.join(['%s'] * len(COLUNAS))}) RETURNING id"
+)
+
+# Atualização em lote: os valores chegam como texto no VALUES, daí os casts
+SQL_ATUALIZAR_LOTE = f"""
+    UPDATE documentos AS d SET
+        titulo = v.titulo,
+        ementa = v.ementa,
+        numero = v.numero,
+        ano = v.ano::int,
+        data_publicacao = v.data_publicacao::date,
+        tipo_documento_id = v.tipo_documento_id::int,
+        orgao_id = v.orgao_id::int,
+        status_id = v.status_id::int,
+        prioridade_id = v.prioridade_id::int,
+        conteudo_texto = v.conteudo_texto,
+        arquivo_origem = v.arquivo_origem,
+        hash_conteudo = v.hash_conteudo,
+        texto_hash = v.texto_hash,
+        texto_tamanho = v.texto_tamanho::bigint,
+        removido_em = NULL
+    FROM (VALUES %s) AS v (id, {', '.join(COLUNAS)})
+    WHERE d.id = v.id
+    RETURNING d.id
+"""
+
+# Páginas de PDF: gravadas em blocos enquanto o gerador de extração as entrega
+PAGINAS_POR_COMANDO = 50
+
+SQL_INSERIR_PAGINAS = "INSERT INTO documento_paginas (documento_id, numero, texto) VALUES %s"
+SQL_APAGAR_PAGINAS = "DELETE FROM documento_paginas WHERE documento_id = ANY(%s)"
+
+# Trechos estruturais (Art., §, inciso...) indexados um a um; ver migracoes/006
+TRECHOS_POR_COMANDO = 200
+
+SQL_INSERIR_TRECHOS = (
+    "INSERT INTO documento_trechos (documento_id, ordem, tipo, rotulo, pagina, texto) VALUES %s"
+)
+SQL_APAGAR_TRECHOS = "DELETE FROM documento_trechos WHERE documento_id = ANY(%s)"
+
+# O texto completo é montado no banco a partir das páginas, só para o gatilho
+# calcular o vetor de busca; o corpo fica no armazém (armazem_textos.py), gravado
+# página a página pelo EscritorTexto, com as mesmas quebras de linha
+SQL_MONTAR_CONTEUDO = """
+    UPDATE documentos d SET
+        conteudo_texto = coalesce((
+            SELECT string_agg(p.texto, E'\\n' ORDER BY p.numero)
+            FROM documento_paginas p WHERE p.documento_id = d.id
+        ), ''),
+        texto_hash = v.texto_hash,
+        texto_tamanho = v.texto_tamanho
+    FROM (VALUES %s) AS v (id, texto_hash, texto_tamanho)
+    WHERE d.id = v.id
+"""
+
+# Limpeza completa dos campos de texto
+def limpar(valor):
+    if valor is None:
+        return None
+    # O PostgreSQL não aceita o caractere NUL em campos de texto
+    return str(valor).encode("utf-8", errors="ignore").decode("utf-8", errors="ignore").replace("\x00", "")
+
+# Só o título é obrigatório: documentos vindos da API não têm ementa, número etc.
+# O corpo é gravado no armazém aqui; a linha leva o hash e o tamanho dele.
+def montar_linha(doc):
+    conteudo = limpar(doc.get("conteudo_texto"))
+    return (
+        limpar(doc["titulo"]),
+        limpar(doc.get("ementa")),
+        limpar(doc.get("numero")),
+        doc.get("ano"),
+        doc.get("data_publicacao"),
+        doc.get("tipo_documento_id", 1),
+        doc.get("orgao_id", 1),
+        doc.get("status_id"),
+        doc.get("prioridade_id"),
+        conteudo,
+        doc.get("arquivo_origem"),
+        doc.get("hash_conteudo"),
+        *gravar_texto(conteudo)
+    )
+
+# Divide o texto em trechos e grava em blocos, consumindo `paginas` uma única vez
+def gravar_trechos(cur, documento_id, paginas):
+    bloco = []
+    for t in dividir_em_trechos(paginas):
+        bloco.append((documento_id, t["ordem"], t["tipo"], t["rotulo"], t["pagina"], t["texto"]))
+        if len(bloco) >= TRECHOS_POR_COMANDO:
+            execute_values(cur, SQL_INSERIR_TRECHOS, bloco, page_size=len(bloco))
+            bloco = []
+    if bloco:
+        execute_values(cur, SQL_INSERIR_TRECHOS, bloco, page_size=len(bloco))
+
+
+# 📦 Gravação em lote: acumula documentos e grava cada lote em uma única transação
+class GravadorLote:
+    def __init__(self, conn, tamanho_lote=500, intervalo_flush=5.0):
+        self.conn = conn
+        self.tamanho_lote = tamanho_lote
+        self.intervalo_flush = intervalo_flush
+        self._buffer = []
+        self._inicio_buffer = None
+        self.inseridos = 0
+        self.atualizados = 0
+        self.erros = []
+
+    def adicionar(self, doc, origem=None, documento_id=None):
+        """Enfileira um documento; descarrega quando o lote enche ou o intervalo vence.
+
+        Com `documento_id`, a linha existente é atualizada em vez de criar outra.
+        `doc["paginas"]` pode trazer pares (número, texto): se for uma lista, as
+        páginas entram no lote; se for um gerador, o documento é gravado na hora,
+        em transação própria, consumindo as páginas à medida que são extraídas.
+        Retorna o resultado dos documentos gravados agora, ou [] se nada foi gravado.
+        """
+        if doc.get("paginas") is not None and not isinstance(doc["paginas"], (list, tuple)):
+            return self.descarregar() + [self._gravar_paginado(doc, origem, documento_id)]
+        if not self._buffer:
+            self._inicio_buffer = time.monotonic()
+        self._buffer.append((origem, doc, documento_id))
+        if (len(self._buffer) >= self.tamanho_lote
+                or time.monotonic() - self._inicio_buffer >= self.intervalo_flush):
+            return self.descarregar()
+        return []
+
+    def descarregar(self):
+        """Grava o lote pendente e retorna um resultado por documento, na ordem recebida."""
+        if not self._buffer:
+            return []
+        lote, self._buffer = self._buffer, []
+        cur = self.conn.cursor()
+        try:
+            resultados = self._gravar_lote(cur, lote)
+            self.conn.commit()
+        except Exception:
+            # Um documento ruim derrubou o comando multi-linha: regrava linha a linha
+            # com savepoints, ainda em uma só transação, para isolar quem falhou
+            try:
+                self.conn.rollback()
+                resultados = self._gravar_isolando_erros(cur, lote)
+            except Exception as e:
+                # Sem transação utilizável (ex.: conexão perdida): nada do lote foi
+                # gravado, e cada documento sai como erro em vez de sumir
+                self._desfazer()
+                resultados = [
+                    {"origem": origem, "titulo": doc.get("titulo"), "id": None, "acao": None,
+                     "erro": f"lote não gravado: {str(e).strip()}"}
+                    for origem, doc, _ in lote
+                ]
+        finally:
+            cur.close()
+        self._contabilizar(resultados)
+        return resultados
+
+    def _desfazer(self):
+        try:
+            self.conn.rollback()
+        except psycopg2.Error:
+            pass  # conexão já fechada: não há o que desfazer
+
+    def _contabilizar(self, resultados):
+        for r in resultados:
+            if r["erro"]:
+                self.erros.append(r)
+            elif r["acao"] == "atualizado":
+                self.atualizados += 1
+            else:
+                self.inseridos += 1
+
+    def _gravar_lote(self, cur, lote):
+        resultados = [
+            {"origem": origem, "titulo": doc["titulo"], "id": documento_id, "acao": None, "erro": None}
+            for origem, doc, documento_id in lote
+        ]
+        atualizar = [i for i, (_, _, documento_id) in enumerate(lote) if documento_id is not None]
+        if atualizar:
+            linhas = [(lote[i][2],) + montar_linha(lote[i][1]) for i in atualizar]
+            encontrados = {r[0] for r in execute_values(
+                cur, SQL_ATUALIZAR_LOTE, linhas, page_size=len(linhas), fetch=True
+            )}
+            for i in atualizar:
+                if lote[i][2] in encontrados:
+                    resultados[i]["acao"] = "atualizado"
+
+        # Novos documentos, e também os que sumiram do banco desde a última carga
+        inserir = [i for i, r in enumerate(resultados) if r["acao"] is None]
+        if inserir:
+            linhas = [montar_linha(lote[i][1]) for i in inserir]
+            ids = execute_values(cur, SQL_INSERIR_LOTE, linhas, page_size=len(linhas), fetch=True)
+            for i, r in zip(inserir, ids):
+                resultados[i].update(id=r[0], acao="inserido")
+
+        atualizados = [r["id"] for r in resultados if r["acao"] == "atualizado"]
+        if atualizados:
+            cur.execute(SQL_APAGAR_PAGINAS, (atualizados,))
+            cur.execute(SQL_APAGAR_TRECHOS, (atualizados,))
+        paginados = []
+        for r, (_, doc, _) in zip(resultados, lote):
+            texto = self._gravar_conteudo(cur, r["id"], doc)
+            if texto is not None:
+                paginados.append((r["id"], *texto))
+        if paginados:
+            execute_values(cur, SQL_MONTAR_CONTEUDO, paginados, page_size=len(paginados))
+        return resultados
+
+    def _gravar_conteudo(self, cur, documento_id, doc):
+        """Grava páginas e trechos; retorna (texto_hash, texto_tamanho) se o texto veio em páginas."""
+        # Páginas, trechos e o texto do armazém saem da mesma passada pelo texto:
+        # cada página é gravada, comprimida e, em seguida, dividida em trechos
+        if doc.get("paginas") is None:
+            gravar_trechos(cur, documento_id, [(None, limpar(doc.get("conteudo_texto")))])
+            return None
+        escritor = EscritorTexto()
+        try:
+            gravar_trechos(cur, documento_id, self._gravar_paginas(cur, documento_id, doc["paginas"], escritor))
+        except BaseException:
+            escritor.descartar()
+            raise
+        return escritor.concluir()
+
+    def _gravar_paginas(self, cur, documento_id, paginas, escritor):
+        bloco = []
+        for i, (numero, texto) in enumerate(paginas):
+            texto = limpar(texto)
+            # Mesma junção do string_agg de SQL_MONTAR_CONTEUDO
+            escritor.escrever(texto if i == 0 else "\n" + texto)
+            bloco.append((documento_id, numero, texto))
+            if len(bloco) >= PAGINAS_POR_COMANDO:
+                execute_values(cur, SQL_INSERIR_PAGINAS, bloco, page_size=len(bloco))
+                bloco = []
+            yield numero, texto
+        if bloco:
+            execute_values(cur, SQL_INSERIR_PAGINAS, bloco, page_size=len(bloco))
+
+    def _gravar_paginado(self, doc, origem, documento_id):
+        # As páginas de um gerador só podem ser lidas uma vez, então o documento
+        # vai sozinho em uma transação: se falhar, nada dele fica gravado
+        cur = self.conn.cursor()
+        try:
+            resultado = self._gravar_lote(cur, [(origem, doc, documento_id)])[0]
+            self.conn.commit()
+        except Exception as e:
+            self._desfazer()
+            resultado = {"origem": origem, "titulo": doc.get("titulo"), "id": None,
+                         "acao": None, "erro": str(e).strip()}
+        finally:
+            cur.close()
+        self._contabilizar([resultado])
+        return resultado
+
+    def _gravar_isolando_erros(self, cur, lote):
+        resultados = []
+        for origem, doc, documento_id in lote:
+            resultado = {"origem": origem, "titulo": doc.get("titulo"), "id": None, "acao": None, "erro": None}
+            cur.execute("SAVEPOINT linha")
+            try:
+                linha = montar_linha(doc)
+                if documento_id is not None:
+                    # A tupla é adaptada pelo psycopg2 como "(v1, v2, ...)" no VALUES %s
+                    cur.execute(SQL_ATUALIZAR_LOTE, ((documento_id,) + linha,))
+                    if cur.fetchone():
+                        resultado.update(id=documento_id, acao="atualizado")
+                        cur.execute(SQL_APAGAR_PAGINAS, ([documento_id],))
+                        cur.execute(SQL_APAGAR_TRECHOS, ([documento_id],))
+                if resultado["acao"] is None:
+                    cur.execute(SQL_INSERIR_LINHA, linha)
+                    resultado.update(id=cur.fetchone()[0], acao="inserido")
+                texto = self._gravar_conteudo(cur, resultado["id"], doc)
+                if texto is not None:
+                    execute_values(cur, SQL_MONTAR_CONTEUDO, [(resultado["id"], *texto)])
+                cur.execute("RELEASE SAVEPOINT linha")
+            except Exception as e:
+                # Inclui TypeError de um campo com tipo errado e OSError do armazém de textos;
+                # se nem o ROLLBACK TO SAVEPOINT funcionar, descarregar() reporta o lote
+                cur.execute("ROLLBACK TO SAVEPOINT linha")
+                resultado.update(id=None, acao=None, erro=str(e).strip())
+            resultados.append(resultado)
+        self.conn.commit()
+        return resultados
+
+    def relatorio(self):
+        return {"inseridos": self.inseridos, "atualizados": self.atualizados, "erros": self.erros}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo_exc, exc, tb):
+        if tipo_exc is None:
+            self.descarregar()
@@ -1,12 +1,17 @@
+import argparse
 import os
-import re
+from collections import deque
+from itertools import chain, islice
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 import psycopg2
 from dotenv import load_dotenv
-from PyPDF2 import PdfReader
-from docx import Document
-from PIL import Image
-import pytesseract
-import pandas as pd
+from armazem_textos import texto_do_documento
+from extracao import extrair_paginas, extrair_texto, extrator_para
+from gravador_documentos import GravadorLote, gravar_trechos
+from manifesto_ingestao import Manifesto
+from metadados_legais import extrair_metadados
+from ocr_paginas import repartir_workers
 
 load_dotenv()
 
@@ -27,135 +32,256 @@ def limpar_texto(texto):
         return texto.decode("utf-8", errors="ignore")
     return str(texto).encode("utf-8", errors="ignore").decode("utf-8", errors="ignore")
 
-# Extrai texto de PDF
-def extrair_texto_pdf(caminho):
-    try:
-        reader = PdfReader(caminho)
-        texto = ""
-        for page in reader.pages:
-            raw = page.extract_text()
-            if raw:
-                texto += raw
-        return texto
-    except Exception as e:
-        print(f"Erro ao ler PDF: {e}")
-        return ""
+# Caminho da pasta com documentos
+PASTA = "documentos"
 
-# Extrai texto de DOCX
-def extrair_texto_docx(caminho):
-    try:
-        doc = Document(caminho)
-        return "\n".join(p.text for p in doc.paragraphs)
-    except Exception as e:
-        print(f"Erro ao ler DOCX: {e}")
-        return ""
+# Páginas lidas antes de extrair os metadados (título, número, data ficam no início)
+PAGINAS_CABECALHO = 2
 
-# Extrai texto de imagem com OCR
-def extrair_texto_imagem(caminho):
+# Extrai texto e metadados de um arquivo (roda dentro dos workers, sem banco).
+# O texto vem de extracao.py, que o guarda em cache: reimportar não relê o arquivo.
+# PDFs seguem página a página: os metadados saem das primeiras páginas e o texto
+# completo nunca é concatenado aqui. Com materializar=False as páginas ficam em um
+# gerador consumido pelo gravador; nos workers elas precisam voltar como lista.
+def processar_arquivo(caminho, materializar=True):
+    arquivo = os.path.basename(caminho)
     try:
-        img = Image.open(caminho)
-        return pytesseract.image_to_string(img, lang='por')
-    except Exception as e:
-        print(f"Erro ao ler imagem: {e}")
-        return ""
+        extrator = extrator_para(arquivo)
+        if extrator is None:
+            return {"arquivo": arquivo, "status": "nao_suportado"}
 
-# Extrai texto de XLSX
-def extrair_texto_xlsx(caminho):
-    try:
-        df = pd.read_excel(caminho)
-        return df.to_string(index=False)
-    except Exception as e:
-        print(f"Erro ao ler XLSX: {e}")
-        return ""
+        if extrator[0] == "pdf":
+            return processar_pdf(caminho, materializar)
 
-# Extrai metadados simples
-def extrair_metadados(texto):
-    try:
-        titulo = re.search(r"(Portaria|Decreto|Lei|Instrução Normativa|Resolução|Manual)[^\n]{0,100}", texto)
-        numero = re.search(r"n[ºo]?\s*(\d{3,6})", texto)
-        ano = re.search(r"\b(20\d{2}|19\d{2})\b", texto)
-        data = re.search(r"\b(\d{2}/\d{2}/\d{4})\b", texto)
-
-        return {
-            "titulo": titulo.group(0) if titulo else "Documento sem título",
-            "numero": numero.group(1) if numero else "0000",
-            "ano": int(ano.group(1)) if ano else 2025,
-            "data_publicacao": data.group(1).replace("/", "-") if data else "2025-01-01",
-            "ementa": texto[:300].strip().replace("\n", " "),
-            "conteudo_texto": texto
-        }
+        # ✅ Aplica limpeza após extração
+        texto = limpar_texto(extrair_texto(caminho))
+
+        if not texto.strip():
+            return {"arquivo": arquivo, "status": "vazio"}
+        return {"arquivo": arquivo, "status": "ok", "doc": extrair_metadados(texto, arquivo)}
     except Exception as e:
-        print(f"Erro ao extrair metadados: {e}")
-        return {
-            "titulo": "Documento sem título",
-            "numero": "0000",
-            "ano": 2025,
-            "data_publicacao": "2025-01-01",
-            "ementa": texto[:300].strip().replace("\n", " "),
-            "conteudo_texto": texto
-        }
-
-# Insere no banco
-def inserir_documento(doc, tipo_id=1, orgao_id=1):
+        return {"arquivo": arquivo, "status": "erro", "erro": str(e)}
+
+def processar_pdf(caminho, materializar):
+    arquivo = os.path.basename(caminho)
+    paginas = ((numero, limpar_texto(texto)) for numero, texto in extrair_paginas(caminho))
+    paginas = ((numero, texto) for numero, texto in paginas if texto.strip())
+    cabecalho = list(islice(paginas, PAGINAS_CABECALHO))
+    if not cabecalho:
+        return {"arquivo": arquivo, "status": "vazio"}
+
+    doc = extrair_metadados("\n".join(texto for _, texto in cabecalho), arquivo)
+    doc["conteudo_texto"] = None  # montado no banco a partir de documento_paginas
+    doc["paginas"] = chain(cabecalho, paginas)
+    if materializar:
+        doc["paginas"] = list(doc["paginas"])
+    return {"arquivo": arquivo, "status": "ok", "doc": doc}
+
+# Distribui os arquivos entre processos e devolve os resultados na ordem original.
+# A janela de tarefas em andamento é limitada para não acumular textos em memória.
+# Um worker morto (falta de memória, falha em biblioteca de PDF) quebra o pool
+# inteiro: ele é recriado, e as tarefas perdidas são refeitas uma a uma, cada
+# uma em processo próprio, para só o arquivo culpado ficar registrado como erro.
+def processar_isolado(caminho):
+    with ProcessPoolExecutor(max_workers=1) as isolado:
+        try:
+            return isolado.submit(processar_arquivo, caminho).result()
+        except BrokenProcessPool as e:
+            return {"arquivo": os.path.basename(caminho), "status": "erro",
+                    "erro": f"worker encerrado ao processar o arquivo: {e}"}
+
+# Os núcleos são repartidos entre os processos: cada um usa cpu_count / jobs
+# threads de OCR (ocr_paginas.OCR_WORKERS, se definido, tem precedência)
+def novo_pool(jobs):
+    return ProcessPoolExecutor(max_workers=jobs, initializer=repartir_workers, initargs=(jobs,))
+
+def processar_em_paralelo(caminhos, jobs):
+    caminhos = iter(caminhos)
+    pendentes = deque()
+    executor = novo_pool(jobs)
+
+    def enviar(caminho):
+        try:
+            futuro = executor.submit(processar_arquivo, caminho)
+        except BrokenProcessPool as e:
+            # O pool quebrou antes de o resultado anterior ser lido: este
+            # arquivo é refeito junto com os demais quando a falha aparecer
+            futuro = Future()
+            futuro.set_exception(e)
+        return caminho, futuro
+
     try:
-        conn = conectar()
-        cur = conn.cursor()
+        for caminho in islice(caminhos, jobs * 2):
+            pendentes.append(enviar(caminho))
+        while pendentes:
+            caminho, futuro = pendentes.popleft()
+            try:
+                resultado = futuro.result()
+            except BrokenProcessPool:
+                executor.shutdown(wait=False, cancel_futures=True)
+                executor = novo_pool(jobs)
+                perdidos = [(caminho, futuro)] + list(pendentes)
+                pendentes.clear()
+                for c, f in perdidos:
+                    if not (f.done() and not f.cancelled() and f.exception() is None):
+                        f = Future()
+                        f.set_result(processar_isolado(c))
+                    pendentes.append((c, f))
+                continue
+            except Exception as e:
+                resultado = {"arquivo": os.path.basename(caminho), "status": "erro", "erro": str(e)}
+            yield resultado
+            proximo = next(caminhos, None)
+            if proximo is not None:
+                pendentes.append(enviar(proximo))
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
 
-        # Limpeza completa dos campos
-        def limpar(valor):
-            return str(valor).encode("utf-8", errors="ignore").decode("utf-8", errors="ignore")
-
-        cur.execute("""
-            INSERT INTO documentos (
-                titulo, ementa, numero, ano, data_publicacao,
-                tipo_documento_id, orgao_id, conteudo_texto
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-        """, (
-            limpar(doc["titulo"]),
-            limpar(doc["ementa"]),
-            limpar(doc["numero"]),
-            doc["ano"],
-            doc["data_publicacao"],
-            tipo_id,
-            orgao_id,
-            limpar(doc["conteudo_texto"])
-        ))
+# Separa o que precisa ser processado do que o manifesto mostra inalterado
+def selecionar_alterados(manifesto, arquivos):
+    selecionados, pendentes = [], {}
+    for arquivo in arquivos:
+        if extrator_para(arquivo) is None:
+            print(f"❌ Tipo de arquivo não suportado: {arquivo}")
+            continue
+        situacao, info = manifesto.verificar(arquivo)
+        if situacao == "inalterado":
+            continue
+        selecionados.append(arquivo)
+        pendentes[arquivo] = info
+    print(f"🧾 {len(selecionados)} arquivo(s) novo(s) ou alterado(s), "
+          f"{len(arquivos) - len(selecionados)} ignorado(s).")
+    return selecionados, pendentes
+
+# Marca como removidos os documentos cujo arquivo saiu da pasta
+def marcar_removidos(conn, manifesto, arquivos):
+    ausentes = manifesto.ausentes(arquivos)
+    ids = [entrada["documento_id"] for _, entrada in ausentes if entrada.get("documento_id")]
+    if ids:
+        cur = conn.cursor()
+        cur.execute("UPDATE documentos SET removido_em = now() WHERE id = ANY(%s);", (ids,))
         conn.commit()
         cur.close()
-        conn.close()
-    except Exception as e:
-        print(f"Erro ao inserir no banco: {e}")
+    for arquivo, entrada in ausentes:
+        entrada["removido"] = True
+        print(f"🗑️ Removido: {arquivo}")
 
-# Caminho da pasta com documentos
-PASTA = "documentos"
+def importar(pasta=PASTA, jobs=1, tamanho_lote=100, intervalo_flush=5.0,
+             incremental=False, remover_ausentes=False):
+    arquivos = [a for a in sorted(os.listdir(pasta)) if not a.startswith(".")]
+    manifesto = Manifesto(pasta) if incremental else None
+    pendentes = {}
+    if manifesto:
+        arquivos_processar, pendentes = selecionar_alterados(manifesto, arquivos)
+    else:
+        arquivos_processar = arquivos
+
+    caminhos = [os.path.join(pasta, arquivo) for arquivo in arquivos_processar]
+    if jobs > 1:
+        resultados = processar_em_paralelo(caminhos, jobs)
+    else:
+        resultados = (processar_arquivo(caminho, materializar=False) for caminho in caminhos)
 
-# Processa todos os arquivos
-for arquivo in os.listdir(PASTA):
-    caminho = os.path.join(PASTA, arquivo)
-    texto = ""
+    def registrar(gravados):
+        informar_gravacao(gravados)
+        if manifesto:
+            for r in gravados:
+                if not r["erro"]:
+                    manifesto.registrar(r["origem"], pendentes[r["origem"]], r["id"])
 
+    # O banco só é acessado aqui, no processo principal, em lotes transacionais
+    conn = conectar()
+    gravador = GravadorLote(conn, tamanho_lote, intervalo_flush)
     try:
-        if arquivo.lower().endswith(".pdf"):
-            texto = extrair_texto_pdf(caminho)
-        elif arquivo.lower().endswith(".docx"):
-            texto = extrair_texto_docx(caminho)
-        elif arquivo.lower().endswith((".jpeg", ".jpg", ".png")):
-            texto = extrair_texto_imagem(caminho)
-        elif arquivo.lower().endswith(".xlsx"):
-            texto = extrair_texto_xlsx(caminho)
-        else:
-            print(f"❌ Tipo de arquivo não suportado: {arquivo}")
-            continue
+        for resultado in resultados:
+            arquivo = resultado["arquivo"]
+            if resultado["status"] == "ok":
+                doc = resultado["doc"]
+                doc["arquivo_origem"] = arquivo
+                info = pendentes.get(arquivo, {})
+                doc["hash_conteudo"] = info.get("hash")
+                informar_confianca(arquivo, doc)
+                registrar(gravador.adicionar(doc, origem=arquivo, documento_id=info.get("documento_id")))
+            elif resultado["status"] == "vazio":
+                print(f"⚠️ Nenhum texto extraído de: {arquivo}")
+            elif resultado["status"] == "nao_suportado":
+                print(f"❌ Tipo de arquivo não suportado: {arquivo}")
+            else:
+                print(f"⚠️ Erro ao processar {arquivo}: {resultado['erro']}")
+        registrar(gravador.descarregar())
+        if manifesto and remover_ausentes:
+            marcar_removidos(conn, manifesto, arquivos)
+    finally:
+        conn.close()
+        if manifesto:
+            manifesto.salvar()
 
-        # ✅ Aplica limpeza após extração
-        texto = limpar_texto(texto)
+    relatorio = gravador.relatorio()
+    print(f"\n📦 {relatorio['inseridos']} inserido(s), {relatorio['atualizados']} atualizado(s), "
+          f"{len(relatorio['erros'])} com erro.")
+    return relatorio
 
-        if texto.strip():
-            doc = extrair_metadados(texto)
-            inserir_documento(doc)
-            print(f"✅ Inserido: {doc['titulo']}")
+# Divide em trechos os documentos gravados antes de documento_trechos existir.
+# PDFs são relidos de documento_paginas, para os trechos apontarem a página.
+def dividir_trechos_existentes(conn):
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT d.id FROM documentos d
+        WHERE NOT EXISTS (SELECT 1 FROM documento_trechos t WHERE t.documento_id = d.id)
+        ORDER BY d.id;
+    """)
+    ids = [r[0] for r in cur.fetchall()]
+    for documento_id in ids:
+        cur.execute("SELECT numero, texto FROM documento_paginas WHERE documento_id = %s ORDER BY numero;",
+                    (documento_id,))
+        paginas = cur.fetchall()
+        if not paginas:
+            cur.execute("SELECT conteudo_texto, texto_hash FROM documentos WHERE id = %s;", (documento_id,))
+            paginas = [(None, texto_do_documento(*cur.fetchone()))]
+        gravar_trechos(cur, documento_id, paginas)
+        conn.commit()
+    cur.close()
+    print(f"🧩 {len(ids)} documento(s) divididos em trechos.")
+    return len(ids)
+
+# Avisa quais metadados não saíram da linha do ato (ficaram vazios ou incertos)
+def informar_confianca(arquivo, doc):
+    incertos = [f"{campo}={nivel or 'ausente'}" for campo, nivel in doc.get("confianca", {}).items()
+                if nivel != "alta"]
+    if incertos:
+        print(f"🔎 Metadados incertos em {arquivo}: {', '.join(incertos)}")
+
+def informar_gravacao(resultados):
+    for r in resultados:
+        if r["erro"]:
+            print(f"❌ Erro ao gravar {r['origem']}: {r['erro']}")
+        elif r["acao"] == "atualizado":
+            print(f"🔄 Atualizado: {r['titulo']}")
         else:
-            print(f"⚠️ Nenhum texto extraído de: {arquivo}")
+            print(f"✅ Inserido: {r['titulo']}")
 
-    except Exception as e:
-        print(f"⚠️ Erro ao processar {arquivo}: {e}")
\ No newline at end of file
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Importa documentos de aprendizagem para o banco.")
+    parser.add_argument("--pasta", default=PASTA, help="Pasta com os arquivos a importar")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="Processos de extração em paralelo (0 = um por núcleo)")
+    parser.add_argument("--lote", type=int, default=100,
+                        help="Documentos gravados por transação")
+    parser.add_argument("--intervalo", type=float, default=5.0,
+                        help="Segundos máximos que um documento espera no lote antes de ser gravado")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Processa só arquivos novos ou alterados segundo o manifesto da pasta")
+    parser.add_argument("--marcar-removidos", action="store_true",
+                        help="Com --incremental, marca como removidos os documentos cujo arquivo sumiu")
+    parser.add_argument("--dividir-trechos", action="store_true",
+                        help="Só divide em trechos os documentos já gravados que ainda não os têm")
+    args = parser.parse_args()
+    if args.dividir_trechos:
+        conn = conectar()
+        try:
+            dividir_trechos_existentes(conn)
+        finally:
+            conn.close()
+    else:
+        importar(args.pasta, args.jobs if args.jobs > 0 else os.cpu_count(), args.lote, args.intervalo,
+                 args.incremental, args.marcar_removidos)
@@ -0,0 +1,296 @@
+import re
+import threading
+import time
+from bisect import bisect_left
+
+from psycopg2.extensions import cursor as CursorPsycopg
+
+from consultas_lentas import LIMIAR_SEGUNDOS, registrar_consulta_lenta
+
+# 📈 Instrumentação compartilhada pela API (main.py) e pelo app Flask:
+# histogramas de latência por rota e status, tempo de cada consulta SQL por
+# rótulo normalizado, requisições em andamento e o estado do pool, expostos
+# em /metrics no formato texto do Prometheus. Sem dependências: registrar uma
+# observação custa um lock e uma busca binária nos limites do histograma.
+
+# Limites (segundos) dos histogramas: de 1 ms a 10 s
+LIMITES_PADRAO = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _rotulos(nomes, valores, extra=""):
+    pares = [f'{n}="{_escapar(v)}"' for n, v in zip(nomes, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+class Histograma:
+    def __init__(self, nome, ajuda, rotulos=(), limites=LIMITES_PADRAO):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self.limites = tuple(limites)
+        self._lock = threading.Lock()
+        self._series = {}  # valores dos rótulos → [contagem por faixa..., soma]
+
+    def observar(self, valor, *rotulos):
+        faixa = bisect_left(self.limites, valor)
+        with self._lock:
+            serie = self._series.get(rotulos)
+            if serie is None:
+                serie = self._series[rotulos] = [0] * (len(self.limites) + 1) + [0.0]
+            serie[faixa] += 1
+            serie[-1] += valor
+
+    def expor(self):
+        yield f"# HELP {self.nome} {self.ajuda}"
+        yield f"# TYPE {self.nome} histogram"
+        with self._lock:
+            series = [(r, list(s)) for r, s in self._series.items()]
+        for rotulos, serie in sorted(series):
+            acumulado = 0
+            for limite, contagem in zip(self.limites + (float("inf"),), serie):
+                acumulado += contagem
+                le = 'le="+Inf"' if limite == float("inf") else f'le="{limite!r}"'
+                yield f"{self.nome}_bucket{_rotulos(self.rotulos, rotulos, le)} {acumulado}"
+            yield f"{self.nome}_sum{_rotulos(self.rotulos, rotulos)} {serie[-1]}"
+            yield f"{self.nome}_count{_rotulos(self.rotulos, rotulos)} {acumulado}"
+
+
+class Medidor:
+    """Valor que sobe e desce (gauge), por combinação de rótulos."""
+
+    def __init__(self, nome, ajuda, rotulos=()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self._lock = threading.Lock()
+        self._valores = {}
+
+    def somar(self, quantidade, *rotulos):
+        with self._lock:
+            self._valores[rotulos] = self._valores.get(rotulos, 0) + quantidade
+
+    def expor(self):
+        yield f"# HELP {self.nome} {self.ajuda}"
+        yield f"# TYPE {self.nome} gauge"
+        with self._lock:
+            valores = sorted(self._valores.items())
+        for rotulos, valor in valores:
+            yield f"{self.nome}{_rotulos(self.rotulos, rotulos)} {valor}"
+
+
+# 🗂️ Registro global: métricas fixas + coletores chamados a cada leitura
+_metricas = []
+_coletores = []
+
+
+def registrar(metrica):
+    _metricas.append(metrica)
+    return metrica
+
+
+def registrar_coletor(funcao):
+    """`funcao()` gera linhas no formato texto; chamada só quando /metrics é lido."""
+    _coletores.append(funcao)
+    return funcao
+
+
+def expor():
+    linhas = []
+    for metrica in _metricas:
+        linhas.extend(metrica.expor())
+    for coletor in _coletores:
+        linhas.extend(coletor())
+    return "\n".join(linhas) + "\n"
+
+
+TIPO_CONTEUDO = "text/plain; version=0.0.4; charset=utf-8"
+
+latencia_requisicoes = registrar(Histograma(
+    "http_requisicao_segundos", "Latência das requisições HTTP por rota e status.",
+    ("app", "metodo", "rota", "status"),
+))
+requisicoes_em_andamento = registrar(Medidor(
+    "http_requisicoes_em_andamento", "Requisições HTTP sendo atendidas agora.", ("app",),
+))
+tempo_consultas = registrar(Histograma(
+    "db_consulta_segundos", "Tempo de execução de cada comando SQL, por rótulo normalizado.", ("consulta",),
+))
+tempo_checkout = registrar(Histograma(
+    "db_pool_checkout_segundos", "Espera para obter uma conexão do pool (inclui abrir conexão nova).", ("app",),
+))
+tempo_etapas = registrar(Histograma(
+    "etapa_segundos", "Duração de etapas internas de um endpoint (consulta, serialização...).", ("etapa",),
+))
+
+
+# 🏷️ Rótulo de uma consulta: comando + primeira tabela ("SELECT documentos",
+# "INSERT documento_trechos"). Literais e filtros variáveis não entram, então
+# o número de séries fica limitado ao de consultas distintas do código.
+_PADRAO_TABELA = re.compile(r"\b(?:FROM|INTO|UPDATE|JOIN|TABLE)\s+(?:ONLY\s+)?([A-Za-z_][\w.]*)", re.IGNORECASE)
+# Só o começo do comando é lido e serve de chave do cache: um INSERT de
+# execute_values chega com todos os valores já embutidos (megabytes)
+_rotulos_sql = {}
+ROTULOS_SQL_MAX = 1000
+PREFIXO_ROTULO = 1024
+
+
+def rotular_sql(sql):
+    sql = (sql if isinstance(sql, (str, bytes)) else str(sql))[:PREFIXO_ROTULO]
+    rotulo = _rotulos_sql.get(sql)
+    if rotulo is not None:
+        return rotulo
+    texto = sql.decode("utf-8", "replace") if isinstance(sql, bytes) else sql
+    comando = (texto.split(None, 1) or ["?"])[0].upper()
+    tabela = _PADRAO_TABELA.search(texto)
+    rotulo = f"{comando} {tabela.group(1).lower()}" if tabela else comando
+    if len(_rotulos_sql) < ROTULOS_SQL_MAX:
+        _rotulos_sql[sql] = rotulo
+    return rotulo
+
+
+class CursorMedido(CursorPsycopg):
+    """Cursor do psycopg2 que cronometra cada execute/executemany.
+
+    Use com `psycopg2.connect(..., cursor_factory=CursorMedido)`; vale também
+    para cursores nomeados e para execute_values, que chama execute por página.
+    Comandos acima de CONSULTA_LENTA_MS vão para o log de consultas lentas.
+    """
+
+    def execute(self, query, vars=None):
+        inicio = time.perf_counter()
+        try:
+            super().execute(query, vars)
+        finally:
+            duracao = time.perf_counter() - inicio
+            tempo_consultas.observar(duracao, rotular_sql(query))
+        # Só consultas que terminaram bem vão para o log de lentas (consultas_lentas.py)
+        if duracao >= LIMIAR_SEGUNDOS:
+            registrar_consulta_lenta(self, query, vars, duracao, rotular_sql(query))
+
+    def executemany(self, query, vars_list):
+        inicio = time.perf_counter()
+        try:
+            super().executemany(query, vars_list)
+        finally:
+            duracao = time.perf_counter() - inicio
+            tempo_consultas.observar(duracao, rotular_sql(query))
+        if duracao >= LIMIAR_SEGUNDOS:
+            registrar_consulta_lenta(self, query, None, duracao, rotular_sql(query), lote=True)
+
+
+class etapa:
+    """Cronometra um trecho de código: `with etapa("busca.serializacao"): ...`"""
+
+    __slots__ = ("nome", "inicio")
+
+    def __init__(self, nome):
+        self.nome = nome
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        tempo_etapas.observar(time.perf_counter() - self.inicio, self.nome)
+        return False
+
+
+def instrumentar_pool(pool, app):
+    """Mede a espera em pool.obter() e expõe pool.metricas() em /metrics."""
+    obter = pool.obter
+
+    def obter_medido():
+        inicio = time.perf_counter()
+        try:
+            return obter()
+        finally:
+            tempo_checkout.observar(time.perf_counter() - inicio, app)
+
+    pool.obter = obter_medido
+
+    @registrar_coletor
+    def coletar():
+        metricas = pool.metricas()
+        for chave in ("abertas", "em_uso", "livres", "aguardando", "maximo"):
+            yield f"# TYPE db_pool_{chave} gauge"
+            yield f'db_pool_{chave}{{app="{app}"}} {metricas[chave]}'
+        for chave in ("checkouts", "esperas", "esgotamentos", "descartadas"):
+            yield f"# TYPE db_pool_{chave}_total counter"
+            yield f'db_pool_{chave}_total{{app="{app}"}} {metricas[chave]}'
+
+
+# 🌐 FastAPI/Starlette: middleware ASGI puro (sem BaseHTTPMiddleware, que
+# custa uma tarefa extra por requisição). A rota é o modelo ("/documentos/{id}"),
+# conhecido depois do roteamento; o tempo vai até o último pedaço do corpo,
+# então respostas transmitidas (NDJSON) são medidas por inteiro.
+class MiddlewareMetricas:
+    def __init__(self, app, nome_app):
+        self.app = app
+        self.nome_app = nome_app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        inicio = time.perf_counter()
+        status = 500
+
+        async def enviar(mensagem):
+            nonlocal status
+            if mensagem["type"] == "http.response.start":
+                status = mensagem["status"]
+            await send(mensagem)
+
+        requisicoes_em_andamento.somar(1, self.nome_app)
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            requisicoes_em_andamento.somar(-1, self.nome_app)
+            rota = getattr(scope.get("route"), "path", None) or "desconhecida"
+            latencia_requisicoes.observar(
+                time.perf_counter() - inicio, self.nome_app, scope["method"], rota, str(status)
+            )
+
+
+def instrumentar_fastapi(app, nome_app):
+    from fastapi import Response
+
+    app.add_middleware(MiddlewareMetricas, nome_app=nome_app)
+
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        return Response(expor(), media_type=TIPO_CONTEUDO)
+
+
+def instrumentar_flask(app, nome_app):
+    from flask import g, request
+
+    @app.before_request
+    def _iniciar_medicao():
+        g._inicio_metricas = g._em_andamento = time.perf_counter()
+        requisicoes_em_andamento.somar(1, nome_app)
+
+    @app.after_request
+    def _registrar_medicao(response):
+        inicio = g.pop("_inicio_metricas", None)
+        if inicio is not None:
+            rota = request.url_rule.rule if request.url_rule else "desconhecida"
+            latencia_requisicoes.observar(
+                time.perf_counter() - inicio, nome_app, request.method, rota, str(response.status_code)
+            )
+        return response
+
+    @app.teardown_request
+    def _encerrar_medicao(exc):
+        # Só desconta quem foi contado (um before_request anterior pode ter falhado)
+        if g.pop("_em_andamento", None) is not None:
+            requisicoes_em_andamento.somar(-1, nome_app)
+
+    @app.route("/metrics")
+    def metrics():
+        return app.response_class(expor(), content_type=TIPO_CONTEUDO)
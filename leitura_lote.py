@@ -0,0 +1,106 @@
+import codecs
+import json
+
+# Maior registro aceito; protege a memória contra um elemento que nunca fecha
+TAMANHO_MAXIMO_REGISTRO = 10 * 1024 * 1024
+
+_ESPACOS = " \t\r\n"
+
+
+class ErroLeituraLote(ValueError):
+    pass
+
+
+# 📥 Leitura incremental de corpos grandes: cada função recebe um iterador
+# assíncrono de pedaços de bytes (ex.: request.stream()) e devolve um registro
+# por vez como (número, objeto, erro), sem carregar o corpo inteiro.
+
+async def iterar_ndjson(pedacos):
+    """Um objeto JSON por linha; uma linha inválida não impede as seguintes."""
+    buffer = b""
+    numero = 0
+    async for pedaco in pedacos:
+        buffer += pedaco
+        *linhas, buffer = buffer.split(b"\n")
+        for linha in linhas:
+            numero += 1
+            registro = _decodificar_linha(numero, linha)
+            if registro is not None:
+                yield registro
+        if len(buffer) > TAMANHO_MAXIMO_REGISTRO:
+            raise ErroLeituraLote(f"Linha {numero + 1} excede {TAMANHO_MAXIMO_REGISTRO} bytes.")
+    if buffer.strip():
+        registro = _decodificar_linha(numero + 1, buffer)
+        if registro is not None:
+            yield registro
+
+def _decodificar_linha(numero, linha):
+    if not linha.strip():
+        return None
+    try:
+        return numero, json.loads(linha), None
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        return numero, None, f"JSON inválido: {e}"
+
+async def iterar_array_json(pedacos):
+    """Elementos de um array JSON ("[{...}, {...}]"), decodificados um a um.
+
+    Ao contrário do NDJSON, um elemento malformado impede localizar os
+    seguintes: a leitura termina com um erro nessa posição.
+    """
+    decodificador = codecs.getincrementaldecoder("utf-8")()
+    decoder = json.JSONDecoder()
+    buffer = ""
+    numero = 0
+    # O que pode vir a seguir: "[" no início, depois valores e vírgulas alternados
+    esperado = "abertura"  # abertura | valor_ou_fim | valor | virgula_ou_fim | nada
+    # Um elemento incompleto só é decodificado de novo quando o buffer dobra:
+    # reler um elemento grande a cada pedaço deixaria a leitura quadrática
+    tentar_com = 0
+
+    def consumir(final):
+        nonlocal buffer, numero, esperado
+        pos = 0
+        while esperado != "nada":
+            while pos < len(buffer) and buffer[pos] in _ESPACOS:
+                pos += 1
+            if pos >= len(buffer):
+                break
+            caractere = buffer[pos]
+            if esperado == "abertura":
+                if caractere != "[":
+                    raise ErroLeituraLote("O corpo deve ser um array JSON ou NDJSON.")
+                esperado, pos = "valor_ou_fim", pos + 1
+            elif caractere == "]" and esperado in ("valor_ou_fim", "virgula_ou_fim"):
+                esperado, pos = "nada", pos + 1
+            elif caractere == "," and esperado == "virgula_ou_fim":
+                esperado, pos = "valor", pos + 1
+            elif esperado == "virgula_ou_fim" or caractere in ",]":
+                raise ErroLeituraLote(f"Array JSON malformado no elemento {numero + 1}: "
+                                      f"'{caractere}' inesperado.")
+            else:
+                try:
+                    objeto, fim = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    break  # elemento ainda incompleto: espera o próximo pedaço
+                # Um número no fim do buffer pode continuar no próximo pedaço
+                if fim == len(buffer) and not final and not isinstance(objeto, (dict, list, str)):
+                    break
+                numero += 1
+                yield numero, objeto, None
+                esperado, pos = "virgula_ou_fim", fim
+        buffer = buffer[pos:]
+
+    async for pedaco in pedacos:
+        buffer += decodificador.decode(pedaco)
+        if tentar_com <= len(buffer) or len(buffer) > TAMANHO_MAXIMO_REGISTRO:
+            for registro in consumir(final=False):
+                yield registro
+            tentar_com = 2 * len(buffer)
+        if len(buffer) > TAMANHO_MAXIMO_REGISTRO:
+            raise ErroLeituraLote(f"Elemento {numero + 1} excede {TAMANHO_MAXIMO_REGISTRO} bytes.")
+    buffer += decodificador.decode(b"", final=True)
+    for registro in consumir(final=True):
+        yield registro
+    if buffer.strip() or esperado != "nada":
+        yield numero + 1, None, "Array JSON malformado ou incompleto a partir deste elemento."
@@ -1,12 +1,27 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Depends, Form
+from fastapi import FastAPI, UploadFile, File, HTTPException, Depends, Form, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jose import JWTError, jwt
+import anyio
 from passlib.context import CryptContext
-import psycopg2
 import os
 import json
+import hashlib
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from datetime import datetime, timedelta
+from typing import List, Optional
+from armazem_textos import TextoAusenteError, transmitir_texto
+from banco import PoolEsgotadoError, criar_pool
+from cache_ttl import CacheTTL
+from dados_referencia import CacheReferencia, ReferenciaDesconhecidaError
+from estatisticas import ler_estatisticas
+from gravador_documentos import GravadorLote
+from leitura_lote import ErroLeituraLote, iterar_array_json, iterar_ndjson
+from instrumentacao import CursorMedido, instrumentar_fastapi, instrumentar_pool
 
 app = FastAPI()
 
@@ -30,16 +45,82 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 60
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
-# 🔌 Conexão com PostgreSQL
-def conectar():
-    return psycopg2.connect(
-        dbname="db_leis",
-        user="postgres",
-        password="Dl@$1958",
-        host="localhost",
-        port="5432"
+# 🔌 Pool de conexões com PostgreSQL
+pool = criar_pool(
+    dbname="db_leis",
+    user="postgres",
+    password="Dl@$1958",
+    host="localhost",
+    port="5432",
+    cursor_factory=CursorMedido
+)
+
+# 📈 Latência por rota, tempo por consulta SQL e estado do pool em /metrics
+instrumentar_pool(pool, "api")
+instrumentar_fastapi(app, "api")
+
+# Pool saturado não é erro da aplicação: 503 com Retry-After, para o cliente
+# (e o teste de carga) distinguir sobrecarga de falha
+@app.exception_handler(PoolEsgotadoError)
+async def pool_esgotado(request: Request, exc: PoolEsgotadoError):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(max(1, round(pool.timeout)))},
     )
 
+# Uma conexão por requisição: o FastAPI reaproveita esta dependência entre
+# obter_usuario_logado e o endpoint, então ambos usam a mesma conexão
+def obter_conexao():
+    with pool.conexao() as conn:
+        yield conn
+
+# 🧵 Acesso ao banco fora do event loop: os handlers async entregam o trabalho
+# bloqueante do psycopg2 a threads, limitadas ao tamanho do pool de conexões
+limitador_banco = anyio.CapacityLimiter(pool.maximo)
+
+async def no_banco(funcao, *args):
+    return await anyio.to_thread.run_sync(partial(funcao, *args), limiter=limitador_banco)
+
+# 📚 Tipos, órgãos, status e prioridades em memória: o upload resolve nomes sem
+# subconsultas e recusa nomes desconhecidos em vez de gravar NULL
+referencias = CacheReferencia(pool, ttl=float(os.getenv("CACHE_REFERENCIA_TTL", "300")))
+
+# 🧠 Usuários já resolvidos a partir do "sub" do token, para não consultar
+# a tabela usuarios a cada requisição autenticada
+cache_usuarios = CacheTTL(
+    maximo=int(os.getenv("CACHE_USUARIOS_MAX", "1000")),
+    ttl=float(os.getenv("CACHE_USUARIOS_TTL", "60"))
+)
+
+# Chamar sempre que um usuário for criado, alterado ou removido
+def invalidar_usuario(email: str):
+    cache_usuarios.invalidar(email)
+
+# 🔑 bcrypt em pool dedicado: cada hash custa dezenas de ms de CPU e não pode
+# rodar no event loop nem disputar as threads do banco. O bcrypt libera o GIL,
+# então threads bastam. Além dos workers, só SENHAS_FILA_MAX pedidos esperam;
+# o excedente recebe 503 imediatamente em vez de acumular fila.
+SENHAS_WORKERS = int(os.getenv("SENHAS_WORKERS", "2"))
+SENHAS_FILA_MAX = int(os.getenv("SENHAS_FILA_MAX", "32"))
+executor_senhas = ThreadPoolExecutor(max_workers=SENHAS_WORKERS, thread_name_prefix="senhas")
+vagas_senhas = threading.BoundedSemaphore(SENHAS_WORKERS + SENHAS_FILA_MAX)
+
+def enviar_para_pool_senhas(funcao, *args):
+    if not vagas_senhas.acquire(blocking=False):
+        raise HTTPException(
+            status_code=503,
+            detail="Servidor ocupado processando senhas. Tente novamente.",
+            headers={"Retry-After": "1"}
+        )
+    try:
+        futuro = executor_senhas.submit(funcao, *args)
+    except Exception:
+        vagas_senhas.release()
+        raise
+    futuro.add_done_callback(lambda _: vagas_senhas.release())
+    return futuro
+
 # 🔐 Utilitários
 def verificar_senha(senha_plain, senha_hash):
     return pwd_context.verify(senha_plain, senha_hash)
@@ -47,38 +128,50 @@ def verificar_senha(senha_plain, senha_hash):
 def gerar_hash_senha(senha):
     return pwd_context.hash(senha)
 
+async def verificar_senha_no_pool(senha_plain, senha_hash):
+    return await asyncio.wrap_future(enviar_para_pool_senhas(verificar_senha, senha_plain, senha_hash))
+
 def criar_token_acesso(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=15))
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-def obter_usuario(email: str):
-    conn = conectar()
+def obter_usuario(email: str, conn):
     cur = conn.cursor()
     cur.execute("SELECT id, nome, email, senha FROM usuarios WHERE email = %s;", (email,))
     resultado = cur.fetchone()
     cur.close()
-    conn.close()
     if resultado:
         return {"id": resultado[0], "nome": resultado[1], "email": resultado[2], "senha": resultado[3]}
     return None
 
-def autenticar_usuario(email: str, senha: str):
-    usuario = obter_usuario(email)
-    if usuario and verificar_senha(senha, usuario["senha"]):
+# A conexão só fica emprestada durante a leitura do usuário: volta ao pool
+# antes de a verificação esperar pelo bcrypt
+def buscar_usuario(email: str):
+    with pool.conexao() as conn:
+        return obter_usuario(email, conn)
+
+async def autenticar_usuario(email: str, senha: str):
+    usuario = await no_banco(buscar_usuario, email)
+    if usuario and await verificar_senha_no_pool(senha, usuario["senha"]):
         return usuario
     return None
 
-async def obter_usuario_logado(token: str = Depends(oauth2_scheme)):
+async def obter_usuario_logado(token: str = Depends(oauth2_scheme), conn=Depends(obter_conexao)):
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email = payload.get("sub")
         if email is None:
             raise HTTPException(status_code=401, detail="Token inválido")
-        usuario = obter_usuario(email)
+        usuario = cache_usuarios.obter(email)
         if usuario is None:
-            raise HTTPException(status_code=401, detail="Usuário não encontrado")
+            usuario = await no_banco(obter_usuario, email, conn)
+            if usuario is None:
+                raise HTTPException(status_code=401, detail="Usuário não encontrado")
+            # O hash da senha não fica em memória: só o login precisa dele
+            usuario = {"id": usuario["id"], "nome": usuario["nome"], "email": usuario["email"]}
+            cache_usuarios.guardar(email, usuario)
         return usuario
     except JWTError:
         raise HTTPException(status_code=401, detail="Token inválido")
@@ -86,7 +179,7 @@ async def obter_usuario_logado(token: str = Depends(oauth2_scheme)):
 # 🔐 Login
 @app.post("/token")
 async def login(form_data: OAuth2PasswordRequestForm = Depends()):
-    usuario = autenticar_usuario(form_data.username, form_data.password)
+    usuario = await autenticar_usuario(form_data.username, form_data.password)
     if not usuario:
         raise HTTPException(status_code=401, detail="Credenciais inválidas")
     token = criar_token_acesso({"sub": usuario["email"]}, timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
@@ -97,91 +190,385 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
 def home():
     return {"mensagem": "API de documentos está ativa!"}
 
+# 📊 Saturação do pool de conexões
+@app.get("/metricas/pool")
+def metricas_pool():
+    return pool.metricas()
+
+# 🧠 Acertos e falhas dos caches em memória
+@app.get("/metricas/cache")
+def metricas_cache():
+    return {"usuarios": cache_usuarios.metricas(), "referencia": referencias.metricas()}
+
 # 📄 Listar documentos
+LIMITE_MAXIMO = 1000
+
+SQL_DOCUMENTOS_ATIVOS = """
+    FROM documentos d
+    LEFT JOIN tipos_documento td ON d.tipo_documento_id = td.id
+    LEFT JOIN orgaos o ON d.orgao_id = o.id
+    LEFT JOIN status s ON d.status_id = s.id
+    LEFT JOIN prioridade p ON d.prioridade_id = p.id
+    WHERE d.removido_em IS NULL
+"""
+
+SQL_LISTAR_DOCUMENTOS = """
+    SELECT d.id, d.titulo, td.nome AS tipo, o.nome AS orgao, s.nome AS status, p.nome AS prioridade
+""" + SQL_DOCUMENTOS_ATIVOS
+
+# Filtros comuns à listagem e ao resumo: nomes de tipo/órgão/status/prioridade
+def filtros_documentos(tipo, orgao, status, prioridade):
+    sql, params = "", []
+    for coluna, valores in (("td.nome", tipo), ("o.nome", orgao), ("s.nome", status), ("p.nome", prioridade)):
+        if valores:
+            sql += f" AND {coluna} = ANY(%s)"
+            params.append(valores)
+    return sql, params
+
+def montar_consulta_documentos(cursor, limite, tipo, orgao, status, prioridade):
+    sql = SQL_LISTAR_DOCUMENTOS
+    params = []
+    # Paginação por chave: continua a partir do último id já entregue
+    if cursor is not None:
+        sql += " AND d.id > %s"
+        params.append(cursor)
+    filtro, params_filtro = filtros_documentos(tipo, orgao, status, prioridade)
+    sql += filtro + " ORDER BY d.id"
+    params += params_filtro
+    if limite is not None:
+        sql += " LIMIT %s"
+        params.append(limite)
+    return sql, params
+
+def linha_para_documento(r):
+    return {
+        "id": r[0],
+        "titulo": r[1],
+        "tipo": r[2],
+        "orgao": r[3],
+        "status": r[4],
+        "prioridade": r[5]
+    }
+
+# Cursor do lado do servidor: as linhas vêm do banco em blocos e saem como NDJSON,
+# sem montar a lista inteira na memória. Usa a conexão da requisição: desde o
+# FastAPI 0.118 a dependência com yield só a devolve ao pool depois de a
+# resposta ser transmitida (requirements.txt), então é uma conexão por requisição.
+def transmitir_documentos(conn, sql, params):
+    cur = conn.cursor(name="listar_documentos")
+    cur.itersize = 1000
+    try:
+        cur.execute(sql, params)
+        for r in cur:
+            yield json.dumps(linha_para_documento(r), ensure_ascii=False) + "\n"
+    finally:
+        cur.close()
+
+# 🏷️ Respostas condicionais: o ETag é o hash do corpo. Um cliente que já tem
+# essa versão (If-None-Match) recebe 304 sem corpo e reaproveita o que guardou.
+# "private, no-cache": só o navegador/cliente do usuário guarda, e revalida sempre.
+def etag_corresponde(if_none_match, etag):
+    if not if_none_match:
+        return False
+    candidatos = [c.strip() for c in if_none_match.split(",")]
+    return "*" in candidatos or any(c.removeprefix("W/") == etag for c in candidatos)
+
+def resposta_condicional(request, dados, headers=None):
+    corpo = json.dumps(dados, ensure_ascii=False).encode("utf-8")
+    etag = '"' + hashlib.blake2b(corpo, digest_size=16).hexdigest() + '"'
+    headers = {**(headers or {}), "ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_corresponde(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(corpo, media_type="application/json", headers=headers)
+
 @app.get("/documentos")
-def listar_documentos(usuario: dict = Depends(obter_usuario_logado)):
-    conn = conectar()
+def listar_documentos(
+    request: Request,
+    cursor: Optional[int] = Query(None, description="Último id recebido; retorna os documentos seguintes"),
+    limite: Optional[int] = Query(None, ge=1, le=LIMITE_MAXIMO),
+    tipo: Optional[List[str]] = Query(None),
+    orgao: Optional[List[str]] = Query(None),
+    status: Optional[List[str]] = Query(None),
+    prioridade: Optional[List[str]] = Query(None),
+    formato: str = Query("json", pattern="^(json|ndjson)$"),
+    usuario: dict = Depends(obter_usuario_logado),
+    conn=Depends(obter_conexao)
+):
+    sql, params = montar_consulta_documentos(cursor, limite, tipo, orgao, status, prioridade)
+    if formato == "ndjson":
+        return StreamingResponse(transmitir_documentos(conn, sql, params), media_type="application/x-ndjson")
+
     cur = conn.cursor()
-    cur.execute("""
-        SELECT d.id, d.titulo, td.nome AS tipo, o.nome AS orgao, s.nome AS status, p.nome AS prioridade
-        FROM documentos d
-        LEFT JOIN tipos_documento td ON d.tipo_documento_id = td.id
-        LEFT JOIN orgaos o ON d.orgao_id = o.id
-        LEFT JOIN status s ON d.status_id = s.id
-        LEFT JOIN prioridade p ON d.prioridade_id = p.id
-        ORDER BY d.id;
-    """)
+    cur.execute(sql, params)
     resultados = cur.fetchall()
     cur.close()
-    conn.close()
-    return [
-        {
-            "id": r[0],
-            "titulo": r[1],
-            "tipo": r[2],
-            "orgao": r[3],
-            "status": r[4],
-            "prioridade": r[5]
-        }
-        for r in resultados
-    ]
+    documentos = [linha_para_documento(r) for r in resultados]
+    headers = {}
+    # Página cheia: informa de onde a próxima deve continuar
+    if limite is not None and len(documentos) == limite:
+        headers["X-Proximo-Cursor"] = str(documentos[-1]["id"])
+    return resposta_condicional(request, documentos, headers)
+
+# 📊 Contagens por tipo, órgão, status e prioridade, calculadas no banco sobre
+# os mesmos filtros da listagem: o painel recebe só os totais, não as linhas.
+# Um GROUPING SETS agrega todas as dimensões em uma única leitura da tabela.
+DIMENSOES_RESUMO = (("tipo", "td.nome"), ("orgao", "o.nome"), ("status", "s.nome"), ("prioridade", "p.nome"))
+
+SQL_RESUMO_DOCUMENTOS = f"""
+    SELECT {", ".join(coluna for _, coluna in DIMENSOES_RESUMO)},
+           GROUPING({", ".join(coluna for _, coluna in DIMENSOES_RESUMO)}) AS agrupamento,
+           count(*)
+""" + SQL_DOCUMENTOS_ATIVOS
+
+@app.get("/documentos/resumo")
+def resumir_documentos(
+    request: Request,
+    tipo: Optional[List[str]] = Query(None),
+    orgao: Optional[List[str]] = Query(None),
+    status: Optional[List[str]] = Query(None),
+    prioridade: Optional[List[str]] = Query(None),
+    usuario: dict = Depends(obter_usuario_logado),
+    conn=Depends(obter_conexao)
+):
+    # Sem filtros, as contagens do acervo inteiro já estão prontas (estatisticas.py)
+    if not (tipo or orgao or status or prioridade):
+        return resposta_condicional(request, ler_estatisticas(conn))
+
+    filtro, params = filtros_documentos(tipo, orgao, status, prioridade)
+    conjuntos = ", ".join(f"({coluna})" for _, coluna in DIMENSOES_RESUMO)
+    sql = SQL_RESUMO_DOCUMENTOS + filtro + f" GROUP BY GROUPING SETS ({conjuntos}, ())"
+
+    cur = conn.cursor()
+    cur.execute(sql, params)
+    linhas = cur.fetchall()
+    cur.close()
+
+    # GROUPING() liga um bit por coluna ausente do agrupamento: o conjunto da
+    # dimensão i é o que tem todos os bits ligados menos o dela
+    todos = (1 << len(DIMENSOES_RESUMO)) - 1
+    resumo = {"total": 0, **{f"por_{campo}": [] for campo, _ in DIMENSOES_RESUMO}}
+    for linha in linhas:
+        *valores, agrupamento, total = linha
+        if agrupamento == todos:
+            resumo["total"] = total
+            continue
+        for i, (campo, _) in enumerate(DIMENSOES_RESUMO):
+            if agrupamento == todos & ~(1 << (len(DIMENSOES_RESUMO) - 1 - i)):
+                resumo[f"por_{campo}"].append({"nome": valores[i], "total": total})
+    for campo, _ in DIMENSOES_RESUMO:
+        resumo[f"por_{campo}"].sort(key=lambda item: (-item["total"], item["nome"] or ""))
+    return resposta_condicional(request, resumo)
+
+# 📈 Contagens do acervo mantidas por gatilhos (migracoes/007): tempo
+# constante em relação ao número de documentos
+@app.get("/estatisticas")
+def estatisticas_acervo(request: Request, usuario: dict = Depends(obter_usuario_logado),
+                        conn=Depends(obter_conexao)):
+    return resposta_condicional(request, ler_estatisticas(conn))
+
+# 🎛️ Valores possíveis de cada filtro, servidos da memória. A conexão é a
+# mesma que obter_usuario_logado já tomou do pool: uma recarga do cache a usa
+# em vez de pedir uma segunda
+@app.get("/documentos/filtros")
+def opcoes_filtros(request: Request, usuario: dict = Depends(obter_usuario_logado),
+                   conn=Depends(obter_conexao)):
+    return resposta_condicional(request, referencias.opcoes(conn))
+
+# 📜 Texto completo de um documento, lido em blocos do armazém zstd
+# (armazem_textos.py). Aceita Range com um intervalo de bytes ("bytes=0-65535",
+# "bytes=-500"), para leitores que baixam o texto aos pedaços ou retomam o
+# download. O ETag é o sha256 do texto: só muda quando o conteúdo muda.
+def intervalo_pedido(cabecalho, tamanho):
+    """(início, fim exclusivo) pedido no Range, ou None para o texto inteiro."""
+    if not cabecalho or not cabecalho.startswith("bytes=") or "," in cabecalho:
+        # Sem Range, de outra unidade ou com vários intervalos: texto inteiro
+        return None
+    inicio, _, fim = cabecalho[len("bytes="):].strip().partition("-")
+    try:
+        if not inicio:
+            inicio, fim = max(0, tamanho - int(fim)), tamanho
+        else:
+            inicio, fim = int(inicio), min(int(fim) + 1, tamanho) if fim else tamanho
+    except ValueError:
+        return None  # Range malformado é ignorado
+    if inicio < 0 or inicio >= fim:
+        raise HTTPException(status_code=416, detail="Intervalo fora do texto.",
+                            headers={"Content-Range": f"bytes */{tamanho}"})
+    return inicio, fim
+
+@app.get("/documentos/{documento_id}/texto")
+def texto_documento(documento_id: int, request: Request, usuario: dict = Depends(obter_usuario_logado),
+                    conn=Depends(obter_conexao)):
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT texto_hash, texto_tamanho, conteudo_texto FROM documentos WHERE id = %s AND removido_em IS NULL;",
+        (documento_id,)
+    )
+    linha = cur.fetchone()
+    cur.close()
+    if linha is None or (linha[0] is None and linha[2] is None):
+        raise HTTPException(status_code=404, detail="Documento sem texto ou inexistente.")
+    texto_hash, tamanho, conteudo = linha
+    if texto_hash is None:
+        # Texto ainda gravado no banco (antes de armazem_textos.py --migrar)
+        dados = conteudo.encode("utf-8")
+        tamanho, etag = len(dados), '"' + hashlib.sha256(dados).hexdigest() + '"'
+    else:
+        etag = f'"{texto_hash}"'
+
+    headers = {"ETag": etag, "Accept-Ranges": "bytes", "Cache-Control": "private, no-cache"}
+    if etag_corresponde(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    intervalo = None
+    # If-Range: o intervalo só vale se o cliente ainda tem esta versão do texto
+    if request.headers.get("if-range", etag) == etag:
+        intervalo = intervalo_pedido(request.headers.get("range"), tamanho)
+    inicio, fim = intervalo or (0, tamanho)
+    if intervalo:
+        headers["Content-Range"] = f"bytes {inicio}-{fim - 1}/{tamanho}"
+    headers["Content-Length"] = str(fim - inicio)
+
+    if texto_hash is None:
+        blocos = iter([dados[inicio:fim]])
+    else:
+        try:
+            blocos = transmitir_texto(texto_hash, inicio, fim)
+        except TextoAusenteError as e:
+            raise HTTPException(status_code=500, detail=str(e))
+    return StreamingResponse(blocos, status_code=206 if intervalo else 200,
+                             media_type="text/plain; charset=utf-8", headers=headers)
 
 # 📤 Upload com validação
+def validar_documento(dados):
+    if not isinstance(dados, dict):
+        raise ValueError("O documento deve ser um objeto JSON.")
+    titulo = dados.get("titulo")
+    tipo = dados.get("tipo")
+    orgao = dados.get("orgao")
+    status = dados.get("status")
+    prioridade = dados.get("prioridade")
+    if not titulo or not tipo or not orgao:
+        raise ValueError("Campos obrigatórios ausentes.")
+    return titulo, tipo, orgao, status, prioridade
+
+def inserir_documento(conn, titulo, tipo, orgao, status, prioridade):
+    ids = [
+        referencias.resolver(campo, nome, conn)
+        for campo, nome in (("tipo", tipo), ("orgao", orgao), ("status", status), ("prioridade", prioridade))
+    ]
+    cur = conn.cursor()
+    cur.execute("""
+        INSERT INTO documentos (titulo, tipo_documento_id, orgao_id, status_id, prioridade_id)
+        VALUES (%s, %s, %s, %s, %s);
+    """, (titulo, *ids))
+    conn.commit()
+    cur.close()
+
 @app.post("/upload")
-async def upload_documento(file: UploadFile = File(...), usuario: dict = Depends(obter_usuario_logado)):
+async def upload_documento(file: UploadFile = File(...), usuario: dict = Depends(obter_usuario_logado),
+                           conn=Depends(obter_conexao)):
     if not file.filename.endswith(".json"):
         raise HTTPException(status_code=400, detail="Apenas arquivos JSON são permitidos.")
     conteudo = await file.read()
     try:
-        dados = json.loads(conteudo)
-        titulo = dados.get("titulo")
-        tipo = dados.get("tipo")
-        orgao = dados.get("orgao")
-        status = dados.get("status")
-        prioridade = dados.get("prioridade")
-        if not titulo or not tipo or not orgao:
-            raise ValueError("Campos obrigatórios ausentes.")
+        titulo, tipo, orgao, status, prioridade = validar_documento(json.loads(conteudo))
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Erro ao validar conteúdo: {e}")
 
-    conn = conectar()
-    cur = conn.cursor()
-    cur.execute("""
-        INSERT INTO documentos (titulo, tipo_documento_id, orgao_id, status_id, prioridade_id)
-        VALUES (%s,
-                (SELECT id FROM tipos_documento WHERE nome = %s),
-                (SELECT id FROM orgaos WHERE nome = %s),
-                (SELECT id FROM status WHERE nome = %s),
-                (SELECT id FROM prioridade WHERE nome = %s));
-    """, (titulo, tipo, orgao, status, prioridade))
-    conn.commit()
-    cur.close()
-    conn.close()
+    try:
+        await no_banco(inserir_documento, conn, titulo, tipo, orgao, status, prioridade)
+    except ReferenciaDesconhecidaError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     return {"mensagem": f"Documento '{titulo}' salvo no banco com sucesso."}
 
+# 📦 Upload em lote: NDJSON (um documento por linha) ou array JSON, lido aos
+# pedaços e gravado em transações de LOTE_UPLOAD documentos
+LOTE_UPLOAD = int(os.getenv("LOTE_UPLOAD", "500"))
+
+# Valida, resolve nomes e grava um lote; roda em thread, via no_banco
+def gravar_lote_api(gravador, registros):
+    respostas, gravados = {}, []
+    for numero, dados in registros:
+        try:
+            titulo, tipo, orgao, status, prioridade = validar_documento(dados)
+            doc = {
+                "titulo": titulo,
+                "tipo_documento_id": referencias.resolver("tipo", tipo, gravador.conn),
+                "orgao_id": referencias.resolver("orgao", orgao, gravador.conn),
+                "status_id": referencias.resolver("status", status, gravador.conn),
+                "prioridade_id": referencias.resolver("prioridade", prioridade, gravador.conn),
+            }
+        except ValueError as e:
+            respostas[numero] = {"linha": numero, "aceito": False, "erro": str(e)}
+            continue
+        gravados.extend(gravador.adicionar(doc, origem=numero))
+    gravados.extend(gravador.descarregar())
+    for r in gravados:
+        respostas[r["origem"]] = (
+            {"linha": r["origem"], "aceito": False, "erro": r["erro"]} if r["erro"]
+            else {"linha": r["origem"], "aceito": True, "id": r["id"]}
+        )
+    return [respostas[numero] for numero, _ in registros]
+
+@app.post("/upload/lote")
+async def upload_lote(request: Request, usuario: dict = Depends(obter_usuario_logado),
+                      conn=Depends(obter_conexao)):
+    tipo_conteudo = request.headers.get("content-type", "")
+    if "ndjson" in tipo_conteudo or "jsonlines" in tipo_conteudo:
+        registros = iterar_ndjson(request.stream())
+    else:
+        registros = iterar_array_json(request.stream())
+
+    # O intervalo infinito deixa o tamanho do lote a cargo deste endpoint
+    gravador = GravadorLote(conn, tamanho_lote=LOTE_UPLOAD, intervalo_flush=float("inf"))
+    resultados, pendentes = [], []
+    try:
+        async for numero, dados, erro in registros:
+            if erro:
+                resultados.append({"linha": numero, "aceito": False, "erro": erro})
+                continue
+            pendentes.append((numero, dados))
+            if len(pendentes) >= LOTE_UPLOAD:
+                resultados.extend(await no_banco(gravar_lote_api, gravador, pendentes))
+                pendentes = []
+        if pendentes:
+            resultados.extend(await no_banco(gravar_lote_api, gravador, pendentes))
+    except ErroLeituraLote as e:
+        # Os lotes anteriores já foram gravados; informa até onde chegou
+        raise HTTPException(status_code=400, detail={"erro": str(e), "resultados": resultados})
+
+    resultados.sort(key=lambda r: r["linha"])
+    aceitos = sum(1 for r in resultados if r["aceito"])
+    return {
+        "aceitos": aceitos,
+        "rejeitados": len(resultados) - aceitos,
+        "resultados": resultados
+    }
+
 # 👥 Administração de usuários
 @app.get("/usuarios")
-def listar_usuarios(usuario: dict = Depends(obter_usuario_logado)):
-    conn = conectar()
+def listar_usuarios(usuario: dict = Depends(obter_usuario_logado), conn=Depends(obter_conexao)):
     cur = conn.cursor()
     cur.execute("SELECT id, nome, email FROM usuarios;")
     usuarios = cur.fetchall()
     cur.close()
-    conn.close()
     return [{"id": u[0], "nome": u[1], "email": u[2]} for u in usuarios]
 
 @app.post("/usuarios")
 def criar_usuario(nome: str = Form(...), email: str = Form(...), senha: str = Form(...)):
-    senha_hash = gerar_hash_senha(senha)
-    conn = conectar()
-    cur = conn.cursor()
-    try:
-        cur.execute("INSERT INTO usuarios (nome, email, senha) VALUES (%s, %s, %s);", (nome, email, senha_hash))
-        conn.commit()
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    finally:
-        cur.close()
-        conn.close()
+    # Endpoint síncrono (já roda em thread): aguarda o pool de senhas sem
+    # segurar conexão, e só então empresta uma para o INSERT
+    senha_hash = enviar_para_pool_senhas(gerar_hash_senha, senha).result()
+    with pool.conexao() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute("INSERT INTO usuarios (nome, email, senha) VALUES (%s, %s, %s);", (nome, email, senha_hash))
+            conn.commit()
+            invalidar_usuario(email)
+        except Exception as e:
+            conn.rollback()
+            raise HTTPException(status_code=400, detail=str(e))
+        finally:
+            cur.close()
     return {"mensagem": "Usuário criado com sucesso"}
\ No newline at end of file
@@ -0,0 +1,71 @@
+import hashlib
+import json
+import os
+
+ARQUIVO_MANIFESTO = ".manifesto_ingestao.json"
+
+# Hash SHA-256 lido em blocos, sem carregar o arquivo inteiro na memória
+def hash_arquivo(caminho, tamanho_bloco=1024 * 1024):
+    h = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(tamanho_bloco), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+# 🧾 Manifesto da ingestão incremental: arquivo → hash, tamanho, mtime e id no banco
+class Manifesto:
+    def __init__(self, pasta):
+        self.pasta = pasta
+        self.caminho = os.path.join(pasta, ARQUIVO_MANIFESTO)
+        self.entradas = {}
+        if os.path.exists(self.caminho):
+            with open(self.caminho, encoding="utf-8") as f:
+                self.entradas = json.load(f)
+
+    def verificar(self, arquivo):
+        """Classifica o arquivo como "inalterado", "novo" ou "alterado".
+
+        Tamanho e mtime iguais ao manifesto bastam para pular o arquivo sem abri-lo;
+        só quando eles mudam o conteúdo é lido para comparar o hash.
+        Retorna (situacao, info), onde info é a entrada a registrar após gravar.
+        """
+        caminho = os.path.join(self.pasta, arquivo)
+        st = os.stat(caminho)
+        entrada = self.entradas.get(arquivo)
+        ativa = entrada is not None and not entrada.get("removido")
+        if ativa and entrada["tamanho"] == st.st_size and entrada["mtime"] == st.st_mtime_ns:
+            return "inalterado", entrada
+
+        digest = hash_arquivo(caminho)
+        if ativa and entrada["hash"] == digest:
+            # Só o mtime mudou (cópia, touch): atualiza o manifesto e segue sem reprocessar
+            entrada["mtime"] = st.st_mtime_ns
+            return "inalterado", entrada
+
+        info = {
+            "hash": digest,
+            "tamanho": st.st_size,
+            "mtime": st.st_mtime_ns,
+            "documento_id": entrada.get("documento_id") if entrada else None,
+            "removido": False,
+        }
+        return ("alterado" if info["documento_id"] else "novo"), info
+
+    def registrar(self, arquivo, info, documento_id):
+        self.entradas[arquivo] = dict(info, documento_id=documento_id, removido=False)
+
+    def ausentes(self, arquivos_presentes):
+        """Entradas ativas cujo arquivo não existe mais na pasta."""
+        presentes = set(arquivos_presentes)
+        return [
+            (arquivo, entrada) for arquivo, entrada in self.entradas.items()
+            if arquivo not in presentes and not entrada.get("removido")
+        ]
+
+    def salvar(self):
+        # Grava em arquivo temporário e troca, para nunca deixar um manifesto pela metade
+        temporario = self.caminho + ".tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump(self.entradas, f, ensure_ascii=False, indent=2, sort_keys=True)
+        os.replace(temporario, self.caminho)
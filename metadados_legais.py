@@ -0,0 +1,116 @@
+import os
+import re
+from datetime import date
+
+# Só o cabeçalho é examinado: título, número e data de um ato ficam nas
+# primeiras linhas, e uma busca que falha não percorre o documento inteiro
+LIMITE_CABECALHO = 4000
+
+MESES = {
+    "janeiro": 1, "fevereiro": 2, "março": 3, "marco": 3, "abril": 4, "maio": 5, "junho": 6,
+    "julho": 7, "agosto": 8, "setembro": 9, "outubro": 10, "novembro": 11, "dezembro": 12,
+}
+_MES = "|".join(MESES)
+
+NIVEIS = {"baixa": 0, "media": 1, "alta": 2}
+
+# 🏷️ Uma única expressão, compilada uma vez e percorrida uma só vez: cada
+# alternativa reconhece um tipo de informação, da mais confiável à menos
+PADRAO = re.compile(rf"""
+    (?P<ato>
+        \b(?P<tipo>Portaria(?:\s+Conjunta)?|Decreto(?:-Lei)?|Lei(?:\s+Complementar)?
+            |Instru[çc][ãa]o\s+Normativa|Resolu[çc][ãa]o|Medida\s+Provis[óo]ria)\b
+        [^\n]{{0,40}}?                                  # órgão/sigla: "MTE", "SIT/MTE"
+        \bn[º°o.]?\s*(?P<numero>\d[\d .]{{0,12}}\d|\d)   # "nº 11.853", "Nº 3 .872"
+        (?:\s*,?\s*de\s+(?:
+            (?P<dia>\d{{1,2}})[º°o]?\s+de\s+(?P<mes>{_MES})\s+de\s+(?P<ano>\d{{4}})
+            |(?P<data>\d{{2}}/\d{{2}}/\d{{4}})
+        ))?
+    )
+    |(?P<extenso>(?P<dia_ext>\d{{1,2}})[º°o]?\s+de\s+(?P<mes_ext>{_MES})\s+de\s+(?P<ano_ext>\d{{4}}))
+    |(?P<numerica>\b\d{{2}}/\d{{2}}/\d{{4}}\b)
+    |\b(?P<ano_solto>(?:19|20)\d{{2}})\b
+""", re.IGNORECASE | re.VERBOSE)
+
+
+def _data_iso(dia, mes, ano):
+    # date() recusa também dias que o mês não tem ("31/02/2023"), que o banco
+    # rejeitaria derrubando o documento inteiro
+    try:
+        return date(int(ano), int(mes), int(dia)).isoformat()
+    except ValueError:
+        return None
+
+
+def _data_numerica(texto):
+    dia, mes, ano = texto.split("/")
+    return _data_iso(dia, mes, ano)
+
+
+def _titulo_do_arquivo(nome_arquivo):
+    nome = os.path.basename(nome_arquivo)
+    while os.path.splitext(nome)[1]:
+        nome = os.path.splitext(nome)[0]
+    return nome.replace("_", " ").replace("-", " ").strip().capitalize() or None
+
+
+def extrair_metadados(texto, nome_arquivo=None):
+    """Título, número, ano e data de publicação a partir do cabeçalho do texto.
+
+    Entende formatos como "Decreto nº 11.853, de 26 de dezembro de 2023" e
+    "Portaria MTE Nº 3.872 DE 21/12/2023". Nada é inventado: o que não for
+    encontrado fica None, e `confianca` diz de onde veio cada campo — "alta"
+    (linha do ato), "media" (data solta no cabeçalho), "baixa" (ano solto ou
+    título tirado do nome do arquivo).
+    """
+    texto = texto or ""
+    campos = {"titulo": None, "numero": None, "ano": None, "data_publicacao": None}
+    confianca = dict.fromkeys(campos)
+
+    def definir(campo, valor, nivel):
+        # Um valor só é trocado por outro de confiança maior
+        atual = confianca[campo]
+        if valor is not None and (atual is None or NIVEIS[nivel] > NIVEIS[atual]):
+            campos[campo], confianca[campo] = valor, nivel
+
+    for m in PADRAO.finditer(texto, 0, LIMITE_CABECALHO):
+        if m.group("ato"):
+            if confianca["titulo"] == "alta":
+                continue  # atos citados depois do título não contam
+            inicio = texto.rfind("\n", 0, m.start()) + 1
+            fim = texto.find("\n", m.end())
+            linha = " ".join(texto[inicio:fim if fim != -1 else len(texto)].split())
+            definir("titulo", linha[:200], "alta")
+            definir("numero", re.sub(r"\D", "", m.group("numero")), "alta")
+            if m.group("mes"):
+                data = _data_iso(m.group("dia"), MESES[m.group("mes").lower()], m.group("ano"))
+            else:
+                data = _data_numerica(m.group("data")) if m.group("data") else None
+            # A data do ato prevalece sobre datas soltas vistas antes dele
+            definir("data_publicacao", data, "alta")
+            definir("ano", int(data[:4]) if data else None, "alta")
+        elif m.group("extenso"):
+            data = _data_iso(m.group("dia_ext"), MESES[m.group("mes_ext").lower()], m.group("ano_ext"))
+            definir("data_publicacao", data, "media")
+            definir("ano", int(data[:4]) if data else None, "media")
+        elif m.group("numerica"):
+            data = _data_numerica(m.group("numerica"))
+            definir("data_publicacao", data, "media")
+            definir("ano", int(data[:4]) if data else None, "media")
+        else:
+            definir("ano", int(m.group("ano_solto")), "baixa")
+        if confianca["titulo"] == "alta" and confianca["data_publicacao"] == "alta":
+            break
+
+    if campos["titulo"] is None and nome_arquivo:
+        definir("titulo", _titulo_do_arquivo(nome_arquivo), "baixa")
+    if campos["titulo"] is None:
+        primeira = next((l.strip() for l in texto[:LIMITE_CABECALHO].splitlines() if l.strip()), None)
+        definir("titulo", primeira[:200] if primeira else None, "baixa")
+
+    return {
+        **campos,
+        "ementa": texto[:300].strip().replace("\n", " "),
+        "conteudo_texto": texto,
+        "confianca": confianca,
+    }
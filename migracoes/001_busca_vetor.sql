@@ -0,0 +1,27 @@
+-- 🔎 Vetor de busca persistido para /api/search
+-- Título e ementa pesam mais que o corpo do texto (pesos A > B > D).
+-- O gatilho mantém a coluna sincronizada em qualquer INSERT/UPDATE, seja
+-- vindo do /cadastrar, do /upload ou do importador_aprendizagem.py.
+
+ALTER TABLE documentos ADD COLUMN IF NOT EXISTS busca_vetor tsvector;
+
+CREATE OR REPLACE FUNCTION documentos_atualizar_busca_vetor() RETURNS trigger AS $$
+BEGIN
+    NEW.busca_vetor :=
+        setweight(to_tsvector('portuguese', coalesce(NEW.titulo, '')), 'A') ||
+        setweight(to_tsvector('portuguese', coalesce(NEW.ementa, '')), 'B') ||
+        setweight(to_tsvector('portuguese', coalesce(NEW.conteudo_texto, '')), 'D');
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS documentos_busca_vetor_trg ON documentos;
+CREATE TRIGGER documentos_busca_vetor_trg
+    BEFORE INSERT OR UPDATE OF titulo, ementa, conteudo_texto ON documentos
+    FOR EACH ROW EXECUTE FUNCTION documentos_atualizar_busca_vetor();
+
+-- Backfill: a atribuição de titulo dispara o gatilho nas linhas já existentes
+UPDATE documentos SET titulo = titulo;
+
+-- O índice é criado depois do backfill para não ser mantido linha a linha
+CREATE INDEX IF NOT EXISTS documentos_busca_vetor_idx ON documentos USING GIN (busca_vetor);
@@ -0,0 +1,9 @@
+-- 🗂️ Rastreio da origem dos documentos importados (ingestão incremental)
+-- arquivo_origem/hash_conteudo ligam a linha ao arquivo em documentos/;
+-- removido_em marca documentos cujo arquivo foi apagado da pasta.
+
+ALTER TABLE documentos ADD COLUMN IF NOT EXISTS arquivo_origem TEXT;
+ALTER TABLE documentos ADD COLUMN IF NOT EXISTS hash_conteudo TEXT;
+ALTER TABLE documentos ADD COLUMN IF NOT EXISTS removido_em TIMESTAMPTZ;
+
+CREATE INDEX IF NOT EXISTS documentos_hash_conteudo_idx ON documentos (hash_conteudo);
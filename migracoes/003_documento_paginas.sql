@@ -0,0 +1,26 @@
+-- 📄 Texto dos PDFs gravado página a página
+-- O importador grava as páginas à medida que são lidas e monta
+-- documentos.conteudo_texto no próprio banco, a partir delas.
+-- Cada página tem seu vetor de busca, para os resultados apontarem a página.
+
+CREATE TABLE IF NOT EXISTS documento_paginas (
+    documento_id INTEGER NOT NULL REFERENCES documentos(id) ON DELETE CASCADE,
+    numero INTEGER NOT NULL,
+    texto TEXT NOT NULL,
+    busca_vetor tsvector,
+    PRIMARY KEY (documento_id, numero)
+);
+
+CREATE OR REPLACE FUNCTION documento_paginas_atualizar_busca_vetor() RETURNS trigger AS $$
+BEGIN
+    NEW.busca_vetor := to_tsvector('portuguese', NEW.texto);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS documento_paginas_busca_vetor_trg ON documento_paginas;
+CREATE TRIGGER documento_paginas_busca_vetor_trg
+    BEFORE INSERT OR UPDATE OF texto ON documento_paginas
+    FOR EACH ROW EXECUTE FUNCTION documento_paginas_atualizar_busca_vetor();
+
+CREATE INDEX IF NOT EXISTS documento_paginas_busca_vetor_idx ON documento_paginas USING GIN (busca_vetor);
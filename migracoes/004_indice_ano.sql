@@ -0,0 +1,5 @@
+-- 📅 Índice em documentos.ano
+-- Permite listar os anos distintos com um "skip scan" (CTE recursiva em
+-- dados_referencia.py), sem varrer a tabela inteira.
+
+CREATE INDEX IF NOT EXISTS documentos_ano_idx ON documentos (ano);
@@ -0,0 +1,21 @@
+-- 📣 Aviso de alteração no acervo
+-- Qualquer escrita em documentos (cadastro, upload, importador) dispara um
+-- NOTIFY no canal corpus_alterado, entregue no COMMIT. Os serviços que mantêm
+-- caches de busca escutam o canal e avançam a geração do acervo.
+
+CREATE OR REPLACE FUNCTION documentos_notificar_corpus() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('corpus_alterado', TG_OP);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS documentos_notificar_corpus_trg ON documentos;
+CREATE TRIGGER documentos_notificar_corpus_trg
+    AFTER INSERT OR UPDATE OR DELETE ON documentos
+    FOR EACH STATEMENT EXECUTE FUNCTION documentos_notificar_corpus();
+
+DROP TRIGGER IF EXISTS documentos_notificar_corpus_truncate_trg ON documentos;
+CREATE TRIGGER documentos_notificar_corpus_truncate_trg
+    AFTER TRUNCATE ON documentos
+    FOR EACH STATEMENT EXECUTE FUNCTION documentos_notificar_corpus();
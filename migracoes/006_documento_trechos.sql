@@ -0,0 +1,32 @@
+-- 🧩 Atos divididos em unidades estruturais (Capítulo, Art., §, inciso)
+-- A busca ranqueia e destaca trechos pequenos, em vez do conteúdo inteiro do
+-- documento, e agrupa os resultados pelo documento de origem.
+-- Os trechos são gravados pelo importador/API (trechos_legais.py); documentos
+-- já existentes são divididos com: python importador_aprendizagem.py --dividir-trechos
+
+CREATE TABLE IF NOT EXISTS documento_trechos (
+    documento_id INTEGER NOT NULL REFERENCES documentos(id) ON DELETE CASCADE,
+    ordem INTEGER NOT NULL,
+    tipo TEXT NOT NULL,
+    rotulo TEXT,
+    pagina INTEGER,
+    texto TEXT NOT NULL,
+    busca_vetor tsvector,
+    PRIMARY KEY (documento_id, ordem)
+);
+
+CREATE OR REPLACE FUNCTION documento_trechos_atualizar_busca_vetor() RETURNS trigger AS $$
+BEGIN
+    NEW.busca_vetor :=
+        setweight(to_tsvector('portuguese', coalesce(NEW.rotulo, '')), 'B') ||
+        setweight(to_tsvector('portuguese', NEW.texto), 'D');
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS documento_trechos_busca_vetor_trg ON documento_trechos;
+CREATE TRIGGER documento_trechos_busca_vetor_trg
+    BEFORE INSERT OR UPDATE OF rotulo, texto ON documento_trechos
+    FOR EACH ROW EXECUTE FUNCTION documento_trechos_atualizar_busca_vetor();
+
+CREATE INDEX IF NOT EXISTS documento_trechos_busca_vetor_idx ON documento_trechos USING GIN (busca_vetor);
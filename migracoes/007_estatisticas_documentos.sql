@@ -0,0 +1,99 @@
+-- 📊 Contagens do acervo mantidas de forma incremental
+-- Uma linha por (dimensão, chave) com o total de documentos ativos
+-- (removido_em IS NULL): dimensões tipo, orgao, status, prioridade e ano,
+-- mais a linha ('total', 0). Chave 0 = documento sem aquele campo.
+-- Ler as contagens custa o número de valores distintos, não o de documentos.
+--
+-- Gatilhos por comando (não por linha), com tabelas de transição: um INSERT
+-- de 500 linhas do GravadorLote vira um único UPSERT agregado. Deriva
+-- eventual é corrigida por `python estatisticas.py --reconciliar`.
+
+CREATE TABLE IF NOT EXISTS estatisticas_documentos (
+    dimensao TEXT NOT NULL,
+    chave INTEGER NOT NULL,
+    total BIGINT NOT NULL,
+    PRIMARY KEY (dimensao, chave)
+);
+
+-- Chaves que um documento incrementa, uma por dimensão
+CREATE OR REPLACE FUNCTION estatisticas_chaves(d documentos)
+RETURNS TABLE (dimensao TEXT, chave INTEGER) AS $$
+    SELECT * FROM (VALUES
+        ('total', 0),
+        ('tipo', coalesce(d.tipo_documento_id, 0)),
+        ('orgao', coalesce(d.orgao_id, 0)),
+        ('status', coalesce(d.status_id, 0)),
+        ('prioridade', coalesce(d.prioridade_id, 0)),
+        ('ano', coalesce(d.ano, 0))
+    ) AS v(dimensao, chave)
+    WHERE d.removido_em IS NULL;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Cada ramo só referencia as tabelas de transição que o evento fornece.
+-- No UPDATE, linhas cujo tipo/órgão/status/prioridade/ano/removido_em não
+-- mudaram somam +1 e -1 na mesma chave e são descartadas pelo HAVING.
+-- O ORDER BY trava as linhas sempre na mesma ordem: escritores concorrentes
+-- esperam um pelo outro, sem deadlock.
+CREATE OR REPLACE FUNCTION documentos_atualizar_estatisticas() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO estatisticas_documentos AS e (dimensao, chave, total)
+        SELECT k.dimensao, k.chave, count(*)
+        FROM novos n, estatisticas_chaves(n) k
+        GROUP BY k.dimensao, k.chave
+        ORDER BY k.dimensao, k.chave
+        ON CONFLICT (dimensao, chave) DO UPDATE SET total = e.total + EXCLUDED.total;
+    ELSIF TG_OP = 'DELETE' THEN
+        INSERT INTO estatisticas_documentos AS e (dimensao, chave, total)
+        SELECT k.dimensao, k.chave, -count(*)
+        FROM antigos a, estatisticas_chaves(a) k
+        GROUP BY k.dimensao, k.chave
+        ORDER BY k.dimensao, k.chave
+        ON CONFLICT (dimensao, chave) DO UPDATE SET total = e.total + EXCLUDED.total;
+    ELSIF TG_OP = 'UPDATE' THEN
+        INSERT INTO estatisticas_documentos AS e (dimensao, chave, total)
+        SELECT m.dimensao, m.chave, sum(m.sinal)
+        FROM (
+            SELECT k.dimensao, k.chave, 1 AS sinal FROM novos n, estatisticas_chaves(n) k
+            UNION ALL
+            SELECT k.dimensao, k.chave, -1 FROM antigos a, estatisticas_chaves(a) k
+        ) m
+        GROUP BY m.dimensao, m.chave
+        HAVING sum(m.sinal) <> 0
+        ORDER BY m.dimensao, m.chave
+        ON CONFLICT (dimensao, chave) DO UPDATE SET total = e.total + EXCLUDED.total;
+    ELSE  -- TRUNCATE
+        DELETE FROM estatisticas_documentos;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS documentos_estatisticas_insert_trg ON documentos;
+CREATE TRIGGER documentos_estatisticas_insert_trg
+    AFTER INSERT ON documentos REFERENCING NEW TABLE AS novos
+    FOR EACH STATEMENT EXECUTE FUNCTION documentos_atualizar_estatisticas();
+
+DROP TRIGGER IF EXISTS documentos_estatisticas_update_trg ON documentos;
+CREATE TRIGGER documentos_estatisticas_update_trg
+    AFTER UPDATE ON documentos REFERENCING OLD TABLE AS antigos NEW TABLE AS novos
+    FOR EACH STATEMENT EXECUTE FUNCTION documentos_atualizar_estatisticas();
+
+DROP TRIGGER IF EXISTS documentos_estatisticas_delete_trg ON documentos;
+CREATE TRIGGER documentos_estatisticas_delete_trg
+    AFTER DELETE ON documentos REFERENCING OLD TABLE AS antigos
+    FOR EACH STATEMENT EXECUTE FUNCTION documentos_atualizar_estatisticas();
+
+DROP TRIGGER IF EXISTS documentos_estatisticas_truncate_trg ON documentos;
+CREATE TRIGGER documentos_estatisticas_truncate_trg
+    AFTER TRUNCATE ON documentos
+    FOR EACH STATEMENT EXECUTE FUNCTION documentos_atualizar_estatisticas();
+
+-- Carga inicial: bloqueia escritas em documentos até o fim da migração, para
+-- que nenhum comando fique fora da contagem e dos gatilhos ao mesmo tempo
+LOCK TABLE documentos IN SHARE MODE;
+DELETE FROM estatisticas_documentos;
+INSERT INTO estatisticas_documentos (dimensao, chave, total)
+SELECT k.dimensao, k.chave, count(*)
+FROM documentos d, estatisticas_chaves(d) k
+GROUP BY k.dimensao, k.chave;
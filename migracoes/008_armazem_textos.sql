@@ -0,0 +1,44 @@
+-- 🗜️ Textos completos fora da tabela (armazem_textos.py)
+-- O corpo de cada documento vai comprimido para um armazém em disco,
+-- endereçado pelo sha256 do texto; documentos guarda o ponteiro e o tamanho.
+-- Quem grava ainda envia conteudo_texto junto com texto_hash: o gatilho de
+-- busca calcula o vetor e descarta o texto antes de a linha ser gravada.
+-- Os textos já existentes são movidos com: python armazem_textos.py --migrar
+
+ALTER TABLE documentos ADD COLUMN IF NOT EXISTS texto_hash TEXT;
+ALTER TABLE documentos ADD COLUMN IF NOT EXISTS texto_tamanho BIGINT;
+
+-- Coleta de arquivos órfãos e /documentos/{id}/texto procuram pelo hash
+CREATE INDEX IF NOT EXISTS documentos_texto_hash_idx ON documentos (texto_hash);
+
+CREATE OR REPLACE FUNCTION documentos_atualizar_busca_vetor() RETURNS trigger AS $$
+DECLARE
+    corpo tsvector;
+BEGIN
+    IF NEW.conteudo_texto IS NOT NULL OR NEW.texto_hash IS NULL THEN
+        corpo := setweight(to_tsvector('portuguese', coalesce(NEW.conteudo_texto, '')), 'D');
+    ELSIF TG_OP = 'UPDATE' THEN
+        -- Texto no armazém e não reenviado: o corpo (peso D) continua o mesmo
+        IF NEW.titulo IS NOT DISTINCT FROM OLD.titulo AND NEW.ementa IS NOT DISTINCT FROM OLD.ementa THEN
+            RETURN NEW;
+        END IF;
+        corpo := coalesce(ts_filter(OLD.busca_vetor, '{d}'), '');
+    ELSE
+        corpo := ''::tsvector;
+    END IF;
+
+    NEW.busca_vetor :=
+        setweight(to_tsvector('portuguese', coalesce(NEW.titulo, '')), 'A') ||
+        setweight(to_tsvector('portuguese', coalesce(NEW.ementa, '')), 'B') ||
+        corpo;
+    IF NEW.texto_hash IS NOT NULL THEN
+        NEW.conteudo_texto := NULL;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS documentos_busca_vetor_trg ON documentos;
+CREATE TRIGGER documentos_busca_vetor_trg
+    BEFORE INSERT OR UPDATE OF titulo, ementa, conteudo_texto, texto_hash ON documentos
+    FOR EACH ROW EXECUTE FUNCTION documentos_atualizar_busca_vetor();
@@ -0,0 +1,47 @@
+-- 📊 Contagens do acervo sem disputa entre escritores
+-- Na 007 cada comando fazia UPSERT nas mesmas linhas de estatisticas_documentos:
+-- toda escrita em documentos atualiza ('total', 0) e, em geral, as mesmas
+-- chaves de status/prioridade/ano, e a trava dessas linhas fica até o COMMIT.
+-- Uploads concorrentes passavam a gravar um de cada vez.
+--
+-- Agora os gatilhos só acrescentam linhas de variação em
+-- estatisticas_documentos_deltas (INSERT puro, sem chave única, nada a
+-- travar). A leitura soma a tabela base com as variações pendentes, e
+-- `python estatisticas.py --consolidar` (de tempos em tempos, via cron) as
+-- incorpora à base; --reconciliar consolida antes de comparar.
+
+CREATE TABLE IF NOT EXISTS estatisticas_documentos_deltas (
+    dimensao TEXT NOT NULL,
+    chave INTEGER NOT NULL,
+    delta BIGINT NOT NULL
+);
+
+CREATE OR REPLACE FUNCTION documentos_atualizar_estatisticas() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO estatisticas_documentos_deltas (dimensao, chave, delta)
+        SELECT k.dimensao, k.chave, count(*)
+        FROM novos n, estatisticas_chaves(n) k
+        GROUP BY k.dimensao, k.chave;
+    ELSIF TG_OP = 'DELETE' THEN
+        INSERT INTO estatisticas_documentos_deltas (dimensao, chave, delta)
+        SELECT k.dimensao, k.chave, -count(*)
+        FROM antigos a, estatisticas_chaves(a) k
+        GROUP BY k.dimensao, k.chave;
+    ELSIF TG_OP = 'UPDATE' THEN
+        INSERT INTO estatisticas_documentos_deltas (dimensao, chave, delta)
+        SELECT m.dimensao, m.chave, sum(m.sinal)
+        FROM (
+            SELECT k.dimensao, k.chave, 1 AS sinal FROM novos n, estatisticas_chaves(n) k
+            UNION ALL
+            SELECT k.dimensao, k.chave, -1 FROM antigos a, estatisticas_chaves(a) k
+        ) m
+        GROUP BY m.dimensao, m.chave
+        HAVING sum(m.sinal) <> 0;
+    ELSE  -- TRUNCATE
+        DELETE FROM estatisticas_documentos;
+        DELETE FROM estatisticas_documentos_deltas;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
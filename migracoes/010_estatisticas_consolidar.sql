@@ -0,0 +1,45 @@
+-- 📊 Consolidação automática das variações de estatisticas_documentos_deltas
+-- Sem ela, a tabela de variações só diminuía com `estatisticas.py
+-- --consolidar` e cada leitura somava tudo o que foi escrito desde então.
+-- Agora, a cada 100 comandos em documentos, o comando da vez
+-- incorpora as variações à base, se nenhum outro estiver fazendo o mesmo
+-- (pg_try_advisory_xact_lock: quem não consegue a trava segue sem esperar).
+-- A leitura fica limitada a umas poucas centenas de variações pendentes.
+
+-- Quantas linhas de contagem mudaram; usada também por estatisticas.py
+CREATE OR REPLACE FUNCTION estatisticas_consolidar() RETURNS integer AS $$
+DECLARE
+    chaves integer;
+BEGIN
+    -- O DELETE só leva as variações já confirmadas quando o comando começou;
+    -- o ORDER BY trava as linhas da base sempre na mesma ordem
+    WITH pendentes AS (
+        DELETE FROM estatisticas_documentos_deltas RETURNING dimensao, chave, delta
+    )
+    INSERT INTO estatisticas_documentos AS e (dimensao, chave, total)
+    SELECT dimensao, chave, sum(delta)
+    FROM pendentes
+    GROUP BY dimensao, chave
+    ORDER BY dimensao, chave
+    ON CONFLICT (dimensao, chave) DO UPDATE SET total = e.total + EXCLUDED.total;
+    GET DIAGNOSTICS chaves = ROW_COUNT;
+    RETURN chaves;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE SEQUENCE IF NOT EXISTS estatisticas_comandos_seq;
+
+CREATE OR REPLACE FUNCTION documentos_consolidar_estatisticas() RETURNS trigger AS $$
+BEGIN
+    IF nextval('estatisticas_comandos_seq') % 100 = 0
+       AND pg_try_advisory_xact_lock(hashtext('estatisticas_consolidar')) THEN
+        PERFORM estatisticas_consolidar();
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS documentos_estatisticas_consolidar_trg ON documentos;
+CREATE TRIGGER documentos_estatisticas_consolidar_trg
+    AFTER INSERT OR UPDATE OR DELETE ON documentos
+    FOR EACH STATEMENT EXECUTE FUNCTION documentos_consolidar_estatisticas();
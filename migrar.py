@@ -0,0 +1,56 @@
+import os
+import psycopg2
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Pasta com os scripts SQL numerados (001_..., 002_...), aplicados em ordem
+PASTA_MIGRACOES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migracoes")
+
+def conectar():
+    return psycopg2.connect(
+        dbname=os.getenv("DB_NAME"),
+        user=os.getenv("DB_USER"),
+        password=os.getenv("DB_PASSWORD"),
+        host=os.getenv("DB_HOST"),
+        port=os.getenv("DB_PORT"),
+        client_encoding='UTF8'
+    )
+
+def migracoes_pendentes(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migracoes (
+            nome TEXT PRIMARY KEY,
+            aplicada_em TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+    """)
+    cur.execute("SELECT nome FROM schema_migracoes;")
+    aplicadas = {r[0] for r in cur.fetchall()}
+    arquivos = sorted(a for a in os.listdir(PASTA_MIGRACOES) if a.endswith(".sql"))
+    return [a for a in arquivos if a not in aplicadas]
+
+def aplicar_migracoes():
+    conn = conectar()
+    cur = conn.cursor()
+    pendentes = migracoes_pendentes(cur)
+    conn.commit()
+    if not pendentes:
+        print("✅ Banco já está atualizado.")
+    for nome in pendentes:
+        with open(os.path.join(PASTA_MIGRACOES, nome), encoding="utf-8") as f:
+            sql = f.read()
+        try:
+            # Cada migração roda em uma transação própria
+            cur.execute(sql)
+            cur.execute("INSERT INTO schema_migracoes (nome) VALUES (%s);", (nome,))
+            conn.commit()
+            print(f"✅ Aplicada: {nome}")
+        except Exception as e:
+            conn.rollback()
+            print(f"❌ Erro ao aplicar {nome}: {e}")
+            break
+    cur.close()
+    conn.close()
+
+if __name__ == "__main__":
+    aplicar_migracoes()
@@ -0,0 +1,154 @@
+import hashlib
+import io
+import os
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import pytesseract
+from PIL import Image, ImageOps
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# 🖨️ OCR seletivo para PDFs digitalizados: só as páginas sem camada de texto
+# passam pelo Tesseract, em paralelo, e o resultado fica em cache no disco,
+# indexado pelo hash da imagem da página (reimportar não repete OCR).
+
+OCR_DPI = int(os.getenv("OCR_DPI", "300"))
+OCR_IDIOMA = os.getenv("OCR_IDIOMA", "por")
+# Binarização: 0 = limiar automático (Otsu), 1-254 = limiar fixo, -1 = só tons de cinza
+OCR_LIMIAR = int(os.getenv("OCR_LIMIAR", "0"))
+# Threads de OCR por processo. Sem OCR_WORKERS, usa os núcleos da máquina;
+# o importador com --jobs N reparte os núcleos entre os N processos
+# (repartir_workers), em vez de cada um abrir cpu_count threads de Tesseract
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", "0")) or os.cpu_count() or 1
+PASTA_CACHE_OCR = os.getenv(
+    "OCR_CACHE", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache_ocr")
+)
+
+
+def limiar_otsu(imagem):
+    """Limiar que melhor separa texto e fundo no histograma de uma imagem em tons de cinza."""
+    histograma = imagem.histogram()
+    total = sum(histograma)
+    soma_total = sum(i * h for i, h in enumerate(histograma))
+    soma_fundo = peso_fundo = 0
+    melhor, limiar = 0.0, 127
+    for i, h in enumerate(histograma):
+        peso_fundo += h
+        if peso_fundo == 0:
+            continue
+        peso_frente = total - peso_fundo
+        if peso_frente == 0:
+            break
+        soma_fundo += i * h
+        media_fundo = soma_fundo / peso_fundo
+        media_frente = (soma_total - soma_fundo) / peso_frente
+        variancia = peso_fundo * peso_frente * (media_fundo - media_frente) ** 2
+        if variancia > melhor:
+            melhor, limiar = variancia, i
+    return limiar
+
+
+def preprocessar(imagem, largura_pontos=None):
+    """Tons de cinza, contraste, reamostragem para OCR_DPI e binarização."""
+    imagem = ImageOps.autocontrast(ImageOps.grayscale(imagem))
+    if largura_pontos:
+        # Resolução efetiva da digitalização: pixels / polegadas da página
+        dpi = imagem.width / (largura_pontos / 72)
+        escala = OCR_DPI / dpi
+        if abs(escala - 1) > 0.1:
+            imagem = imagem.resize((round(imagem.width * escala), round(imagem.height * escala)),
+                                   Image.LANCZOS)
+    if OCR_LIMIAR >= 0:
+        limiar = OCR_LIMIAR or limiar_otsu(imagem)
+        imagem = imagem.point(lambda p: 255 if p > limiar else 0)
+    return imagem
+
+
+def _caminho_cache(dados, largura_pontos):
+    # Os parâmetros entram na chave: mudar DPI, idioma ou limiar refaz o OCR
+    h = hashlib.sha256(dados)
+    h.update(f"|{OCR_DPI}|{OCR_IDIOMA}|{OCR_LIMIAR}|{largura_pontos or ''}".encode())
+    chave = h.hexdigest()
+    return os.path.join(PASTA_CACHE_OCR, chave[:2], chave + ".txt")
+
+
+def ocr_imagem(dados, largura_pontos=None):
+    """Texto de uma imagem (bytes de PNG/JPEG...), do cache em disco ou do Tesseract."""
+    caminho = _caminho_cache(dados, largura_pontos)
+    try:
+        with open(caminho, encoding="utf-8") as f:
+            return f.read()
+    except FileNotFoundError:
+        pass
+    with Image.open(io.BytesIO(dados)) as imagem:
+        texto = pytesseract.image_to_string(preprocessar(imagem, largura_pontos), lang=OCR_IDIOMA)
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        f.write(texto)
+    os.replace(temporario, caminho)
+    return texto
+
+
+def imagem_da_pagina(page):
+    """Bytes da maior imagem embutida na página (a digitalização) e a largura da página em pontos."""
+    try:
+        imagens = page.images
+    except Exception:
+        return None
+    if not imagens:
+        return None
+    return max(imagens, key=lambda im: len(im.data)).data, float(page.mediabox.width)
+
+
+def repartir_workers(processos):
+    """Chamada em cada processo de um pool com `processos` workers."""
+    global OCR_WORKERS
+    if not int(os.getenv("OCR_WORKERS", "0")):
+        OCR_WORKERS = max(1, (os.cpu_count() or 1) // processos)
+
+
+def extrair_paginas_com_ocr(reader, workers=None, falhas=None):
+    """Pares (número, texto) das páginas de um PdfReader, na ordem.
+
+    Páginas com camada de texto saem direto; as vazias vão para OCR em um pool
+    de threads (o Tesseract roda fora do GIL). No máximo workers * 2 páginas
+    ficam pendentes, para não acumular imagens em memória. Páginas cujo OCR
+    falhou são omitidas e, se `falhas` for uma lista, anotadas nela.
+    """
+    workers = workers or OCR_WORKERS
+    janela = workers * 2
+    pendentes = deque()
+
+    def resolver():
+        numero, texto = pendentes.popleft()
+        if isinstance(texto, Future):
+            try:
+                texto = texto.result()
+            except Exception as e:
+                print(f"⚠️ OCR falhou na página {numero}: {e}")
+                if falhas is not None:
+                    falhas.append(numero)
+                texto = None
+        return numero, texto
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for numero, page in enumerate(reader.pages, start=1):
+            texto = page.extract_text()
+            if not (texto and texto.strip()):
+                # A imagem é lida aqui: o PdfReader não é seguro entre threads
+                imagem = imagem_da_pagina(page)
+                texto = executor.submit(ocr_imagem, *imagem) if imagem else None
+            pendentes.append((numero, texto))
+            while pendentes and (len(pendentes) > janela
+                                 or not isinstance(pendentes[0][1], Future)
+                                 or pendentes[0][1].done()):
+                numero_pronto, texto_pronto = resolver()
+                if texto_pronto:
+                    yield numero_pronto, texto_pronto
+        while pendentes:
+            numero_pronto, texto_pronto = resolver()
+            if texto_pronto:
+                yield numero_pronto, texto_pronto
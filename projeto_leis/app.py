@@ -1,22 +1,113 @@
 import os
-import psycopg2
-from flask import Flask, render_template, request, jsonify, redirect
+import sys
+import threading
+from flask import Flask, render_template, request, jsonify, redirect, g
 from dotenv import load_dotenv
 
+# Antes dos módulos do projeto: vários leem a configuração ao serem importados
+# (consultas_lentas, armazem_textos...) e o .env desta pasta tem prioridade
 load_dotenv()  # Carrega as variáveis do arquivo .env
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from armazem_textos import gravar_texto
+from banco import PoolEsgotadoError, criar_pool, iniciar_ouvinte
+from cache_ttl import CacheTTL
+from dados_referencia import CacheReferencia
+from gravador_documentos import gravar_trechos
+from instrumentacao import CursorMedido, etapa, instrumentar_flask, instrumentar_pool
+
 app = Flask(__name__)
 
+PARAMETROS_BANCO = dict(
+    dbname=os.getenv('DB_NAME'),
+    user=os.getenv('DB_USER'),
+    password=os.getenv('DB_PASSWORD'),
+    host=os.getenv('DB_HOST'),
+    port=os.getenv('DB_PORT')
+)
+
+pool = criar_pool(cursor_factory=CursorMedido, **PARAMETROS_BANCO)
+
+# Pool saturado: 503 com Retry-After, como na API, em vez de um 500 genérico
+@app.errorhandler(PoolEsgotadoError)
+def pool_esgotado(erro):
+    response = jsonify({"error": str(erro)})
+    response.status_code = 503
+    response.headers["Retry-After"] = str(max(1, round(pool.timeout)))
+    return response
+
+# 📈 Latência por rota, tempo por consulta SQL e estado do pool em /metrics
+instrumentar_pool(pool, 'flask')
+instrumentar_flask(app, 'flask')
+
+# Tipos, órgãos e anos dos filtros ficam em memória (recarga por TTL)
+referencias = CacheReferencia(pool, ttl=float(os.getenv('CACHE_REFERENCIA_TTL', '300')))
+
+# 🔎 Resultados de /api/search já serializados, por (geração do corpus, consulta, filtros)
+cache_busca = CacheTTL(
+    maximo=int(os.getenv('BUSCA_CACHE_MAX', '500')),
+    ttl=float(os.getenv('BUSCA_CACHE_TTL', '300'))
+)
+
+# A geração avança a cada escrita em documentos: entradas de gerações antigas
+# deixam de ser encontradas. /cadastrar avança na hora; a API, o importador e
+# qualquer outro escritor avisam pelo canal corpus_alterado (migracoes/005).
+_geracao_lock = threading.Lock()
+geracao_corpus = 0
+
+def avancar_geracao_corpus():
+    global geracao_corpus
+    with _geracao_lock:
+        geracao_corpus += 1
+    cache_busca.limpar()
+    referencias.invalidar()
+
+# O ouvinte começa na primeira requisição, e não na importação: o processo
+# vigia do reloader (modo debug) e scripts que só importam `app` não abrem
+# threads e conexões LISTEN duplicadas
+_ouvinte = None
+_ouvinte_lock = threading.Lock()
+
+@app.before_request
+def garantir_ouvinte_corpus():
+    global _ouvinte
+    if _ouvinte is None:
+        with _ouvinte_lock:
+            if _ouvinte is None:
+                _ouvinte = iniciar_ouvinte('corpus_alterado', avancar_geracao_corpus, **PARAMETROS_BANCO)
+
+# Trechos (artigos, parágrafos...) destacados em cada documento encontrado
+TRECHOS_POR_RESULTADO = 3
+
+# Backend de /api/search: 'postgres' (FTS, padrão) ou 'bm25' (índice em disco,
+# gerado por `python busca_bm25.py --construir`)
+BUSCA_BACKEND = os.getenv('BUSCA_BACKEND', 'postgres')
+if BUSCA_BACKEND == 'bm25':
+    from busca_bm25 import IndiceAusenteError, IndiceBM25, destacar
+    indice_bm25 = IndiceBM25()
+
 def get_db_connection():
-    """Estabelece a conexão com o banco de dados PostgreSQL."""
-    conn = psycopg2.connect(
-        dbname=os.getenv('DB_NAME'),
-        user=os.getenv('DB_USER'),
-        password=os.getenv('DB_PASSWORD'),
-        host=os.getenv('DB_HOST'),
-        port=os.getenv('DB_PORT')
-    )
-    return conn
+    """Empresta do pool a conexão da requisição atual (uma por requisição)."""
+    if 'db_conn' not in g:
+        g.db_conn = pool.obter()
+    return g.db_conn
+
+@app.teardown_appcontext
+def devolver_conexao(exc):
+    """Devolve ao pool a conexão emprestada, se a requisição usou alguma."""
+    conn = g.pop('db_conn', None)
+    if conn is not None:
+        pool.devolver(conn)
+
+@app.route('/api/pool')
+def pool_metrics():
+    """API endpoint com as métricas de saturação do pool de conexões."""
+    return jsonify(pool.metricas())
+
+@app.route('/api/cache')
+def cache_metrics():
+    """API endpoint com taxa de acerto e memória do cache de buscas."""
+    return jsonify({"busca": cache_busca.metricas(), "geracao_corpus": geracao_corpus})
 
 @app.route('/')
 def index():
@@ -27,25 +118,62 @@ def index():
 def search_documents():
     """API endpoint para buscar documentos."""
     data = request.get_json()
-    search_query = data.get('query', '')
+    search_query = ' '.join(data.get('query', '').lower().split())
     filters = data.get('filters', {})
 
-    conn = get_db_connection()
-    cur = conn.cursor()
+    # Mesma consulta com os mesmos filtros → mesma chave, qualquer que seja a grafia
+    chave = (
+        geracao_corpus,
+        search_query,
+        tuple(str(filters.get(campo) or '') for campo in ('tipo', 'orgao', 'ano')),
+    )
+    corpo = cache_busca.obter(chave)
+    if corpo is not None:
+        return app.response_class(corpo, mimetype='application/json')
+
+    with etapa('busca.conexao'):
+        cur = get_db_connection().cursor()
+    with etapa(f'busca.{BUSCA_BACKEND}'):
+        if BUSCA_BACKEND == 'bm25':
+            try:
+                documents = buscar_bm25(cur, search_query, filters)
+            except IndiceAusenteError as e:
+                # Índice ainda não construído: o FTS do PostgreSQL responde no lugar
+                app.logger.warning("%s Usando o FTS do PostgreSQL.", e)
+                documents = buscar_postgres(cur, search_query, filters)
+        else:
+            documents = buscar_postgres(cur, search_query, filters)
+    cur.close()
+
+    with etapa('busca.serializacao'):
+        corpo = (app.json.dumps(documents) + '\n').encode('utf-8')
+    cache_busca.guardar(chave, corpo, tamanho=len(corpo))
+    return app.response_class(corpo, mimetype='application/json')
 
+def buscar_postgres(cur, search_query, filters):
+    """Busca pelo FTS do PostgreSQL (ts_rank nos trechos + título/ementa)."""
+    # Filtro pelo vetor do documento (GIN); o ranking usa só os trechos que casaram
+    # e o título/ementa, sem ler o conteúdo inteiro. Trechos: migracoes/006
     sql = """
-        SELECT
-            d.id, d.titulo, d.ementa, d.numero, d.ano, d.data_publicacao,
-            td.nome as tipo_nome, o.nome as orgao_nome,
-            ts_headline('portuguese', d.ementa, to_tsquery('portuguese', %s), 'StartSel=<mark>, StopSel=</mark>') as ementa_destaque,
-            ts_rank(to_tsvector('portuguese', d.conteudo_texto), to_tsquery('portuguese', %s)) as rank
-        FROM documentos d
-        JOIN tipos_documento td ON d.tipo_documento_id = td.id
-        JOIN orgaos o ON d.orgao_id = o.id
-        WHERE to_tsvector('portuguese', d.conteudo_texto) @@ to_tsquery('portuguese', %s)
+        WITH candidatos AS (
+            SELECT
+                d.id,
+                coalesce(tr.rank, 0) + ts_rank(
+                    setweight(to_tsvector('portuguese', d.titulo), 'A') ||
+                    setweight(to_tsvector('portuguese', coalesce(d.ementa, '')), 'B'),
+                    q.consulta
+                ) AS rank
+            FROM documentos d
+            CROSS JOIN to_tsquery('portuguese', %s) AS q(consulta)
+            LEFT JOIN LATERAL (
+                SELECT max(ts_rank(t.busca_vetor, q.consulta)) AS rank
+                FROM documento_trechos t
+                WHERE t.documento_id = d.id AND t.busca_vetor @@ q.consulta
+            ) tr ON true
+            WHERE d.busca_vetor @@ q.consulta
+              AND d.removido_em IS NULL
     """
-    
-    params = [search_query, search_query, search_query]
+    params = [search_query]
 
     if filters.get('tipo'):
         sql += " AND d.tipo_documento_id = %s"
@@ -59,47 +187,103 @@ def search_documents():
         sql += " AND d.ano = %s"
         params.append(filters['ano'])
 
-    sql += " ORDER BY rank DESC, d.data_publicacao DESC LIMIT 50;"
+    # Destaques gerados só para os documentos da página, nos melhores trechos de cada um
+    sql += """
+            ORDER BY rank DESC, d.data_publicacao DESC, d.id
+            LIMIT 50
+        )
+        SELECT
+            d.id, d.titulo, d.ementa, d.numero, d.ano, d.data_publicacao,
+            td.nome as tipo_nome, o.nome as orgao_nome,
+            ts_headline('portuguese', d.ementa, q.consulta, 'StartSel=<mark>, StopSel=</mark>') as ementa_destaque,
+            c.rank,
+            destaques.trechos
+        FROM candidatos c
+        JOIN documentos d ON d.id = c.id
+        CROSS JOIN to_tsquery('portuguese', %s) AS q(consulta)
+        JOIN tipos_documento td ON d.tipo_documento_id = td.id
+        JOIN orgaos o ON d.orgao_id = o.id
+        LEFT JOIN LATERAL (
+            SELECT json_agg(json_build_object(
+                'rotulo', m.rotulo,
+                'pagina', m.pagina,
+                'destaque', ts_headline('portuguese', m.texto, q.consulta,
+                                        'StartSel=<mark>, StopSel=</mark>, MaxFragments=2')
+            ) ORDER BY m.rank DESC) AS trechos
+            FROM (
+                SELECT t.rotulo, t.pagina, t.texto, ts_rank(t.busca_vetor, q.consulta) AS rank
+                FROM documento_trechos t
+                WHERE t.documento_id = d.id AND t.busca_vetor @@ q.consulta
+                ORDER BY rank DESC, t.ordem
+                LIMIT %s
+            ) m
+        ) destaques ON true
+        ORDER BY c.rank DESC, d.data_publicacao DESC, d.id;
+    """
+    params += [search_query, TRECHOS_POR_RESULTADO]
 
     cur.execute(sql, params)
     results = cur.fetchall()
     
     documents = []
     for row in results:
+        trechos = row[10] or []
         documents.append({
             "id": row[0], "titulo": row[1], "ementa": row[2],
-            "numero": row[3], "ano": row[4], "data_publicacao": row[5].strftime('%d/%m/%Y'),
-            "tipo": row[6], "orgao": row[7], "ementa_destaque": row[8]
+            "numero": row[3], "ano": row[4],
+            "data_publicacao": row[5].strftime('%d/%m/%Y') if row[5] else None,
+            "tipo": row[6], "orgao": row[7], "ementa_destaque": row[8],
+            "pagina": trechos[0]["pagina"] if trechos else None,
+            "trechos": trechos
         })
+    return documents
 
-    cur.close()
-    conn.close()
-    
-    return jsonify(documents)
+def buscar_bm25(cur, search_query, filters):
+    """Busca pelo índice BM25 mapeado em memória; o banco só completa os metadados."""
+    ranqueados = indice_bm25.buscar(
+        search_query, limite=50,
+        tipo=filters.get('tipo'), orgao=filters.get('orgao'), ano=filters.get('ano')
+    )
+    if not ranqueados:
+        return []
+    cur.execute("""
+        SELECT
+            d.id, d.titulo, d.ementa, d.numero, d.ano, d.data_publicacao,
+            td.nome as tipo_nome, o.nome as orgao_nome
+        FROM documentos d
+        JOIN tipos_documento td ON d.tipo_documento_id = td.id
+        JOIN orgaos o ON d.orgao_id = o.id
+        WHERE d.id = ANY(%s) AND d.removido_em IS NULL
+    """, ([id_ for id_, _ in ranqueados],))
+    linhas = {row[0]: row for row in cur.fetchall()}
+
+    documents = []
+    for id_, _ in ranqueados:
+        row = linhas.get(id_)
+        if row is None:
+            continue  # removido depois da última construção do índice
+        documents.append({
+            "id": row[0], "titulo": row[1], "ementa": row[2],
+            "numero": row[3], "ano": row[4],
+            "data_publicacao": row[5].strftime('%d/%m/%Y') if row[5] else None,
+            "tipo": row[6], "orgao": row[7],
+            "ementa_destaque": destacar(row[2], search_query),
+            "pagina": None,
+            "trechos": []
+        })
+    return documents
 
 @app.route('/api/filters')
 def get_filters():
-    """API endpoint para obter os valores dos filtros (tipos, órgãos, etc.)."""
-    conn = get_db_connection()
-    cur = conn.cursor()
-
-    cur.execute("SELECT id, nome FROM tipos_documento ORDER BY nome;")
-    tipos = cur.fetchall()
+    """API endpoint para obter os valores dos filtros (tipos, órgãos, etc.).
 
-    cur.execute("SELECT id, nome FROM orgaos ORDER BY nome;")
-    orgaos = cur.fetchall()
-    
-    cur.execute("SELECT DISTINCT ano FROM documentos ORDER BY ano DESC;")
-    anos = [row[0] for row in cur.fetchall() if row[0]]
-
-    cur.close()
-    conn.close()
-
-    return jsonify({
-        "tipos": [{"id": t[0], "nome": t[1]} for t in tipos],
-        "orgaos": [{"id": o[0], "nome": o[1]} for o in orgaos],
-        "anos": anos
-    })
+    Servido da memória, com ETag: o navegador revalida e recebe 304 se nada mudou.
+    """
+    filtros, etag = referencias.filtros()
+    response = jsonify(filtros)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
 
 @app.route('/cadastrar', methods=['GET', 'POST'])
 def cadastrar():
@@ -114,17 +298,24 @@ def cadastrar():
         orgao_id = request.form['orgao_id']
         conteudo_texto = request.form['conteudo_texto']
 
+        # O corpo vai para o armazém; o banco recebe o texto só para o vetor de busca
+        texto_hash, texto_tamanho = gravar_texto(conteudo_texto)
+
         conn = get_db_connection()
         cur = conn.cursor()
         cur.execute("""
             INSERT INTO documentos (
                 titulo, ementa, numero, ano, data_publicacao,
-                tipo_documento_id, orgao_id, conteudo_texto
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-        """, (titulo, ementa, numero, ano, data_publicacao, tipo_documento_id, orgao_id, conteudo_texto))
+                tipo_documento_id, orgao_id, conteudo_texto, texto_hash, texto_tamanho
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            RETURNING id
+        """, (titulo, ementa, numero, ano, data_publicacao, tipo_documento_id, orgao_id, conteudo_texto,
+              texto_hash, texto_tamanho))
+        gravar_trechos(cur, cur.fetchone()[0], [(None, conteudo_texto)])
         conn.commit()
         cur.close()
-        conn.close()
+        referencias.registrar_ano(ano)
+        avancar_geracao_corpus()
         return render_template("sucesso.html")
 
     return render_template("cadastrar.html")
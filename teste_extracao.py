@@ -1,5 +1,5 @@
-from PyPDF2 import PdfReader
 import os
+from extracao import extrair_texto
 
 def limpar_texto(texto):
     if isinstance(texto, bytes):
@@ -12,8 +12,7 @@ for arquivo in os.listdir(PASTA):
     if arquivo.lower().endswith(".pdf"):
         caminho = os.path.join(PASTA, arquivo)
         try:
-            reader = PdfReader(caminho)
-            texto = "\n".join(page.extract_text() or "" for page in reader.pages)
+            texto = extrair_texto(caminho)
             texto_limpo = limpar_texto(texto)
             print(f"✅ Texto limpo de: {arquivo}")
         except Exception as e:
@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+from leitura_lote import ErroLeituraLote, iterar_array_json, iterar_ndjson
+
+
+def ler(funcao, *pedacos):
+    """Registros de `funcao` para um corpo entregue nos pedaços dados."""
+    async def fluxo():
+        for pedaco in pedacos:
+            yield pedaco
+
+    async def coletar():
+        return [registro async for registro in funcao(fluxo())]
+
+    return asyncio.run(coletar())
+
+
+def test_array_em_pedacos_arbitrarios():
+    corpo = '[{"titulo": "Portaria nº 1"}, {"titulo": "Decreto"}, 3]'.encode("utf-8")
+    # Um byte por pedaço: corta o "º" (2 bytes) e o número ao meio
+    registros = ler(iterar_array_json, *(corpo[i:i + 1] for i in range(len(corpo))))
+    assert registros == [
+        (1, {"titulo": "Portaria nº 1"}, None),
+        (2, {"titulo": "Decreto"}, None),
+        (3, 3, None),
+    ]
+
+
+def test_numero_dividido_entre_pedacos():
+    assert ler(iterar_array_json, b"[12", b"34]") == [(1, 1234, None)]
+
+
+@pytest.mark.parametrize("corpo", [b"[]", b"  [ ]\n"])
+def test_array_vazio(corpo):
+    assert ler(iterar_array_json, corpo) == []
+
+
+def test_corpo_vazio_e_incompleto():
+    assert ler(iterar_array_json, b"") == [(1, None, "Array JSON malformado ou incompleto a partir deste elemento.")]
+
+
+def test_array_truncado_entrega_o_que_veio_antes():
+    registros = ler(iterar_array_json, b'[{"a": 1}, {"b": ')
+    assert registros[0] == (1, {"a": 1}, None)
+    assert registros[1][0] == 2 and registros[1][1] is None and registros[1][2]
+
+
+def test_array_sem_fechamento():
+    registros = ler(iterar_array_json, b'[{"a": 1}')
+    assert registros == [(1, {"a": 1}, None),
+                         (2, None, "Array JSON malformado ou incompleto a partir deste elemento.")]
+
+
+@pytest.mark.parametrize("corpo", [
+    b'{"a": 1}',            # objeto em vez de array
+    b'[{"a": 1} {"b": 2}]',  # falta a vírgula
+    b"[1,,2]",
+    b"[1,]",
+    b"[,1]",
+])
+def test_array_malformado(corpo):
+    with pytest.raises(ErroLeituraLote):
+        ler(iterar_array_json, corpo)
+
+
+def test_ndjson_linha_invalida_nao_impede_as_seguintes():
+    registros = ler(iterar_ndjson, b'{"a": 1}\n{quebrado\n', b"\n", b'{"b"', b": 2}")
+    assert registros[0] == (1, {"a": 1}, None)
+    assert registros[1][0] == 2 and registros[1][1] is None and registros[1][2].startswith("JSON inválido")
+    # A linha em branco conta na numeração, mas não gera registro
+    assert registros[2] == (4, {"b": 2}, None)
+    assert len(registros) == 3
+
+
+def test_ndjson_vazio():
+    assert ler(iterar_ndjson, b"", b"\n\n") == []
@@ -0,0 +1,55 @@
+import pytest
+
+from metadados_legais import LIMITE_CABECALHO, extrair_metadados
+
+
+@pytest.mark.parametrize("texto, numero, data", [
+    ("Decreto nº 11.853, de 26 de dezembro de 2023\nDispõe sobre...", "11853", "2023-12-26"),
+    ("Portaria MTE Nº 3.872 DE 21/12/2023", "3872", "2023-12-21"),
+    ("LEI Nº 10.097, DE 19 DE DEZEMBRO DE 2000.", "10097", "2000-12-19"),
+])
+def test_linha_do_ato(texto, numero, data):
+    r = extrair_metadados(texto)
+    assert (r["numero"], r["data_publicacao"], r["ano"]) == (numero, data, int(data[:4]))
+    assert r["confianca"]["numero"] == r["confianca"]["data_publicacao"] == "alta"
+
+
+def test_ato_citado_depois_do_titulo_nao_conta():
+    r = extrair_metadados("Portaria nº 1, de 2 de janeiro de 2024\nAltera a Lei nº 10.097, de 19 de dezembro de 2000.")
+    assert (r["numero"], r["data_publicacao"]) == ("1", "2024-01-02")
+
+
+def test_sem_numero_nem_data_nada_e_inventado():
+    r = extrair_metadados("Orientações gerais sobre aprendizagem profissional")
+    assert r["numero"] is None and r["ano"] is None and r["data_publicacao"] is None
+    assert r["titulo"] == "Orientações gerais sobre aprendizagem profissional"
+    assert r["confianca"] == {"titulo": "baixa", "numero": None, "ano": None, "data_publicacao": None}
+
+
+def test_sem_numero_com_ano_solto_e_titulo_do_arquivo():
+    r = extrair_metadados("Brasília, 2019", "manual_da_aprendizagem.pdf")
+    assert r["titulo"] == "Manual da aprendizagem"
+    assert (r["numero"], r["ano"], r["data_publicacao"]) == (None, 2019, None)
+    assert r["confianca"]["ano"] == "baixa"
+
+
+@pytest.mark.parametrize("texto", ["Publicado em 31/02/2023", "Publicado em 30 de fevereiro de 2023",
+                                   "Portaria nº 5 de 00/13/2023"])
+def test_data_impossivel_fica_none(texto):
+    assert extrair_metadados(texto)["data_publicacao"] is None
+
+
+def test_data_solta_vale_se_nao_houver_linha_do_ato():
+    r = extrair_metadados("Nota técnica\nBrasília, 5 de março de 2022")
+    assert (r["data_publicacao"], r["ano"], r["numero"]) == ("2022-03-05", 2022, None)
+    assert r["confianca"]["data_publicacao"] == "media"
+
+
+def test_so_o_cabecalho_e_examinado():
+    r = extrair_metadados("x" * LIMITE_CABECALHO + "\nDecreto nº 1, de 1 de janeiro de 2020")
+    assert r["numero"] is None and r["data_publicacao"] is None
+
+
+def test_texto_vazio():
+    r = extrair_metadados(None)
+    assert r["titulo"] is None and r["ementa"] == "" and r["conteudo_texto"] == ""
@@ -0,0 +1,61 @@
+from trechos_legais import dividir_em_trechos
+
+ATO = """PORTARIA Nº 1
+CAPÍTULO I
+DISPOSIÇÕES GERAIS
+Art. 1º Esta portaria regula o art. 2º da lei.
+§ 1º Primeiro parágrafo.
+I - primeiro inciso;
+II – segundo inciso.
+Parágrafo único. Único.
+Art. 2º Outro artigo."""
+
+
+def test_rotulos_seguem_a_hierarquia():
+    trechos = list(dividir_em_trechos([(1, ATO)]))
+    assert [(t["tipo"], t["rotulo"]) for t in trechos] == [
+        ("texto", None),
+        ("capitulo", "CAPÍTULO I"),
+        ("artigo", "Art. 1º"),
+        ("paragrafo", "Art. 1º, § 1º"),
+        ("inciso", "Art. 1º, § 1º, inciso I"),
+        ("inciso", "Art. 1º, § 1º, inciso II"),
+        ("paragrafo", "Art. 1º, Parágrafo único"),
+        ("artigo", "Art. 2º"),
+    ]
+    assert [t["ordem"] for t in trechos] == list(range(1, len(trechos) + 1))
+
+
+def test_citacao_no_meio_da_frase_nao_abre_trecho():
+    trechos = list(dividir_em_trechos([(None, "Art. 1º Conforme o Art. 5º da CLT e o § 2º do art. 428.")]))
+    assert len(trechos) == 1 and trechos[0]["rotulo"] == "Art. 1º"
+
+
+def test_pagina_de_cada_trecho():
+    trechos = list(dividir_em_trechos([(1, "Art. 1º Na página um."), (2, "continua.\nArt. 2º Na página dois.")]))
+    assert [(t["rotulo"], t["pagina"]) for t in trechos] == [("Art. 1º", 1), ("Art. 2º", 2)]
+    assert trechos[0]["texto"] == "Art. 1º Na página um.\ncontinua."
+
+
+def test_corte_por_tamanho_nao_perde_nem_repete_linhas():
+    linhas = [f"linha {i:03d} " + "x" * 40 for i in range(100)]
+    trechos = list(dividir_em_trechos([(None, "\n".join(linhas))], tamanho_maximo=500))
+    assert len(trechos) > 1
+    assert all(len(t["texto"]) <= 500 for t in trechos)
+    # Sem sobreposição: juntos, os trechos reproduzem o texto na ordem, até a última linha
+    assert "\n".join(t["texto"] for t in trechos).split("\n") == linhas
+    assert trechos[-1]["texto"].endswith(linhas[-1])
+
+
+def test_corte_por_tamanho_mantem_o_rotulo():
+    texto = "Art. 7º Caput.\n" + "\n".join("y" * 60 for _ in range(20))
+    trechos = list(dividir_em_trechos([(None, texto)], tamanho_maximo=200))
+    assert len(trechos) > 1
+    assert {t["rotulo"] for t in trechos} == {"Art. 7º"}
+
+
+def test_linha_final_sem_quebra_e_texto_vazio():
+    trechos = list(dividir_em_trechos([(None, "Art. 1º Um.\nArt. 2º Último")]))
+    assert trechos[-1]["texto"] == "Art. 2º Último"
+    assert list(dividir_em_trechos([(None, "")])) == []
+    assert list(dividir_em_trechos([(None, None), (1, "  \n \n")])) == []
@@ -0,0 +1,69 @@
+import re
+
+# Marcadores estruturais dos atos normativos, do nível mais alto ao mais baixo.
+# Cada um precisa começar a linha: "Art. 5º" no meio de uma frase é só citação.
+NIVEIS = (
+    ("capitulo", re.compile(r"^\s*((?:CAP[ÍI]TULO|Cap[íi]tulo)\s+[IVXLCDM]+)\b")),
+    ("artigo", re.compile(r"^\s*(Art\.?\s*\d+(?:\.\d{3})*\s*[º°o]?(?:-[A-Z])?)(?=[\s.:–-]|$)")),
+    ("paragrafo", re.compile(r"^\s*(§\s*\d+\s*[º°o]?|Par[áa]grafo\s+[úu]nico|PAR[ÁA]GRAFO\s+[ÚU]NICO)(?=[\s.:–-])")),
+    ("inciso", re.compile(r"^\s*([IVXLCDM]+)\s*[-–—]\s+")),
+)
+_ORDEM = {tipo: i for i, (tipo, _) in enumerate(NIVEIS)}
+
+# Trechos maiores que isto (ex.: manuais sem artigos) são cortados em quebras de linha
+TAMANHO_MAXIMO_TRECHO = 4000
+
+
+def _classificar(linha):
+    for tipo, padrao in NIVEIS:
+        m = padrao.match(linha)
+        if m:
+            rotulo = " ".join(m.group(1).split())
+            return tipo, ("inciso " + rotulo) if tipo == "inciso" else rotulo
+    return None, None
+
+
+# ✂️ Divide o texto de um ato em unidades estruturais (Capítulo, Art., §, inciso).
+# Recebe pares (página, texto) — um PDF página a página ou [(None, texto)] — e
+# devolve um dicionário por trecho, sem montar o texto inteiro em memória. O rótulo
+# carrega o caminho na hierarquia ("Art. 428, § 1º"), para o trecho se explicar sozinho.
+def dividir_em_trechos(paginas, tamanho_maximo=TAMANHO_MAXIMO_TRECHO):
+    caminho = {}  # nível → rótulo do marcador mais recente
+    atual = None
+    ordem = 0
+
+    def fechar(trecho):
+        nonlocal ordem
+        del trecho["tamanho"]
+        texto = "\n".join(trecho.pop("linhas")).strip()
+        if texto:
+            ordem += 1
+            trecho.update(ordem=ordem, texto=texto)
+            return trecho
+        return None
+
+    for pagina, texto in paginas:
+        for linha in (texto or "").splitlines():
+            tipo, rotulo = _classificar(linha)
+            if tipo is not None:
+                nivel = _ORDEM[tipo]
+                caminho = {n: r for n, r in caminho.items() if n < nivel}
+                caminho[nivel] = rotulo
+            elif atual is not None and atual["tamanho"] + len(linha) > tamanho_maximo:
+                tipo, rotulo = atual["tipo"], atual["rotulo"]
+            if tipo is not None or atual is None:
+                if atual is not None:
+                    trecho = fechar(atual)
+                    if trecho:
+                        yield trecho
+                # O capítulo só dá contexto aos artigos; não entra no rótulo deles
+                nome = ", ".join(r for n, r in sorted(caminho.items()) if n > 0 or tipo == "capitulo")
+                atual = {"tipo": tipo or "texto", "rotulo": nome or None,
+                         "pagina": pagina, "linhas": [], "tamanho": 0}
+            atual["linhas"].append(linha)
+            atual["tamanho"] += len(linha) + 1
+
+    if atual is not None:
+        trecho = fechar(atual)
+        if trecho:
+            yield trecho
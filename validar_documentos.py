@@ -1,4 +1,5 @@
 import psycopg2
+from estatisticas import ler_estatisticas
 
 # Conexão direta
 def conectar():
@@ -12,25 +13,23 @@ def conectar():
     )
 
 conn = conectar()
-cur = conn.cursor()
+# Contagens mantidas por gatilhos (estatisticas.py): não percorre documentos.
+# Só entram documentos ativos; None = documento sem aquele campo
+estatisticas = ler_estatisticas(conn)
 
 # 📘 Documentos por tipo
 print("\n📘 Documentos por tipo:")
-cur.execute("SELECT tipo_documento_id, COUNT(*) FROM documentos GROUP BY tipo_documento_id;")
-for tipo, total in cur.fetchall():
-    print(f"Tipo {tipo} → {total} documentos")
+for item in estatisticas["por_tipo"]:
+    print(f"Tipo {item['nome']} → {item['total']} documentos")
 
 # 🏛️ Documentos por órgão
 print("\n🏛️ Documentos por órgão:")
-cur.execute("SELECT orgao_id, COUNT(*) FROM documentos GROUP BY orgao_id;")
-for orgao, total in cur.fetchall():
-    print(f"Órgão {orgao} → {total} documentos")
+for item in estatisticas["por_orgao"]:
+    print(f"Órgão {item['nome']} → {item['total']} documentos")
 
 # 📅 Documentos por ano
 print("\n📅 Documentos por ano:")
-cur.execute("SELECT ano, COUNT(*) FROM documentos GROUP BY ano ORDER BY ano;")
-for ano, total in cur.fetchall():
-    print(f"Ano {ano} → {total} documentos")
+for item in sorted(estatisticas["por_ano"], key=lambda item: item["nome"] or 0):
+    print(f"Ano {item['nome']} → {item['total']} documentos")
 
-cur.close()
 conn.close()
\ No newline at end of file